@@ -0,0 +1,632 @@
+# Collector agent and aggregator for monitoring several hosts from one console.
+#
+# An Agent scans its machine every `interval` seconds and pushes the process
+# groups to every subscribed console over TCP. An Aggregator subscribes to
+# many agents from a single selectors loop, keeps a per-host copy of their
+# groups and routes close/optimize commands back to the owning agent.
+#
+# Wire format: frames of a 5-byte header (type, payload length) and a
+# payload. After the handshake a subscriber gets one KEYFRAME with the full
+# state, then a DELTA per tick carrying only the groups that changed beyond
+# a tolerance, plus the names of the groups that disappeared. Group names
+# are sent once and referred to by a numeric id afterwards.
+import hmac
+import ipaddress
+import json
+import logging
+import queue
+import selectors
+import socket
+import struct
+import threading
+import time
+import psutil
+import core
+from snapshot import take_snapshot
+
+log = logging.getLogger(__name__)
+
+AGENT_PORT = 7739
+# Seconds between an agent's scans
+TICK_INTERVAL = 2.0
+# Seconds before the aggregator retries an unreachable agent
+RECONNECT_DELAY = 5.0
+# A subscriber with this many unsent bytes is dropped; it resyncs on reconnect
+MAX_BUFFERED = 4 * 1024 * 1024
+MAX_FRAME = 16 * 1024 * 1024
+# Changes below these are not sent: CPU in percentage points, memory relative
+CPU_TOLERANCE = 0.5
+MEM_TOLERANCE = 0.01
+PRIORITY_TOLERANCE = 0.01
+PROTOCOL_VERSION = 1
+
+# Frame types
+HELLO, KEYFRAME, DELTA, COMMAND, RESULT = range(1, 6)
+# Command operations
+CLOSE, OPTIMIZE = 1, 2
+OPS = {"close": CLOSE, "optimize": OPTIMIZE}
+
+_HEADER = struct.Struct("!BI")  # frame type, payload length
+_HELLO = struct.Struct("!H")  # protocol version, then a UTF-8 host name (agent) or token (console)
+_TICK = struct.Struct("!IdffIII")  # seq, timestamp, cpu %, ram %, new names, groups, removals
+_NAME = struct.Struct("!IH")  # name id, length, then the UTF-8 name
+_GROUP = struct.Struct("!IIfff")  # name id, count, cpu %, memory MB, priority
+_COMMAND = struct.Struct("!IB")  # request id, operation, then a UTF-8 group name
+_RESULT = struct.Struct("!I")  # request id, then a JSON result
+
+
+def frame(kind, payload=b""):
+    return _HEADER.pack(kind, len(payload)) + payload
+
+
+def read_frames(buffer):
+    """Pop every complete frame from a bytearray, yielding (type, payload)."""
+    offset = 0
+    while len(buffer) - offset >= _HEADER.size:
+        kind, length = _HEADER.unpack_from(buffer, offset)
+        if length > MAX_FRAME:
+            raise ValueError(f"frame of {length} bytes exceeds MAX_FRAME")
+        end = offset + _HEADER.size + length
+        if end > len(buffer):
+            break
+        yield kind, bytes(buffer[offset + _HEADER.size:end])
+        offset = end
+    del buffer[:offset]
+
+
+def _changed(old, group):
+    count, cpu, mem, priority = old
+    return (count != group["count"]
+            or abs(cpu - group["cpu"]) > CPU_TOLERANCE
+            or abs(mem - group["mem"]) > MEM_TOLERANCE * max(mem, 1.0)
+            or abs(priority - group["priority"]) > PRIORITY_TOLERANCE)
+
+
+class DeltaEncoder:
+    """
+    Agent-side state of what subscribers know. update() turns a fresh group
+    list into a DELTA payload; keyframe() encodes the full state for a new
+    subscriber.
+    """
+
+    def __init__(self):
+        self.seq = 0
+        self._ids = {}  # name -> id
+        self._names = []  # id -> encoded name
+        self._sent = {}  # id -> (count, cpu, mem, priority) as subscribers have them
+        self._metrics = (0.0, 0.0, 0.0)  # timestamp, cpu %, ram %
+
+    def _name_id(self, name, new_names):
+        name_id = self._ids.get(name)
+        if name_id is None:
+            name_id = self._ids[name] = len(self._names)
+            self._names.append(name.encode("utf-8", "replace")[:0xFFFF])
+            new_names.append(name_id)
+        return name_id
+
+    def _pack(self, new_names, groups, removals):
+        parts = [_TICK.pack(self.seq, *self._metrics, len(new_names), len(groups), len(removals))]
+        for name_id in new_names:
+            encoded = self._names[name_id]
+            parts.append(_NAME.pack(name_id, len(encoded)))
+            parts.append(encoded)
+        parts.extend(_GROUP.pack(name_id, *self._sent[name_id]) for name_id in groups)
+        parts.append(struct.pack(f"!{len(removals)}I", *removals))
+        return b"".join(parts)
+
+    def update(self, groups, timestamp, cpu_percent, ram_percent):
+        """Record a scan and return the DELTA payload for it."""
+        self.seq += 1
+        self._metrics = (timestamp, cpu_percent, ram_percent)
+        new_names, changed, seen = [], [], set()
+        for group in groups:
+            name_id = self._name_id(group["name"], new_names)
+            seen.add(name_id)
+            old = self._sent.get(name_id)
+            if old is None or _changed(old, group):
+                self._sent[name_id] = (group["count"], group["cpu"], group["mem"], group["priority"])
+                changed.append(name_id)
+        removals = [name_id for name_id in self._sent if name_id not in seen]
+        for name_id in removals:
+            del self._sent[name_id]
+        return self._pack(new_names, changed, removals)
+
+    def keyframe(self):
+        """The full state: every known name and every live group."""
+        return self._pack(list(range(len(self._names))), list(self._sent), [])
+
+
+class DeltaDecoder:
+    """Console-side copy of one agent's groups, rebuilt from KEYFRAME and DELTA payloads."""
+
+    def __init__(self):
+        self.seq = None
+        self.names = {}  # id -> name
+        self.groups = {}  # name -> {"name", "count", "cpu", "mem", "priority"}
+        self.timestamp = None
+        self.cpu_percent = None
+        self.ram_percent = None
+
+    def apply(self, kind, payload):
+        seq, timestamp, cpu, ram, n_names, n_groups, n_removals = _TICK.unpack_from(payload)
+        offset = _TICK.size
+        if kind == KEYFRAME:
+            self.groups.clear()
+        for _ in range(n_names):
+            name_id, length = _NAME.unpack_from(payload, offset)
+            offset += _NAME.size
+            self.names[name_id] = payload[offset:offset + length].decode("utf-8", "replace")
+            offset += length
+        end = offset + n_groups * _GROUP.size
+        for name_id, count, group_cpu, mem, priority in _GROUP.iter_unpack(payload[offset:end]):
+            name = self.names[name_id]
+            self.groups[name] = {"name": name, "count": count, "cpu": group_cpu,
+                                 "mem": mem, "priority": priority}
+        for name_id in struct.unpack_from(f"!{n_removals}I", payload, end):
+            self.groups.pop(self.names[name_id], None)
+        self.seq = seq
+        self.timestamp, self.cpu_percent, self.ram_percent = timestamp, cpu, ram
+
+
+class _Connection:
+    __slots__ = ("sock", "inbuf", "outbuf", "ready", "label")
+
+    def __init__(self, sock, label):
+        self.sock = sock
+        self.inbuf = bytearray()
+        self.outbuf = bytearray()
+        self.ready = False  # Handshake done
+        self.label = label
+
+
+class _Endpoint:
+    """Shared non-blocking socket plumbing of Agent and Aggregator."""
+
+    def __init__(self):
+        self.selector = selectors.DefaultSelector()
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def _send(self, conn, data):
+        """Queue data and write as much as the socket takes now."""
+        if conn.sock is None:
+            return
+        conn.outbuf += data
+        if len(conn.outbuf) > MAX_BUFFERED:
+            log.warning("Dropping %s: %d bytes unsent", conn.label, len(conn.outbuf))
+            self._drop(conn)
+            return
+        self._flush(conn)
+
+    def _flush(self, conn):
+        if conn.sock is None:
+            return
+        try:
+            sent = conn.sock.send(conn.outbuf)
+        except (BlockingIOError, InterruptedError):
+            sent = 0
+        except OSError:
+            self._drop(conn)
+            return
+        self.bytes_sent += sent
+        del conn.outbuf[:sent]
+        events = selectors.EVENT_READ | (selectors.EVENT_WRITE if conn.outbuf else 0)
+        self.selector.modify(conn.sock, events, conn)
+
+    def _receive(self, conn):
+        """Read what is available and return the complete frames, or None if the peer is gone."""
+        try:
+            data = conn.sock.recv(65536)
+        except (BlockingIOError, InterruptedError):
+            return []
+        except OSError:
+            data = b""
+        if not data:
+            self._drop(conn)
+            return None
+        self.bytes_received += len(data)
+        conn.inbuf += data
+        try:
+            return list(read_frames(conn.inbuf))
+        except ValueError as e:
+            log.warning("Dropping %s: %s", conn.label, e)
+            self._drop(conn)
+            return None
+
+    def _drop(self, conn):
+        if conn.sock is None:
+            return
+        self.selector.unregister(conn.sock)
+        conn.sock.close()
+        conn.sock = None
+        conn.ready = False
+
+
+class Agent(_Endpoint):
+    """
+    Publishes this machine's process groups to subscribed consoles and runs
+    their close/optimize commands. `source()` returns a ProcessSnapshot
+    (take_snapshot by default; a FakeProcessSource's collect for tests).
+    When `token` is set, consoles must present it in their HELLO. Without a
+    token the agent is read-only and may only listen on a loopback address.
+    Optimize runs in a worker thread and honours optimizer.DRY_RUN like a
+    local clean.
+    """
+
+    def __init__(self, host="127.0.0.1", port=AGENT_PORT, interval=TICK_INTERVAL, source=take_snapshot,
+                 name=None, token=None, allow_commands=True):
+        super().__init__()
+        self.address = (host, port)
+        self.interval = interval
+        self.source = source
+        self.name = name or socket.gethostname()
+        self.token = token
+        self.allow_commands = allow_commands
+        self.encoder = DeltaEncoder()
+        self.snapshot = None
+        self.groups = {}  # name -> group from the latest scan, pids included
+        self._listener = None
+        self._clients = set()
+        self._next_tick = 0.0
+        self._running = False
+        self._optimizing = False
+        self._results = queue.Queue()  # (conn, request id, result) from the worker thread
+        self._wake_r = self._wake_w = None
+
+    def start(self):
+        """
+        Bind and listen; returns the bound (host, port), useful with port 0.
+        Raises ValueError for a non-loopback address without a token.
+        """
+        if self.token is None and not is_loopback(self.address[0]):
+            raise ValueError(f"refusing to listen on {self.address[0]} without a token")
+        self._listener = socket.create_server(self.address)
+        self._listener.setblocking(False)
+        self.selector.register(self._listener, selectors.EVENT_READ, None)
+        # The optimize worker writes a byte here to wake the select loop
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self.selector.register(self._wake_r, selectors.EVENT_READ, self._wake_r)
+        self.address = self._listener.getsockname()[:2]
+        psutil.cpu_percent(interval=None)  # Prime the CPU counter
+        return self.address
+
+    def stop(self):
+        self._running = False
+
+    def close(self):
+        for conn in list(self._clients):
+            self._drop(conn)
+        if self._listener is not None:
+            self.selector.unregister(self._listener)
+            self._listener.close()
+            self._listener = None
+        if self._wake_r is not None:
+            self.selector.unregister(self._wake_r)
+            self._wake_r.close()
+            self._wake_w.close()
+            self._wake_r = self._wake_w = None
+        self.selector.close()
+
+    def run(self, duration=None):
+        """Serve until stop() is called or `duration` seconds have passed."""
+        if self._listener is None:
+            self.start()
+        self._running = True
+        deadline = time.monotonic() + duration if duration is not None else None
+        try:
+            while self._running and (deadline is None or time.monotonic() < deadline):
+                now = time.monotonic()
+                if now >= self._next_tick:
+                    self.tick()
+                    self._next_tick = now + self.interval
+                # Wake up at least twice a second so stop() takes effect
+                timeout = min(self._next_tick - time.monotonic(), 0.5)
+                for key, events in self.selector.select(max(timeout, 0)):
+                    if key.data is None:
+                        self._accept()
+                    elif key.data is self._wake_r:
+                        self._send_results()
+                    elif events & selectors.EVENT_READ:
+                        self._handle(key.data)
+                    elif events & selectors.EVENT_WRITE:
+                        self._flush(key.data)
+        finally:
+            self.close()
+
+    def tick(self):
+        """Scan once and push the changes to every subscriber."""
+        self.snapshot = self.source()
+        groups = core.get_process_list(self.snapshot)
+        self.groups = {group["name"]: group for group in groups}
+        payload = self.encoder.update(groups, self.snapshot.timestamp,
+                                      psutil.cpu_percent(interval=None), psutil.virtual_memory().percent)
+        data = frame(DELTA, payload)
+        for conn in list(self._clients):
+            if conn.ready:
+                self._send(conn, data)
+
+    def _accept(self):
+        try:
+            sock, peer = self._listener.accept()
+        except (BlockingIOError, InterruptedError):
+            return
+        sock.setblocking(False)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        conn = _Connection(sock, f"{peer[0]}:{peer[1]}")
+        self._clients.add(conn)
+        self.selector.register(sock, selectors.EVENT_READ, conn)
+
+    def _drop(self, conn):
+        self._clients.discard(conn)
+        super()._drop(conn)
+
+    def _handle(self, conn):
+        frames = self._receive(conn)
+        for kind, payload in frames or ():
+            if not conn.ready:
+                self._handshake(conn, kind, payload)
+                if not conn.ready:
+                    return
+            elif kind == COMMAND:
+                request_id, op = _COMMAND.unpack_from(payload)
+                name = payload[_COMMAND.size:].decode("utf-8", "replace")
+                if op == OPTIMIZE and self._commands_allowed():
+                    self._start_optimize(conn, request_id)
+                else:
+                    self._send_result(conn, request_id, self.execute(op, name))
+
+    def _handshake(self, conn, kind, payload):
+        if kind != HELLO or len(payload) < _HELLO.size:
+            self._drop(conn)
+            return
+        (version,) = _HELLO.unpack_from(payload)
+        token = payload[_HELLO.size:]
+        if version != PROTOCOL_VERSION or (
+                self.token is not None and not hmac.compare_digest(token, self.token.encode())):
+            log.warning("Rejecting %s: bad protocol version or token", conn.label)
+            self._drop(conn)
+            return
+        conn.ready = True
+        self._send(conn, frame(HELLO, _HELLO.pack(PROTOCOL_VERSION) + self.name.encode()))
+        if self.snapshot is not None:
+            self._send(conn, frame(KEYFRAME, self.encoder.keyframe()))
+
+    def _send_result(self, conn, request_id, result):
+        self._send(conn, frame(RESULT, _RESULT.pack(request_id) + json.dumps(result, default=str).encode()))
+        self._next_tick = 0.0  # Publish the effect right away
+
+    def _start_optimize(self, conn, request_id):
+        """Run an optimize in a worker thread; its result is sent from the select loop."""
+        if self._optimizing:
+            self._send_result(conn, request_id, {"ok": False, "error": "an optimize is already running"})
+            return
+        self._optimizing = True
+
+        def work():
+            try:
+                result = self.execute(OPTIMIZE, "")
+            except Exception as e:
+                log.exception("Optimize failed")
+                result = {"ok": False, "error": str(e)}
+            self._results.put((conn, request_id, result))
+            try:
+                self._wake_w.send(b"x")
+            except OSError:
+                pass  # Closed by close(); nobody is waiting for the result
+
+        threading.Thread(target=work, name="agent-optimize", daemon=True).start()
+
+    def _send_results(self):
+        try:
+            self._wake_r.recv(4096)
+        except (BlockingIOError, InterruptedError):
+            pass
+        while not self._results.empty():
+            conn, request_id, result = self._results.get()
+            self._optimizing = False
+            self._send_result(conn, request_id, result)
+
+    def _commands_allowed(self):
+        return self.allow_commands and self.token is not None
+
+    def execute(self, op, name):
+        """Run one command and return its result dict."""
+        if not self.allow_commands:
+            return {"ok": False, "error": "commands are disabled on this agent"}
+        if self.token is None:
+            return {"ok": False, "error": "commands need a token on this agent"}
+        if op == CLOSE:
+            return self.close_group(name)
+        if op == OPTIMIZE:
+            import optimizer
+            return {"ok": True, **optimizer.clean_memory(self.snapshot, cpu_window=0)}
+        return {"ok": False, "error": f"unknown operation {op}"}
+
+    def close_group(self, name):
+        """Terminate the processes of a group from the latest scan."""
+        group = self.groups.get(name)
+        if group is None or self.snapshot is None:
+            return {"ok": False, "error": f"no process group named {name!r}"}
+        create_times = dict(zip(self.snapshot.pids.tolist(), self.snapshot.create_times.tolist()))
+        terminated, errors = 0, []
+        for pid in group["pids"]:
+            try:
+                proc = psutil.Process(pid)
+                # Skip pids reused by another process since the scan
+                if proc.create_time() != create_times.get(pid):
+                    continue
+                proc.terminate()
+                terminated += 1
+            except psutil.NoSuchProcess:
+                continue
+            except Exception as e:
+                errors.append(f"{pid}: {e}")
+        return {"ok": not errors, "terminated": terminated, "errors": errors}
+
+
+def is_loopback(host):
+    """Whether an address or host name only resolves to loopback addresses."""
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        pass
+    try:
+        infos = socket.getaddrinfo(host, None)
+    except OSError:
+        return False
+    return all(ipaddress.ip_address(info[4][0]).is_loopback for info in infos)
+
+
+def parse_endpoint(text, default_port=AGENT_PORT):
+    """"host" or "host:port" to (host, port)."""
+    host, _, port = text.rpartition(":")
+    if not host:
+        return text, default_port
+    return host, int(port)
+
+
+class _Remote(_Connection):
+    __slots__ = ("endpoint", "decoder", "name", "connecting", "retry_at")
+
+    def __init__(self, endpoint):
+        super().__init__(None, f"{endpoint[0]}:{endpoint[1]}")
+        self.endpoint = endpoint
+        self.decoder = DeltaDecoder()
+        self.name = None  # Host name the agent reports
+        self.connecting = False
+        self.retry_at = 0.0
+
+
+class Aggregator(_Endpoint):
+    """
+    Subscribes to many agents at once. Agents push their changes, so the
+    console only waits on its sockets: poll() handles whatever arrived and
+    reconnects agents that went away. `on_change(remote)` is called after
+    each applied update and `on_result(request_id, result)` for command results.
+    """
+
+    def __init__(self, endpoints, token=None, on_change=None, on_result=None):
+        super().__init__()
+        self.token = token
+        self.on_change = on_change
+        self.on_result = on_result
+        self.remotes = [_Remote(parse_endpoint(e) if isinstance(e, str) else tuple(e)) for e in endpoints]
+        self.results = {}  # request id -> result, for callers without on_result
+        self._request_ids = 0
+
+    def poll(self, timeout=0.5):
+        """Connect what is due, then handle events for up to `timeout` seconds."""
+        now = time.monotonic()
+        for remote in self.remotes:
+            if remote.sock is None and now >= remote.retry_at:
+                self._connect(remote)
+        if not self.selector.get_map():
+            time.sleep(timeout)
+            return
+        for key, events in self.selector.select(timeout):
+            remote = key.data
+            if remote.connecting:
+                # The non-blocking connect finished; it failed if SO_ERROR is set
+                remote.connecting = False
+                if remote.sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR):
+                    self._drop(remote)
+                    continue
+            if events & selectors.EVENT_READ:
+                self._handle(remote)
+            if events & selectors.EVENT_WRITE and remote.sock is not None:
+                self._flush(remote)
+
+    def run(self, duration=None):
+        deadline = time.monotonic() + duration if duration is not None else None
+        while deadline is None or time.monotonic() < deadline:
+            self.poll()
+
+    def close(self):
+        for remote in self.remotes:
+            if remote.sock is not None:
+                self._drop(remote)
+        self.selector.close()
+
+    def _connect(self, remote):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setblocking(False)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        remote.sock = sock
+        remote.inbuf.clear()
+        remote.outbuf.clear()
+        remote.name = None
+        remote.connecting = True
+        sock.connect_ex(remote.endpoint)
+        # Writable once the connection is established (or has failed)
+        self.selector.register(sock, selectors.EVENT_WRITE, remote)
+        remote.outbuf += frame(HELLO, _HELLO.pack(PROTOCOL_VERSION) + (self.token or "").encode())
+
+    def _drop(self, remote):
+        if remote.sock is None:
+            return
+        super()._drop(remote)
+        remote.connecting = False
+        remote.retry_at = time.monotonic() + RECONNECT_DELAY
+        if self.on_change is not None:
+            self.on_change(remote)
+
+    def _handle(self, remote):
+        frames = self._receive(remote)
+        for kind, payload in frames or ():
+            if kind == HELLO:
+                remote.name = payload[_HELLO.size:].decode("utf-8", "replace")
+                remote.ready = True
+                remote.decoder = DeltaDecoder()  # A new session starts from its keyframe
+            elif kind in (KEYFRAME, DELTA):
+                remote.decoder.apply(kind, payload)
+                if self.on_change is not None:
+                    self.on_change(remote)
+            elif kind == RESULT:
+                (request_id,) = _RESULT.unpack_from(payload)
+                result = json.loads(payload[_RESULT.size:])
+                if self.on_result is not None:
+                    self.on_result(request_id, result)
+                else:
+                    self.results[request_id] = result
+
+    def find(self, host):
+        """The remote with this "host:port" label or reported host name."""
+        for remote in self.remotes:
+            if host in (remote.label, remote.name):
+                return remote
+        raise KeyError(f"unknown agent {host!r}")
+
+    def command(self, host, op, name=""):
+        """Send "close" (of a group name) or "optimize" to an agent; returns the request id."""
+        remote = self.find(host)
+        if not remote.ready:
+            raise ConnectionError(f"agent {remote.label} is not connected")
+        self._request_ids += 1
+        payload = _COMMAND.pack(self._request_ids, OPS[op]) + name.encode("utf-8")
+        self._send(remote, frame(COMMAND, payload))
+        return self._request_ids
+
+    def hosts(self):
+        """Per-host status: label, name, connected, seq, timestamp, cpu and ram percent, groups."""
+        return [{
+            "host": remote.name or remote.label,
+            "endpoint": remote.label,
+            "connected": remote.ready,
+            "seq": remote.decoder.seq,
+            "timestamp": remote.decoder.timestamp,
+            "cpu_usage": remote.decoder.cpu_percent,
+            "ram_usage": remote.decoder.ram_percent,
+            "groups": len(remote.decoder.groups),
+        } for remote in self.remotes]
+
+    def merged(self):
+        """Every host's groups in one list, each tagged with "host" and "endpoint"."""
+        rows = []
+        for remote in self.remotes:
+            host = remote.name or remote.label
+            for group in remote.decoder.groups.values():
+                rows.append({"host": host, "endpoint": remote.label, **group})
+        return rows
@@ -1,114 +1,244 @@
 import sys
-import os
+import logging
 import psutil
-import subprocess
 import time
-import joblib
-import difflib
-import numpy as np
-from functools import partial
+import threading
+import queue
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
-    QTableWidget, QTableWidgetItem, QComboBox, QMessageBox, QLineEdit, QHeaderView
+    QTableView, QAbstractItemView, QComboBox, QMessageBox, QLineEdit, QHeaderView, QMenu,
+    QShortcut
 )
-from PyQt5.QtCore import QThread, pyqtSignal, QTimer
-from PyQt5.QtGui import QIcon
+from PyQt5.QtCore import QEvent, QThread, pyqtSignal, QTimer, Qt
+from PyQt5.QtGui import QIcon, QKeySequence
 
-# Load pre-trained ML model
-MODEL_PATH = "ml_model.pkl"
-if os.path.exists(MODEL_PATH):
-    model = joblib.load(MODEL_PATH)
-else:
-    model = None
+# Seconds between system metric samples, and while the window is hidden
+SAMPLE_INTERVAL = 1.0
+HIDDEN_SAMPLE_INTERVAL = 5.0
 
+# Stream training samples to disk while the app runs
+COLLECT_TRAINING_DATA = False
+
+# Record hot-path timings from startup (toggle at runtime with Ctrl+Shift+I)
+INSTRUMENT = False
+# Export timings after every refresh: *.prom for Prometheus text, else JSON lines
+METRICS_EXPORT_PATH = None
+
+# Reaction to kernel memory pressure events: "suggest" ranks the groups to
+# close, "clean" runs the policy-gated optimizer, None doesn't watch
+PRESSURE_ACTION = "suggest"
+
+import instrumentation
+
+from core import get_process_list, get_ml_suggestions
 from optimizer import clean_memory  # <-- Using optimizer module
+from snapshot import take_snapshot
+from gpu import create_gpu_provider
+from metrics_history import MetricsHistory
+from pressure import PressureWatcher
+from retrain import RetrainManager
+from scheduler import RefreshScheduler
+from suggestions import SuggestionSession
+from process_table import (
+    ProcessTableModel, CloseButtonDelegate, create_proxy_model,
+    NAME_COLUMN, PRIORITY_COLUMN, ACTION_COLUMN
+)
 
-# Optionally import the training script for in-app retraining
-try:
-    import train_model
-except ImportError:
-    train_model = None
+log = logging.getLogger(__name__)
 
 class MonitoringThread(QThread):
+    """
+    Samples system metrics every `interval` seconds without blocking on
+    psutil (CPU percent is measured since the previous sample) and records
+    them into a MetricsHistory.
+    """
     metrics_signal = pyqtSignal(dict)
 
+    def __init__(self, history=None, gpu_provider=None):
+        super().__init__()
+        self.history = history if history is not None else MetricsHistory()
+        # Long-lived GPU source; never forks per sample
+        self.gpu_provider = gpu_provider or create_gpu_provider()
+        self.interval = SAMPLE_INTERVAL
+        self._running = True
+
+    def stop(self):
+        self._running = False
+
+    def run(self):
+        psutil.cpu_percent(interval=None)  # Prime the CPU counter
+        try:
+            while self._running:
+                self.msleep(int(self.interval * 1000))
+                with instrumentation.phase("monitor_sample"):
+                    metrics = {
+                        "cpu_usage": psutil.cpu_percent(interval=None),
+                        "ram_usage": psutil.virtual_memory().percent,
+                        "disk_usage": psutil.disk_usage('/').percent,
+                        "gpu_usage": self.gpu_provider.sample()
+                    }
+                    self.history.record(metrics)
+                self.metrics_signal.emit(metrics)
+        finally:
+            # Shut down NVML or the nvidia-smi child with the thread
+            self.gpu_provider.close()
+
+class ProcessScanThread(QThread):
+    """
+    Collects process snapshots off the GUI thread, and records the groups
+    into a MetricsHistory there too.
+
+    Scans run only when requested; requests made while a scan is in progress
+    coalesce into a single follow-up scan, so work never queues up behind a
+    stale result. A failed scan emits scan_failed instead of scan_signal.
+    """
+    scan_signal = pyqtSignal(object, list, float)  # snapshot, groups, CPU seconds
+    scan_failed = pyqtSignal(str)
+
+    def __init__(self, history=None):
+        super().__init__()
+        self.history = history
+        self._requested = threading.Event()
+        self._running = True
+
+    def request_scan(self):
+        """Ask for a fresh scan."""
+        self._requested.set()
+
+    def stop(self):
+        """Stop the thread after the current scan."""
+        self._running = False
+        self._requested.set()
+
     def run(self):
         while True:
-            metrics = {
-                "cpu_usage": psutil.cpu_percent(interval=1),
-                "ram_usage": psutil.virtual_memory().percent,
-                "disk_usage": psutil.disk_usage('/').percent,
-                "gpu_usage": get_gpu_usage()
-            }
-            self.metrics_signal.emit(metrics)
-            time.sleep(2)
-
-def get_gpu_usage():
-    """Get GPU usage if available (for NVIDIA GPUs)."""
-    try:
-        output = subprocess.check_output(
-            ["nvidia-smi", "--query-gpu=utilization.gpu", "--format=csv,noheader,nounits"],
-            encoding='utf-8'
-        )
-        return float(output.strip())
-    except Exception as e:
-        print(f"GPU usage retrieval failed: {e}")
-        return 0.0  # No GPU detected or error
+            self._requested.wait()
+            self._requested.clear()
+            if not self._running:
+                return
+            started = time.thread_time()
+            try:
+                snapshot = take_snapshot()
+                processes = get_process_list(snapshot)
+                if self.history is not None:
+                    self.history.record_groups(processes, snapshot.timestamp)
+            except Exception as e:
+                log.exception("Process scan failed")
+                self.scan_failed.emit(str(e))
+                continue
+            self.scan_signal.emit(snapshot, processes, time.thread_time() - started)
 
-def get_process_list():
+class TaskThread(QThread):
     """
-    Returns an aggregated list of processes grouped by name.
-    For each unique process name, computes:
-      - count: number of processes with that name
-      - avg runtime (sec)
-      - predicted priority (using the average runtime)
-      - list of process IDs (pids)
+    Runs slow, blocking work off the GUI thread: ranking and measuring ML
+    suggestions, closing a group and waiting for it to exit, and the RAM
+    optimizer. Tasks run one at a time in submission order, so they never
+    share the reclaim estimator or a suggestion session concurrently. Each
+    result comes back as task_done(kind, result), or task_failed(kind, error).
     """
-    global model
-    now = time.time()
-    groups = {}
-    for proc in psutil.process_iter(['pid', 'name', 'create_time']):
-        try:
-            runtime = now - proc.info['create_time']
-            name = proc.info['name']
-            pid = proc.info['pid']
-            if name not in groups:
-                groups[name] = {"name": name, "pids": [], "runtimes": []}
-            groups[name]["pids"].append(pid)
-            groups[name]["runtimes"].append(runtime)
-        except (psutil.NoSuchProcess, psutil.AccessDenied):
-            continue
-
-    aggregated_list = []
-    for name, data in groups.items():
-        count = len(data["pids"])
-        avg_runtime = sum(data["runtimes"]) / count if count > 0 else 0
-        if model is not None:
-            pred = model.predict([[avg_runtime]])[0]
-        else:
-            pred = 0
-        aggregated_list.append({
-            "name": name,
-            "pids": data["pids"],
-            "count": count,
-            "runtime": avg_runtime,
-            "priority": pred
-        })
-    return aggregated_list
+    task_done = pyqtSignal(str, object)
+    task_failed = pyqtSignal(str, str)
+
+    def __init__(self):
+        super().__init__()
+        self._tasks = queue.Queue()
+
+    def submit(self, kind, func, *args):
+        """Queue func(*args); `kind` tags its result."""
+        self._tasks.put((kind, func, args))
+
+    def stop(self):
+        """Stop the thread after the queued tasks."""
+        self._tasks.put(None)
+
+    def run(self):
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                return
+            kind, func, args = task
+            try:
+                result = func(*args)
+            except Exception as e:
+                log.exception("Background task %r failed", kind)
+                self.task_failed.emit(kind, str(e))
+                continue
+            self.task_done.emit(kind, result)
+
+def _open_session(snapshot):
+    """Rank a new suggestion session (on the task thread) and take its first step."""
+    return _advance_session(SuggestionSession(snapshot))
+
+def _refresh_session(session, snapshot):
+    """Re-queue what changed in a scan taken after a close, then take the next step."""
+    session.refresh(snapshot)
+    return _advance_session(session)
+
+def _advance_session(session):
+    """(session, RAM under target, best suggestion or None), measuring it if needed."""
+    if session.ram_ok():
+        return session, True, None
+    return session, False, session.next()
+
+SEARCH_DEBOUNCE_MS = 200
+
+# Sort dropdown option -> (table column, order)
+SORT_OPTIONS = {
+    "Priority: Low to High": (PRIORITY_COLUMN, Qt.AscendingOrder),
+    "Priority: High to Low": (PRIORITY_COLUMN, Qt.DescendingOrder),
+    "Process Name: A-Z": (NAME_COLUMN, Qt.AscendingOrder),
+    "Process Name: Z-A": (NAME_COLUMN, Qt.DescendingOrder),
+}
 
 class SystemOptimizerApp(QWidget):
+    # Pressure events arrive on the watcher's thread; the signal moves them to the GUI thread
+    pressure_signal = pyqtSignal(dict)
+
     def __init__(self):
         super().__init__()
+        self.snapshot = None  # Latest shared process snapshot
+        self.processes = []  # Aggregated process list from that snapshot
+        self.suggestions_active = False  # An ML suggestion session is running
+        self.suggestion_session = None  # Its session, once ranked
+        self.suggestions_refresh_after = None  # Re-queue the session from scans started after this
+        self.history = MetricsHistory()  # Bounded metric history for trends
+        self.profiler = instrumentation.SamplingProfiler()
+        instrumentation.enable(INSTRUMENT)
+
+        self.scan_thread = ProcessScanThread(self.history)
+        self.scan_thread.scan_signal.connect(self.render_process_table)
+        self.scan_thread.scan_failed.connect(self.on_scan_failed)
+        self.scan_thread.start()
+
+        self.task_thread = TaskThread()
+        self.task_thread.task_done.connect(self.on_task_done)
+        self.task_thread.task_failed.connect(self.on_task_failed)
+        self.task_thread.start()
+
         self.initUI()
 
-        self.monitor_thread = MonitoringThread()
+        self.monitor_thread = MonitoringThread(self.history)
         self.monitor_thread.metrics_signal.connect(self.update_status)
         self.monitor_thread.start()
 
-        # Auto-refresh process table every 10 seconds
+        # Auto-refresh the process table; the scheduler picks each delay from
+        # the last refresh's cost, window visibility and memory pressure
+        self.scheduler = RefreshScheduler()
         self.refresh_timer = QTimer(self)
+        self.refresh_timer.setSingleShot(True)
         self.refresh_timer.timeout.connect(self.update_process_table)
-        self.refresh_timer.start(10000)
+
+        self.pressure_watcher = None
+        if PRESSURE_ACTION:
+            self.pressure_signal.connect(self.on_memory_pressure)
+            self.pressure_watcher = PressureWatcher(self.pressure_signal.emit)
+            self.pressure_watcher.start()
+
+        self.training_collector = None
+        if COLLECT_TRAINING_DATA:
+            from collect_training_data import StreamingCollector
+            self.training_collector = StreamingCollector()
+            self.training_collector.start_background()
     
     # Setting a dark mode 
         dark_stylesheet = """
@@ -117,7 +247,7 @@ class SystemOptimizerApp(QWidget):
                 color: #ffffff;
         }       
 
-        QTableWidget {
+        QTableView {
                 background-color: #1e1e1e;
                 gridline-color: #444;
                 color: #ffffff;
@@ -130,7 +260,7 @@ class SystemOptimizerApp(QWidget):
                 border: 1px solid #444;
         }
 
-        QTableWidget QTableCornerButton::section {
+        QTableView QTableCornerButton::section {
                 background-color: #2c2c2c;
         }
 
@@ -154,21 +284,20 @@ class SystemOptimizerApp(QWidget):
         self.status_label = QLabel("System Status: Monitoring...", self)
         top_layout.addWidget(self.status_label)
 
-        # Search bar
+        # Search bar, filtering the last scan after typing pauses (debounced)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.apply_search_filter)
         self.search_bar = QLineEdit(self)
         self.search_bar.setPlaceholderText("Search process name...")
-        self.search_bar.textChanged.connect(self.update_process_table)
+        self.search_bar.textChanged.connect(lambda _text: self.search_timer.start())
         top_layout.addWidget(self.search_bar)
 
         # Add sort dropdown (combo box)
         self.sort_combo = QComboBox(self)
-        self.sort_combo.addItems([
-            "Priority: Low to High",
-            "Priority: High to Low",
-            "Process Name: A-Z",
-            "Process Name: Z-A"
-        ])
-        self.sort_combo.currentIndexChanged.connect(self.update_process_table)
+        self.sort_combo.addItems(list(SORT_OPTIONS))
+        self.sort_combo.currentIndexChanged.connect(self.apply_sort_option)
         top_layout.addWidget(QLabel("Sort By:", self))
         top_layout.addWidget(self.sort_combo)
 
@@ -188,6 +317,10 @@ class SystemOptimizerApp(QWidget):
         self.retrain_button = QPushButton("Retrain Model", self)
         self.retrain_button.clicked.connect(self.retrain_model)
         btn_layout.addWidget(self.retrain_button)
+        self.retrainer = RetrainManager()
+        self.retrain_timer = QTimer(self)
+        self.retrain_timer.setInterval(200)
+        self.retrain_timer.timeout.connect(self.poll_retrain)
 
         self.ml_button = QPushButton("ML Suggestions", self)
         self.ml_button.clicked.connect(lambda: self.ml_suggestions_loop())
@@ -197,79 +330,168 @@ class SystemOptimizerApp(QWidget):
 
         # Table to display aggregated process data:
         # Columns: Count, Process Name, Avg Runtime (sec), Priority, CPU (%), Memory (MB), Action
-        self.table = QTableWidget(self)
+        # Backed by a diffing model behind a sort/filter proxy.
+        self.table_model = ProcessTableModel(self)
+        self.proxy_model = create_proxy_model(self.table_model, self)
+        self.table = QTableView(self)
+        self.table.setModel(self.proxy_model)
         self.table.setSortingEnabled(True)
-        self.table.setColumnCount(7)
-        self.table.setHorizontalHeaderLabels([
-            "Count", "Process Name", "Avg Runtime (sec)", "Priority",
-            "CPU (%)", "Memory (MB)", "Action"
-        ])
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.verticalHeader().setVisible(False)
+
+        # "Close" is painted by a delegate and offered as a context action,
+        # instead of allocating a button widget per row.
+        self.close_delegate = CloseButtonDelegate(self.table)
+        self.close_delegate.clicked.connect(self.close_group_at)
+        self.table.setItemDelegateForColumn(ACTION_COLUMN, self.close_delegate)
+        self.table.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.table.customContextMenuRequested.connect(self.show_table_menu)
+
         header = self.table.horizontalHeader()
         header.setSectionResizeMode(QHeaderView.Stretch)
 
         main_layout.addWidget(self.table)
 
+        # Timings overlay, shown while instrumentation is on
+        self.instrumentation_label = QLabel(self)
+        self.instrumentation_label.setVisible(instrumentation.is_enabled())
+        main_layout.addWidget(self.instrumentation_label)
+        QShortcut(QKeySequence("Ctrl+Shift+I"), self, activated=self.toggle_instrumentation)
+        QShortcut(QKeySequence("Ctrl+Shift+P"), self, activated=self.toggle_profiler)
+
         self.setLayout(main_layout)
         QTimer.singleShot(500, self.update_process_table)
 
     def update_status(self, metrics):
         """Update UI with real-time system metrics."""
+        cpu_trend = self.history.sparkline("cpu_usage", width=10, window=60)
+        ram_trend = self.history.sparkline("ram_usage", width=10, window=60)
         self.status_label.setText(
-            f"CPU: {metrics['cpu_usage']}% | RAM: {metrics['ram_usage']}% | "
+            f"CPU: {metrics['cpu_usage']}% {cpu_trend} | RAM: {metrics['ram_usage']}% {ram_trend} | "
             f"Disk: {metrics['disk_usage']}% | GPU: {metrics['gpu_usage']}%"
         )
+        # Bring the next refresh forward when memory pressure shortens the interval
+        self.scheduler.set_memory_percent(metrics["ram_usage"])
+        interval = self.scheduler.next_interval()
+        if (interval is not None and self.refresh_timer.isActive()
+                and self.refresh_timer.remainingTime() > interval * 1000):
+            self.refresh_timer.start(int(interval * 1000))
+        if instrumentation.is_enabled():
+            self.instrumentation_label.setText(instrumentation.summary())
 
     def update_process_table(self):
-        """Update the table widget with the sorted process list based on the selected sort option."""
-        processes = get_process_list()
-        sort_option = self.sort_combo.currentText()
-        search_text = self.search_bar.text().lower()
-
-        # Apply sorting
-        if sort_option == "Priority: Low to High":
-            processes.sort(key=lambda x: x["priority"])
-        elif sort_option == "Priority: High to Low":
-            processes.sort(key=lambda x: x["priority"], reverse=True)
-        elif sort_option == "Process Name: A-Z":
-            processes.sort(key=lambda x: x["name"].lower())
-        elif sort_option == "Process Name: Z-A":
-            processes.sort(key=lambda x: x["name"].lower(), reverse=True)
-
-        # Apply filtering based on search text
-        if search_text:
-            processes = [p for p in processes if search_text in p["name"].lower()]
-
-        self.table.setRowCount(len(processes))
-        for row, group in enumerate(processes):
-            self.create_process_row(row, group)
-
-
-
-    def create_process_row(self, row, group):
-        """Helper to create a table row for an aggregated process group."""
-        self.table.setItem(row, 0, QTableWidgetItem(str(group["count"])))
-        self.table.setItem(row, 1, QTableWidgetItem(str(group["name"])))
-        self.table.setItem(row, 2, QTableWidgetItem(f"{group['runtime']:.1f}"))
-        self.table.setItem(row, 3, QTableWidgetItem(f"{group['priority']:.2f}"))
-
-        # Aggregate CPU and memory usage for all processes in the group
-        total_cpu = 0.0
-        total_mem = 0.0
-        for pid in group["pids"]:
-            try:
-                proc = psutil.Process(pid)
-                total_cpu += proc.cpu_percent(interval=0)
-                total_mem += proc.memory_info().rss / (1024 * 1024)
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                continue
+        """Request a background scan; the table is redrawn when its result arrives."""
+        self.scan_thread.request_scan()
+
+    def render_process_table(self, snapshot, processes, scan_cost=0.0):
+        """Store the latest scan result, redraw the table from it and schedule the next refresh."""
+        started = time.thread_time()
+        self.snapshot = snapshot
+        self.processes = processes
+        self.populate_table()
+        self.scheduler.record_cost(scan_cost + time.thread_time() - started)
+        self.schedule_refresh()
+        if (self.suggestions_refresh_after is not None
+                and snapshot.timestamp >= self.suggestions_refresh_after):
+            # The scan ran after the last close: re-queue what changed, then go on
+            self.suggestions_refresh_after = None
+            self.task_thread.submit("suggestion", _refresh_session, self.suggestion_session, snapshot)
+
+    def on_scan_failed(self, error):
+        """Keep auto-refresh going after a failed scan; the next one may succeed."""
+        self.status_label.setText(f"Process scan failed: {error}")
+        self.schedule_refresh()
+
+    def schedule_refresh(self):
+        """(Re)start the refresh timer with the scheduler's interval, or pause it."""
+        interval = self.scheduler.next_interval()
+        if interval is None:
+            self.refresh_timer.stop()
+        else:
+            self.refresh_timer.start(int(interval * 1000))
 
-        self.table.setItem(row, 4, QTableWidgetItem(f"{total_cpu:.1f}"))
-        self.table.setItem(row, 5, QTableWidgetItem(f"{total_mem:.1f}"))
+    def update_visibility(self):
+        """Pause refreshes and slow down sampling while the window is hidden or minimized."""
+        visible = self.isVisible() and not self.isMinimized()
+        if visible == self.scheduler.visible:
+            return
+        self.scheduler.set_visible(visible)
+        self.monitor_thread.interval = SAMPLE_INTERVAL if visible else HIDDEN_SAMPLE_INTERVAL
+        if visible:
+            self.update_process_table()  # Catch up at once; the result reschedules
+        else:
+            self.schedule_refresh()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.update_visibility()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.update_visibility()
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() == QEvent.WindowStateChange:
+            self.update_visibility()
+
+    def populate_table(self):
+        """Apply the latest process list to the table model, then sort and filter it."""
+        with instrumentation.phase("render"):
+            self.table_model.apply(self.processes)
+            self.apply_search_filter()
+            self.apply_sort_option()
+        if instrumentation.is_enabled():
+            self.instrumentation_label.setText(instrumentation.summary())
+            if METRICS_EXPORT_PATH:
+                instrumentation.export(METRICS_EXPORT_PATH)
+
+    def toggle_instrumentation(self):
+        """Turn hot-path timings and their overlay on or off."""
+        enabled = not instrumentation.is_enabled()
+        instrumentation.enable(enabled)
+        self.instrumentation_label.setVisible(enabled)
+        self.instrumentation_label.setText(instrumentation.summary())
+
+    def toggle_profiler(self):
+        """Start sampling every thread's stack, or stop and write the collapsed stacks."""
+        if not self.profiler.running:
+            self.profiler.start()
+            self.status_label.setText("Profiling... press Ctrl+Shift+P again to stop.")
+            return
+        path = f"profile-{time.strftime('%Y%m%d-%H%M%S')}.txt"
+        samples = self.profiler.stop(path)
+        self.status_label.setText(f"Wrote {samples} profile samples to {path}.")
+
+    def apply_search_filter(self):
+        """Filter the table by the search text; only the cached rows are searched."""
+        self.proxy_model.set_search(self.search_bar.text())
+
+    def apply_sort_option(self):
+        """Sort the table according to the selected sort option."""
+        column, order = SORT_OPTIONS[self.sort_combo.currentText()]
+        header = self.table.horizontalHeader()
+        if header.sortIndicatorSection() != column or header.sortIndicatorOrder() != order:
+            self.table.sortByColumn(column, order)
 
-        # Create a "Close" button for each row using partial to bind the group's pids
-        close_button = QPushButton("Close", self)
-        close_button.clicked.connect(partial(self.close_process_group, group["pids"]))
-        self.table.setCellWidget(row, 6, close_button)
+    def group_at(self, proxy_index):
+        """Return the process group shown at a (proxy) table index."""
+        return self.table_model.group(self.proxy_model.mapToSource(proxy_index).row())
+
+    def close_group_at(self, proxy_index):
+        """Close the process group of the row whose Close button was clicked."""
+        self.close_process_group(self.group_at(proxy_index)["pids"])
+
+    def show_table_menu(self, pos):
+        """Context menu offering to close the process group under the cursor."""
+        index = self.table.indexAt(pos)
+        if not index.isValid():
+            return
+        group = self.group_at(index)
+        menu = QMenu(self)
+        close_action = menu.addAction(f"Close '{group['name']}' ({group['count']} instances)")
+        if menu.exec_(self.table.viewport().mapToGlobal(pos)) == close_action:
+            self.close_process_group(group["pids"])
 
     def close_process_group(self, pids):
         """Terminate all processes in the given group and refresh the table."""
@@ -286,73 +508,136 @@ class SystemOptimizerApp(QWidget):
         self.update_process_table()
 
     def optimize_ram(self):
-        clean_memory()
-        self.status_label.setText("Ran RAM optimization.")
+        """Run the policy-gated optimizer on the task thread; see show_optimize_result."""
+        if self.snapshot is None:
+            self.status_label.setText("Waiting for the first process scan...")
+            return
+        self.optimize_button.setEnabled(False)
+        self.status_label.setText("Running RAM optimization...")
+        # The snapshot comes from the long-lived scan collector, so its CPU
+        # column is already measured over the last refresh interval
+        snapshot = self.snapshot
+        self.task_thread.submit("optimize", lambda: clean_memory(snapshot, cpu_window=0))
+
+    def show_optimize_result(self, result):
+        self.optimize_button.setEnabled(True)
+        if result["dry_run"]:
+            self.status_label.setText(
+                f"Ran RAM optimization (dry run): {len(result['idle'])} idle processes found.")
+        else:
+            self.status_label.setText(
+                f"Ran RAM optimization: closed {len(result['terminated']) + len(result['killed'])} "
+                f"processes, {result['reclaimed_bytes'] / (1024 * 1024):.1f} MB reclaimed.")
         self.update_process_table()
 
+    def on_memory_pressure(self, event):
+        """React to a memory pressure event from the kernel (or the polling fallback)."""
+        if PRESSURE_ACTION == "clean":
+            self.optimize_ram()
+            return
+        self.update_process_table()
+        if self.snapshot is None:
+            self.show_pressure_suggestions([])
+        else:
+            self.task_thread.submit("pressure", get_ml_suggestions, self.snapshot)
+
+    def show_pressure_suggestions(self, suggestions):
+        if suggestions and suggestions[0]["reclaim_mb"] is not None:
+            top = suggestions[0]
+            self.status_label.setText(
+                f"Memory pressure: closing '{top['name']}' would free ~{top['reclaim_mb']:.1f} MB. "
+                f"Run ML Suggestions to act on it.")
+        else:
+            self.status_label.setText("Memory pressure detected; no suggestions to close.")
+
+    def on_task_done(self, kind, result):
+        """Deliver a task thread result on the GUI thread."""
+        if kind == "optimize":
+            self.show_optimize_result(result)
+        elif kind == "pressure":
+            self.show_pressure_suggestions(result)
+        elif not self.suggestions_active:
+            return  # The session ended while the task ran
+        elif kind == "suggestion":
+            self.show_suggestion(*result)
+        elif kind == "close":
+            self.show_close_result(result)
+
+    def on_task_failed(self, kind, error):
+        if kind == "optimize":
+            self.optimize_button.setEnabled(True)
+            self.status_label.setText(f"RAM optimization failed: {error}")
+        elif kind == "pressure":
+            self.status_label.setText(f"Memory pressure detected; ranking suggestions failed: {error}")
+        elif self.suggestions_active:
+            self.end_suggestions(f"ML suggestions failed: {error}")
+
     def retrain_model(self):
-        """Retrain the model and reload it."""
-        global model
-        if train_model is None:
-            self.status_label.setText("Retrain model functionality not available.")
+        """Start retraining in a worker process, or cancel the running retrain."""
+        if self.retrainer.running:
+            self.retrainer.cancel()
+            self.status_label.setText("Cancelling model retrain...")
             return
-        try:
-            train_model.train_model()
-            model = joblib.load(MODEL_PATH)
-            self.status_label.setText("Model retrained and reloaded successfully.")
+        self.retrainer.start()
+        self.retrain_button.setText("Cancel Retrain")
+        self.status_label.setText("Retraining model...")
+        self.retrain_timer.start()
+
+    def poll_retrain(self):
+        """Show retrain progress; the new model is swapped in between refreshes when done."""
+        outcome = self.retrainer.poll()
+        if outcome is None:
+            done, total = self.retrainer.progress
+            if total:
+                self.status_label.setText(f"Retraining model: {100 * done // total}%")
+            return
+        self.retrain_timer.stop()
+        self.retrain_button.setText("Retrain Model")
+        status, message = outcome
+        self.status_label.setText(message)
+        if status == "done":
             self.update_process_table()
-        except Exception as e:
-            self.status_label.setText(f"Model retrain failed: {e}")
 
-    def get_ml_suggestions(self):
+    def ml_suggestions_loop(self):
         """
-        Build a list of candidate process groups for ML suggestion.
-        Each candidate is one with predicted priority <= 3.
-        The suggestion includes aggregated CPU and memory usage as a score.
+        Suggest groups to close, best first, until RAM usage is under the
+        session's target. Candidates are ranked once from the latest scan;
+        after each close only the groups that changed in the next scan are
+        re-scored. Ranking, measuring and closing run on the task thread;
+        each step comes back to show_suggestion.
         """
-        suggestions = []
-        groups = get_process_list()
-        for group in groups:
-            if group["priority"] <= 4:
-                total_cpu = 0.0
-                total_mem = 0.0
-                for pid in group["pids"]:
-                    try:
-                        proc = psutil.Process(pid)
-                        total_cpu += proc.cpu_percent(interval=0)
-                        total_mem += proc.memory_info().rss / (1024 * 1024)
-                    except (psutil.NoSuchProcess, psutil.AccessDenied):
-                        continue
-                score = total_cpu + total_mem
-                suggestion = {
-                    "name": group["name"],
-                    "count": group["count"],
-                    "pids": group["pids"],
-                    "total_cpu": total_cpu,
-                    "total_mem": total_mem,
-                    "priority": group["priority"],
-                    "score": score
-                }
-                suggestions.append(suggestion)
-        suggestions.sort(key=lambda x: x["score"], reverse=True)
-        return suggestions
-
-    def ml_suggestions_loop(self, rejected=None):
-        if rejected is None:
-            rejected = []
-
-        # Check if current RAM usage is under 65% (stopping condition)
-        if psutil.virtual_memory().percent < 65:
+        if self.suggestions_active:
+            return  # A session is already open
+        if self.snapshot is None:
+            self.status_label.setText("Waiting for the first process scan...")
+            return
+        self.suggestions_active = True
+        self.ml_button.setEnabled(False)
+        self.status_label.setText("Ranking ML suggestions...")
+        self.task_thread.submit("suggestion", _open_session, self.snapshot)
+
+    def end_suggestions(self, status=None):
+        """Close the ML suggestion session."""
+        self.suggestions_active = False
+        self.suggestion_session = None
+        self.suggestions_refresh_after = None
+        self.ml_button.setEnabled(True)
+        if status is not None:
+            self.status_label.setText(status)
+
+    def show_suggestion(self, session, ram_ok, suggestion):
+        """Offer one step of the session: done, out of suggestions, or a group to close."""
+        self.suggestion_session = session
+        if ram_ok:
             QMessageBox.information(
                 self,
                 "System Optimized",
-                "RAM usage is now under 65%. System optimized!"
+                f"RAM usage is now under {session.ram_target}%. System optimized!"
             )
+            self.end_suggestions()
             return
 
-        suggestions = [s for s in self.get_ml_suggestions() if s["name"] not in rejected]
-
-        if not suggestions:
+        if suggestion is None:
             cont = QMessageBox.question(
                 self,
                 "System Optimized",
@@ -361,21 +646,21 @@ class SystemOptimizerApp(QWidget):
                 QMessageBox.Yes
             )
             if cont == QMessageBox.Yes:
-                self.status_label.setText("System remains optimized.")
+                self.end_suggestions("System remains optimized.")
             else:
-                self.status_label.setText("Exiting ML suggestion loop.")
+                self.end_suggestions("Exiting ML suggestion loop.")
             return
 
-        # Take the highest-scoring suggestion
-        suggestion = suggestions[0]
+        freed = (f"~{suggestion['reclaim_mb']:.1f} MB" if suggestion["reclaim_mb"] is not None
+                 else "unknown")
         msg = (f"ML Suggestion:\nClose '{suggestion['name']}' "
                f"({suggestion['count']} instances)\n"
                f"Aggregated CPU: {suggestion['total_cpu']:.1f}% | "
-               f"Memory: {suggestion['total_mem']:.1f} MB\n"
+               f"Memory: {suggestion['total_mem']:.1f} MB RSS, {freed} freed if closed\n"
                f"Justification: Low priority ({suggestion['priority']:.2f}) "
-               f"and high resource usage (Score: {suggestion['score']:.1f}).\n\n"
+               "and the memory closing it would free.\n\n"
                "Do you want to accept this suggestion?")
-    
+
         # Create a custom message box with three buttons
         msgBox = QMessageBox(self)
         msgBox.setWindowTitle("ML Suggestion")
@@ -387,23 +672,46 @@ class SystemOptimizerApp(QWidget):
 
         clicked = msgBox.clickedButton()
         if clicked == acceptButton:
-            # Accept suggestion: close processes and restart loop.
-            self.close_process_group(suggestion["pids"])
-            self.ml_suggestions_loop()
+            # Close the group and wait for it to exit on the task thread, then
+            # continue from the next background scan (see render_process_table)
+            self.status_label.setText(f"Closing '{suggestion['name']}'...")
+            self.task_thread.submit("close", session.accept, suggestion)
         elif clicked == rejectButton:
-            # Reject suggestion: add to rejected list and continue.
-            rejected.append(suggestion["name"])
-            self.ml_suggestions_loop(rejected)
-        elif clicked == exitButton:
-            # Exit the loop.
-            self.status_label.setText("Exiting ML suggestion loop.")
-            return
+            session.reject(suggestion)
+            self.task_thread.submit("suggestion", _advance_session, session)
+        else:
+            self.end_suggestions("Exiting ML suggestion loop.")
+
+    def show_close_result(self, errors):
+        """A suggested group was closed: rescan, and resume the session from that scan."""
+        if errors:
+            self.status_label.setText("Errors closing some processes: " + ", ".join(errors))
+        else:
+            self.status_label.setText("Closed all processes in the group.")
+        self.suggestions_refresh_after = time.time()
+        self.update_process_table()
 
     def ml_suggestion(self):
         """Kick off the ML suggestion loop."""
         self.ml_suggestions_loop()
 
+    def closeEvent(self, event):
+        """Stop the background scanner before the window closes."""
+        self.scan_thread.stop()
+        self.scan_thread.wait()
+        self.monitor_thread.stop()
+        self.monitor_thread.wait()
+        self.task_thread.stop()
+        self.task_thread.wait()
+        self.retrainer.shutdown()
+        if self.pressure_watcher is not None:
+            self.pressure_watcher.stop()
+        if self.training_collector is not None:
+            self.training_collector.stop()
+        super().closeEvent(event)
+
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
     app = QApplication(sys.argv)
     window = SystemOptimizerApp()
     window.show()
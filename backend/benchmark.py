@@ -0,0 +1,589 @@
+import argparse
+import json
+import os
+import sys
+import time
+import traceback
+import numpy as np
+
+# A metric regresses when it is this much slower than the baseline...
+REGRESSION_THRESHOLD = 0.3
+# ...and by at least this many seconds (ignores noise on tiny timings)
+REGRESSION_MIN_SECONDS = 0.002
+
+
+def _time_call(fn, repeat=3):
+    """Return the best wall time (in seconds) of calling fn() `repeat` times."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _synthetic_model(n_samples=2000, seed=0):
+    """Train a small XGBRegressor on synthetic (runtime, priority) data."""
+    from xgboost import XGBRegressor
+    rng = np.random.default_rng(seed)
+    runtimes = rng.exponential(3600, n_samples)
+    thresholds = np.percentile(runtimes, range(10, 100, 10))
+    priorities = 1 + np.searchsorted(thresholds, runtimes, side="right")
+    model = XGBRegressor(eval_metric="rmse")
+    model.fit(runtimes.reshape(-1, 1), priorities)
+    return model
+
+
+def bench_predict(sizes=(100, 1000, 10000)):
+    """Compare per-group predict calls against one batched, cached predict."""
+    import core
+    model = _synthetic_model()
+    core.set_model(model)
+    rng = np.random.default_rng(1)
+    print(f"{'groups':>8} {'per-group (s)':>14} {'batched (s)':>12} {'cached (s)':>11} {'speedup':>8}")
+    for n in sizes:
+        runtimes = rng.exponential(3600, n)
+
+        def per_group():
+            return [model.predict([[r]])[0] for r in runtimes]
+
+        def batched():
+            core._prediction_cache.clear()
+            return core.predict_priorities(runtimes)
+
+        expected = np.asarray(per_group(), dtype=np.float64)
+        tolerance = core.PREDICTION_CACHE_TOLERANCE
+        core.PREDICTION_CACHE_TOLERANCE = 0
+        exact = core.predict_priorities(runtimes)
+        core.PREDICTION_CACHE_TOLERANCE = tolerance
+        assert np.array_equal(exact, expected), "batched predictions differ from per-group"
+
+        t_loop = _time_call(per_group, repeat=1)
+        t_batch = _time_call(batched)
+        core.predict_priorities(runtimes)
+        t_cached = _time_call(lambda: core.predict_priorities(runtimes))
+        print(f"{n:>8} {t_loop:>14.4f} {t_batch:>12.4f} {t_cached:>11.4f} {t_loop / t_batch:>7.1f}x")
+
+
+def bench_table(sizes=(100, 1000, 10000)):
+    """Compare XGBoost predict against the compiled threshold table."""
+    import pickle
+    from model_table import compile_model, parity_runtimes, verify_table
+    model = _synthetic_model()
+    table = compile_model(model)
+    diff = verify_table(model, table, parity_runtimes(table, 0, 40000))
+    assert diff <= 1e-4, f"table differs from model by {diff:g}"
+    print(f"model pickle: {len(pickle.dumps(model)) / 1024:.1f} KiB, "
+          f"table: {table.nbytes / 1024:.2f} KiB ({len(table.thresholds)} thresholds), "
+          f"max parity diff {diff:g}")
+    rng = np.random.default_rng(2)
+    print(f"{'groups':>8} {'xgboost (s)':>12} {'table (s)':>10} {'speedup':>8}")
+    for n in sizes:
+        runtimes = rng.exponential(3600, n).reshape(-1, 1)
+        t_model = _time_call(lambda: model.predict(runtimes))
+        t_table = _time_call(lambda: table.predict(runtimes))
+        print(f"{n:>8} {t_model:>12.5f} {t_table:>10.5f} {t_model / t_table:>7.1f}x")
+
+
+def bench_labeling(sizes=(10000, 100000, 1000000)):
+    """Compare the per-process labelling loop with the vectorized labels and the sketch."""
+    from labeling import QuantileSketch, DECILES, decile_thresholds, label_runtimes
+
+    def loop_labels(runtimes):
+        thresholds = [np.percentile(runtimes, p) for p in range(10, 100, 10)]
+        labels = []
+        for runtime in runtimes.tolist():
+            priority = 1
+            for i, thresh in enumerate(thresholds):
+                if runtime >= thresh:
+                    priority = i + 2
+            labels.append(min(priority, 10))
+        return labels
+
+    rng = np.random.default_rng(3)
+    print(f"{'rows':>8} {'loop (s)':>9} {'vector (s)':>11} {'sketch (s)':>11} {'speedup':>8} "
+          f"{'sketch agree':>13}")
+    for n in sizes:
+        runtimes = rng.lognormal(7, 2, n)
+        exact = label_runtimes(runtimes, decile_thresholds(runtimes))
+        assert exact.tolist() == loop_labels(runtimes), "vectorized labels differ from the loop"
+
+        def sketched():
+            sketch = QuantileSketch()
+            for chunk in np.array_split(runtimes, 10):
+                sketch.add(chunk)
+            return label_runtimes(runtimes, sketch.percentiles(DECILES))
+
+        t_loop = _time_call(lambda: loop_labels(runtimes), repeat=1)
+        t_vector = _time_call(lambda: label_runtimes(runtimes, decile_thresholds(runtimes)))
+        t_sketch = _time_call(sketched)
+        agree = np.mean(sketched() == exact)
+        print(f"{n:>8} {t_loop:>9.4f} {t_vector:>11.4f} {t_sketch:>11.4f} "
+              f"{t_loop / t_vector:>7.1f}x {agree:>12.2%}")
+
+
+def _synthetic_snapshot(n_processes, n_names, seed=0):
+    """A ProcessSnapshot of n_processes with n_names distinct names."""
+    from snapshot import ProcessSnapshot
+    rng = np.random.default_rng(seed)
+    now = time.time()
+    names = [f"app-{i % n_names}-{'helper' if i % n_names % 7 == 0 else 'main'}"
+             for i in range(n_processes)]
+    return ProcessSnapshot(
+        now, np.arange(1000, 1000 + n_processes), names,
+        now - rng.exponential(3600, n_processes),
+        np.where(rng.random(n_processes) < 0.3, 0, 1000),
+        rng.exponential(0.5, n_processes), rng.integers(1 << 20, 64 << 20, n_processes),
+    )
+
+
+def bench_policy(n_processes=10000, n_patterns=300):
+    """Compare per-process pattern scans with the compiled, memoized idle policy."""
+    import re
+    from policy import REGEX_PREFIX, IdlePolicy
+    rng = np.random.default_rng(4)
+    patterns = [f"app-{i}-" for i in rng.choice(5000, n_patterns - 2, replace=False)]
+    patterns += ["helper", r"re:^daemon\d+$"]
+    policy_args = dict(user_uid_threshold=1000, idle_time_threshold=60, memory_threshold_mb=20)
+
+    compiled = [re.compile(p[len(REGEX_PREFIX):] if p.startswith(REGEX_PREFIX) else re.escape(p),
+                           re.IGNORECASE) for p in patterns]
+
+    def naive(snapshot):
+        rows = []
+        for row in range(len(snapshot)):
+            name = snapshot.names[row].lower()
+            if snapshot.uids[row] < 1000 or any(p.search(name) for p in compiled):
+                continue
+            if snapshot.rss[row] > 20 * 1024 * 1024 or snapshot.timestamp - snapshot.create_times[row] < 60:
+                continue
+            rows.append(row)
+        return rows
+
+    print(f"{'names':>8} {'patterns':>9} {'naive (s)':>10} {'cold (s)':>9} {'warm (s)':>9} {'speedup':>8}")
+    for n_names in (500, n_processes):
+        snapshot = _synthetic_snapshot(n_processes, n_names)
+        expected = naive(snapshot)
+        assert IdlePolicy(whitelist=patterns, **policy_args).screen(snapshot)[0] == expected, \
+            "policy decisions differ from the naive scan"
+        warm = IdlePolicy(whitelist=patterns, **policy_args)
+        warm.screen(snapshot)
+        t_naive = _time_call(lambda: naive(snapshot), repeat=1)
+        t_cold = _time_call(lambda: IdlePolicy(whitelist=patterns, **policy_args).screen(snapshot))
+        t_warm = _time_call(lambda: warm.screen(snapshot))
+        print(f"{n_names:>8} {n_patterns:>9} {t_naive:>10.4f} {t_cold:>9.4f} {t_warm:>9.4f} "
+              f"{t_naive / t_warm:>7.1f}x")
+
+
+def make_proc_fixture(root, n_processes, seed=0):
+    """Write a synthetic Linux /proc tree with `n_processes` processes under root."""
+    import os
+    rng = np.random.default_rng(seed)
+    with open(os.path.join(root, "stat"), "w") as f:
+        f.write("cpu  1000 0 1000 100000 0 0 0 0 0 0\nbtime 1700000000\n")
+    for i in range(n_processes):
+        pid = 1000 + i
+        name = f"proc-{i % 200}"
+        proc_dir = os.path.join(root, str(pid))
+        os.mkdir(proc_dir)
+        utime, stime = rng.integers(0, 100000, 2)
+        starttime = int(rng.integers(100, 10000000))
+        with open(os.path.join(proc_dir, "stat"), "w") as f:
+            f.write(f"{pid} ({name}) S 1 {pid} {pid} 0 -1 4194560 100 0 0 0 "
+                    f"{utime} {stime} 0 0 20 0 1 0 {starttime} 100000000 2000 "
+                    + " ".join(["0"] * 30) + "\n")
+        with open(os.path.join(proc_dir, "statm"), "w") as f:
+            f.write(f"25000 {int(rng.integers(100, 50000))} 1000 100 0 5000 0\n")
+        with open(os.path.join(proc_dir, "status"), "w") as f:
+            uid = 1000 if i % 3 else 0
+            f.write(f"Name:\t{name}\nState:\tS (sleeping)\nPid:\t{pid}\nPPid:\t1\n"
+                    f"Uid:\t{uid}\t{uid}\t{uid}\t{uid}\nGid:\t{uid}\t{uid}\t{uid}\t{uid}\n"
+                    "Threads:\t1\n")
+        with open(os.path.join(proc_dir, "cmdline"), "w") as f:
+            f.write(f"/usr/bin/{name}\0")
+
+
+def bench_procfs(sizes=(500, 5000)):
+    """Compare the /proc fast path against the psutil collector on a fixture /proc tree."""
+    import tempfile
+    import psutil
+    from procfs import ProcfsCollector
+    from snapshot import ProcessHandleCache
+    print(f"{'procs':>8} {'psutil (s)':>11} {'procfs (s)':>11} {'speedup':>8}")
+    default_root = psutil.PROCFS_PATH
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as root:
+            make_proc_fixture(root, n)
+            psutil.PROCFS_PATH = root
+            try:
+                handle_cache = ProcessHandleCache()
+                procfs_collector = ProcfsCollector(root)
+                slow = handle_cache.collect()
+                fast = procfs_collector.collect()
+                def rows(snap):
+                    return sorted(zip(snap.pids.tolist(), snap.names, snap.uids.tolist(), snap.rss.tolist()))
+                assert rows(slow) == rows(fast), "procfs snapshot differs from psutil"
+                t_psutil = _time_call(handle_cache.collect)
+                t_procfs = _time_call(procfs_collector.collect)
+            finally:
+                psutil.PROCFS_PATH = default_root
+        print(f"{n:>8} {t_psutil:>11.4f} {t_procfs:>11.4f} {t_psutil / t_procfs:>7.1f}x")
+
+
+def _offscreen_table():
+    """A process table view rendered offscreen, or None without PyQt5."""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    try:
+        from PyQt5.QtWidgets import QApplication, QTableView
+        from process_table import ACTION_COLUMN, CloseButtonDelegate, ProcessTableModel, create_proxy_model
+    except ImportError:
+        return None
+    app = QApplication.instance() or QApplication([])
+    model = ProcessTableModel()
+    proxy = create_proxy_model(model)
+    view = QTableView()
+    view.setModel(proxy)
+    view.setSortingEnabled(True)
+    view.setItemDelegateForColumn(ACTION_COLUMN, CloseButtonDelegate(view))
+    view.resize(1000, 700)
+    view.show()
+    return app, model, view
+
+
+# A full-churn refresh of REFRESH_SIZES[-1] groups may take at most this many
+# times as long as one of REFRESH_SIZES[0] groups
+REFRESH_SIZES = (50, 500, 5000)
+REFRESH_MAX_RATIO = 10
+
+
+def _refresh_groups(n, step):
+    """n process groups whose every column changes from one step to the next."""
+    rng = np.random.default_rng(step)
+    cpu = rng.random(n) * 100
+    return [{"name": f"proc-{i}", "pids": [i], "count": 1 + (i + step) % 7, "runtime": 60.0 * i + step,
+             "priority": float((i + step) % 10), "cpu": float(cpu[i]), "mem": 10.0 + i + step}
+            for i in range(n)]
+
+
+def bench_refresh(sizes=REFRESH_SIZES, steps=5):
+    """
+    Time a table refresh where every row changes while the view is sorted by
+    CPU, and check that it grows no faster than REFRESH_MAX_RATIO from the
+    smallest to the largest size. Returns {metric: best seconds}.
+    """
+    table = _offscreen_table()
+    if table is None:
+        print("PyQt5 not available; skipping")
+        return {}
+    from process_table import COLUMNS
+    app, model, view = table
+    view.sortByColumn(COLUMNS.index("CPU (%)"), 1)
+    results = {}
+    for n in sizes:
+        model.apply([])
+        model.apply(_refresh_groups(n, 0))
+        app.processEvents()
+        timings = []
+        for step in range(1, steps + 1):
+            groups = _refresh_groups(n, step)
+            start = time.perf_counter()
+            model.apply(groups)
+            app.processEvents()
+            timings.append(time.perf_counter() - start)
+        results[f"refresh_{n}"] = min(timings)
+        print(f"{n:>8} groups: {min(timings):.4f}s")
+    ratio = results[f"refresh_{sizes[-1]}"] / results[f"refresh_{sizes[0]}"]
+    print(f"{sizes[-1]}/{sizes[0]} ratio: {ratio:.1f} (max {REFRESH_MAX_RATIO})")
+    assert ratio <= REFRESH_MAX_RATIO, f"refresh of {sizes[-1]} groups is {ratio:.1f}x that of {sizes[0]}"
+    return results
+
+
+def bench_scale(sizes=(100, 1000, 10000, 50000), steps=5):
+    """
+    Time the hot paths on synthetic process tables (fake_procs), with churn
+    between refreshes: snapshot collection, get_process_list, the offscreen
+    Qt table update, get_ml_suggestions and a dry-run clean_memory.
+    Returns {metric: best seconds}.
+    """
+    import core
+    import optimizer
+    from fake_procs import FakeProcessSource
+    from model_table import PriorityTable
+    from reclaim import ReclaimEstimator
+    import reclaim
+
+    core.set_model(PriorityTable(np.linspace(60, 86400, 64), np.linspace(1, 10, 65)))
+    optimizer.DRY_RUN = True
+    table = _offscreen_table()
+    if table is None:
+        print("PyQt5 not available; skipping the table update timings")
+    results = {}
+    print(f"{'procs':>8} {'collect':>9} {'list':>9} {'table':>9} {'suggest':>9} {'clean':>9}")
+    for n in sizes:
+        source = FakeProcessSource(n_processes=n, n_names=max(10, n // 10), churn=0.05,
+                                   access_denied_rate=0.02, seed=n)
+        # A fresh estimator per size, so cached readings don't leak between runs
+        reclaim._estimator = ReclaimEstimator(reader=source.read_memory)
+        timings = {"collect": [], "list": [], "table": [], "suggest": [], "clean": []}
+        for _ in range(steps):
+            start = time.perf_counter()
+            snapshot = source.collect()
+            timings["collect"].append(time.perf_counter() - start)
+            def process_list():
+                snapshot._groups = None  # Include the grouping cached on the snapshot
+                return core.get_process_list(snapshot)
+            timings["list"].append(_time_call(process_list))
+            processes = process_list()
+            if table is not None:
+                app, model, view = table
+                start = time.perf_counter()
+                model.apply(processes)
+                view.sortByColumn(3, 0)
+                app.processEvents()
+                view.viewport().grab()
+                timings["table"].append(time.perf_counter() - start)
+            timings["suggest"].append(_time_call(lambda: core.get_ml_suggestions(snapshot)))
+            timings["clean"].append(_time_call(lambda: optimizer.clean_memory(snapshot, cpu_window=0)))
+        best = {name: min(values) for name, values in timings.items() if values}
+        results.update({f"{name}_{n}": value for name, value in best.items()})
+        print(f"{n:>8} " + " ".join(
+            f"{best[name]:>9.4f}" if name in best else f"{'-':>9}"
+            for name in ("collect", "list", "table", "suggest", "clean")))
+    return results
+
+
+def bench_agents(sizes=(1, 10, 30), n_processes=500, duration=3.0, interval=0.5):
+    """
+    Run n agents with synthetic process tables on localhost, all subscribed
+    by one aggregator: wire bytes of a keyframe and per received tick, and
+    the console's CPU time per tick. Checks every host's merged view matches
+    its agent once they stop. Returns {metric: seconds}.
+    """
+    import threading
+    import agent
+    import core
+    from fake_procs import FakeProcessSource
+    from model_table import PriorityTable
+
+    core.set_model(PriorityTable(np.linspace(60, 86400, 64), np.linspace(1, 10, 65)))
+    results = {}
+    print(f"{'agents':>7} {'keyframe B':>11} {'B/tick':>8} {'ticks':>6} {'console ms/tick':>16}")
+    for n in sizes:
+        servers, threads = [], []
+        for i in range(n):
+            source = FakeProcessSource(n_processes=n_processes, n_names=n_processes // 10,
+                                       churn=0.02, interval=interval, seed=i)
+            server = agent.Agent(port=0, interval=interval, source=source.collect, name=f"host{i}")
+            server.start()
+            servers.append(server)
+            threads.append(threading.Thread(target=server.run, daemon=True))
+            threads[-1].start()
+        ticks = 0
+        def on_change(remote):
+            nonlocal ticks
+            ticks += 1
+        aggregator = agent.Aggregator([f"127.0.0.1:{s.address[1]}" for s in servers], on_change=on_change)
+        start = time.thread_time()
+        aggregator.run(duration)
+        console = time.thread_time() - start
+        received = aggregator.bytes_received
+        keyframe = len(servers[0].encoder.keyframe())
+        for server in servers:
+            server.stop()
+        for thread in threads:
+            thread.join()
+        aggregator.run(0.2)  # Drain the last ticks
+        aggregator.close()
+        for server, remote in zip(servers, aggregator.remotes):
+            assert remote.decoder.seq == server.encoder.seq, f"{remote.name} missed ticks"
+            assert len(remote.decoder.groups) == len(server.groups), f"{remote.name} out of sync"
+        per_tick = console / max(ticks, 1)
+        results[f"console_per_tick_{n}"] = per_tick
+        print(f"{n:>7} {keyframe:>11} {received // max(ticks, 1):>8} {ticks:>6} {per_tick * 1000:>16.3f}")
+    return results
+
+
+def bench_pressure(poll_interval=0.02, trials=5, idle_seconds=1.0):
+    """
+    Reaction time of the pressure watcher to fake PSI and memory.events
+    files (polled), and its idle CPU use with a real PSI trigger where the
+    kernel has one. Reaction times depend on where in the poll interval the
+    write lands, so only the idle CPU time is returned for regression checks.
+    """
+    import os
+    import tempfile
+    import threading
+    import pressure
+
+    with tempfile.TemporaryDirectory() as root:
+        psi_path = os.path.join(root, "memory")
+        events_path = os.path.join(root, "memory.events")
+        pressure.write_fake_psi(psi_path)
+        pressure.write_fake_memory_events(events_path)
+        tripped = threading.Event()
+        sources = []
+
+        def on_pressure(event):
+            sources.append(event["source"])
+            tripped.set()
+
+        watcher = pressure.PressureWatcher(on_pressure, psi_path=psi_path, cgroup_events=events_path,
+                                           poll_interval=poll_interval, cooldown=0)
+        watcher.start()
+        latencies = {"psi": [], "cgroup": []}
+        for i in range(trials):
+            for kind in latencies:
+                tripped.clear()
+                start = time.perf_counter()
+                if kind == "psi":
+                    pressure.write_fake_psi(psi_path, some_avg10=50.0)
+                else:
+                    pressure.write_fake_memory_events(events_path, high=i + 1)
+                assert tripped.wait(5), f"no event for fake {kind} pressure"
+                latencies[kind].append(time.perf_counter() - start)
+                pressure.write_fake_psi(psi_path)
+                time.sleep(2 * poll_interval)  # Let the reading settle below the threshold
+        watcher.stop()
+        assert set(sources) == {"poll"}, sources
+    for kind, values in latencies.items():
+        print(f"fake {kind} pressure: reacted in {min(values) * 1000:.1f} ms "
+              f"(polling every {poll_interval * 1000:.0f} ms)")
+
+    watcher = pressure.PressureWatcher(lambda event: None, cgroup_events="auto")
+    watcher.start()
+    time.sleep(0.1)
+    start = time.process_time()
+    time.sleep(idle_seconds)
+    idle = time.process_time() - start
+    watcher.stop()
+    print(f"{watcher.mode} mode: {idle * 1000:.2f} ms CPU over {idle_seconds:.0f}s idle")
+    return {"idle_cpu": idle}
+
+
+def check_regressions(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """Return descriptions of metrics slower than the baseline beyond the threshold."""
+    regressions = []
+    for bench, metrics in results.items():
+        for metric, value in metrics.items():
+            old = baseline.get(bench, {}).get(metric)
+            if not isinstance(value, (int, float)) or not isinstance(old, (int, float)):
+                continue  # Missing from the baseline, or a recorded failure
+            if value > old * (1 + threshold) and value - old > REGRESSION_MIN_SECONDS:
+                regressions.append(f"{bench}.{metric}: {value:.4f}s vs {old:.4f}s "
+                                   f"(+{(value / old - 1) * 100:.0f}%)")
+    return regressions
+
+
+# Cold start budget for `cli.py list`, in seconds on top of a cold `import numpy`
+STARTUP_BUDGET = 0.08
+HEAVY_MODULES = ("PyQt5", "xgboost", "pandas", "sklearn", "joblib")
+
+
+def bench_startup(repeat=5):
+    """
+    Time a cold `cli.py list` (imports plus one listing) in fresh interpreters
+    and guard the startup budget. Interpreter boot and importing numpy are
+    reported but not budgeted: they do not depend on this code, and numpy
+    alone takes most of the time, so an absolute budget would mostly measure
+    the machine.
+    """
+    import os
+    import subprocess
+    import sys
+    import tempfile
+    backend = os.path.dirname(os.path.abspath(__file__))
+    program = (
+        "import time; start = time.perf_counter()\n"
+        "import sys, cli; cli.main(['list', '--limit', '0'])\n"
+        "elapsed = time.perf_counter() - start\n"
+        f"heavy = [m for m in {HEAVY_MODULES!r} if m in sys.modules]\n"
+        "print(f'STARTUP {elapsed} {\",\".join(heavy)}')\n"
+    )
+    numpy_program = (
+        "import time; start = time.perf_counter()\n"
+        "import numpy\n"
+        "print(f'STARTUP {time.perf_counter() - start}')\n"
+    )
+    env = dict(os.environ, PYTHONPATH=backend)
+    in_process, total, numpy_only = [], [], []
+    with tempfile.TemporaryDirectory() as cwd:
+        # Score with a compiled model table, as a trained install would
+        thresholds = np.linspace(60, 86400, 64, dtype=np.float32)
+        np.savez(os.path.join(cwd, "ml_model_table.npz"), thresholds=thresholds,
+                 values=np.linspace(1, 10, 65, dtype=np.float32))
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = subprocess.run([sys.executable, "-c", program], cwd=cwd, env=env,
+                                    capture_output=True, text=True, check=True)
+            total.append(time.perf_counter() - start)
+            fields = result.stdout.strip().splitlines()[-1].split(" ")
+            in_process.append(float(fields[1]))
+            heavy = fields[2] if len(fields) > 2 else ""
+            result = subprocess.run([sys.executable, "-c", numpy_program], cwd=cwd, env=env,
+                                    capture_output=True, text=True, check=True)
+            numpy_only.append(float(result.stdout.split()[-1]))
+    best = min(in_process)
+    overhead = best - min(numpy_only)
+    print(f"cold list (best of {repeat}): {best:.3f}s in-process, {min(total):.3f}s with interpreter "
+          f"boot; {overhead:.3f}s over importing numpy ({min(numpy_only):.3f}s), "
+          f"budget {STARTUP_BUDGET:.3f}s")
+    assert not heavy, f"headless listing imported heavy modules: {heavy}"
+    assert overhead <= STARTUP_BUDGET, f"cold start overhead {overhead:.3f}s exceeds {STARTUP_BUDGET:.3f}s"
+    return {"cold_list": best, "cold_list_overhead": overhead}
+
+
+BENCHMARKS = {
+    "predict": bench_predict,
+    "procfs": bench_procfs,
+    "table": bench_table,
+    "refresh": bench_refresh,
+    "labeling": bench_labeling,
+    "policy": bench_policy,
+    "scale": bench_scale,
+    "agents": bench_agents,
+    "pressure": bench_pressure,
+    "startup": bench_startup,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks for the system optimizer hot paths.")
+    parser.add_argument("names", nargs="*",
+                        help=f"Benchmarks to run (default: all): {', '.join(BENCHMARKS)}")
+    parser.add_argument("--json", help="Write the recorded timings to this JSON file")
+    parser.add_argument("--baseline", help="Fail if timings regress against this JSON file")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="Allowed slowdown against the baseline (default: %(default)s)")
+    args = parser.parse_args()
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+    results = {}
+    failed = []
+    for name in args.names or BENCHMARKS:
+        print(f"== {name} ==")
+        try:
+            metrics = BENCHMARKS[name]()
+        except Exception as e:
+            # Keep going so one broken benchmark doesn't hide the others' timings
+            traceback.print_exc()
+            failed.append(name)
+            results[name] = {"error": f"{type(e).__name__}: {e}"}
+            continue
+        if metrics:
+            results[name] = metrics
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = check_regressions(results, json.load(f), args.threshold)
+        if regressions:
+            print("Regressions:\n  " + "\n  ".join(regressions))
+        else:
+            print(f"No regressions beyond {args.threshold:.0%} of the baseline.")
+    if failed:
+        print(f"Failed: {', '.join(failed)}")
+    if failed or regressions:
+        sys.exit(1)
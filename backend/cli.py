@@ -0,0 +1,379 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+# Only Qt-free, lightweight modules are imported here; the model and the
+# training stack are loaded lazily by the commands that need them.
+import core
+import instrumentation
+from snapshot import take_snapshot
+
+SORT_KEYS = {
+    "priority": (lambda g: g["priority"], False),
+    "name": (lambda g: g["name"].lower(), False),
+    "cpu": (lambda g: g["cpu"], True),
+    "mem": (lambda g: g["mem"], True),
+}
+
+
+def _print_groups(groups, as_json):
+    if as_json:
+        json.dump(groups, sys.stdout)
+        sys.stdout.write("\n")
+        return
+    print(f"{'Count':>5}  {'Process Name':<32} {'Runtime (s)':>12} {'Priority':>8} "
+          f"{'CPU (%)':>8} {'Memory (MB)':>12}")
+    for g in groups:
+        print(f"{g['count']:>5}  {g['name'][:32]:<32} {g['runtime']:>12.1f} {g['priority']:>8.2f} "
+              f"{g['cpu']:>8.1f} {g['mem']:>12.1f}")
+
+
+def cmd_list(args):
+    """List aggregated process groups."""
+    groups = core.get_process_list()
+    if args.search:
+        query = args.search.lower()
+        groups = [g for g in groups if query in g["name"].lower()]
+    key, reverse = SORT_KEYS[args.sort]
+    groups.sort(key=key, reverse=reverse != args.reverse)
+    if args.limit is not None:
+        groups = groups[:args.limit]
+    _print_groups(groups, args.json)
+
+
+def cmd_suggest(args):
+    """Print ML suggestions of process groups to close."""
+    suggestions = core.get_ml_suggestions()[:args.limit]
+    if args.json:
+        json.dump(suggestions, sys.stdout)
+        sys.stdout.write("\n")
+        return
+    for s in suggestions:
+        freed = f"~{s['reclaim_mb']:.1f} MB" if s["reclaim_mb"] is not None else "not measured"
+        print(f"Close '{s['name']}' ({s['count']} instances): CPU {s['total_cpu']:.1f}% | "
+              f"RSS {s['total_mem']:.1f} MB | Frees {freed} | Priority {s['priority']:.2f}")
+
+
+def _configure_logging(args):
+    # Logs go to stderr, keeping stdout for results; importing logging is left to the commands using it
+    import logging
+    logging.basicConfig(level=args.log_level.upper(), stream=sys.stderr,
+                        format="%(levelname)s %(name)s: %(message)s")
+
+
+def cmd_clean(args):
+    """Run the RAM optimizer."""
+    _configure_logging(args)
+    import optimizer
+    if args.terminate:
+        optimizer.DRY_RUN = False
+    result = optimizer.clean_memory(cpu_window=args.cpu_window)
+    if args.json:
+        json.dump(result, sys.stdout)
+        sys.stdout.write("\n")
+
+
+def cmd_retrain(args):
+    """Retrain the model; this is the only command importing the training stack."""
+    import train_model
+    train_model.train_model(incremental=args.incremental)
+
+
+def cmd_collect(args):
+    """Stream training samples to the sample store until interrupted."""
+    from collect_training_data import StreamingCollector, export_training_csv
+    collector = StreamingCollector(interval=args.interval)
+    try:
+        collector.run(duration=args.duration)
+    except KeyboardInterrupt:
+        pass
+    if args.export:
+        export_training_csv(collector.store)
+
+
+def cmd_daemon(args):
+    """Periodically scan, rank and (optionally) optimize, writing JSON lines."""
+    _configure_logging(args)
+    import psutil
+    import optimizer
+    from scheduler import RefreshScheduler, MIN_INTERVAL
+    scheduler = RefreshScheduler(base_interval=args.interval,
+                                 min_interval=min(MIN_INTERVAL, args.interval),
+                                 cpu_budget=args.cpu_budget)
+    out = open(args.output, "a") if args.output else sys.stdout
+    last_clean = time.monotonic()
+    try:
+        while True:
+            started = time.thread_time()
+            snapshot = take_snapshot()
+            suggestions = core.get_ml_suggestions(snapshot)[:args.limit]
+            record = {
+                "timestamp": snapshot.timestamp,
+                "processes": len(snapshot),
+                "suggestions": [
+                    {k: s[k] for k in ("name", "count", "total_cpu", "total_mem", "reclaim_mb", "priority", "score")}
+                    for s in suggestions
+                ],
+            }
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+            if args.metrics_out:
+                instrumentation.export(args.metrics_out)
+            if args.clean_interval and time.monotonic() - last_clean >= args.clean_interval:
+                # The shared collector has been sampling, so its CPU column is valid
+                optimizer.clean_memory(snapshot, cpu_window=0)
+                last_clean = time.monotonic()
+            scheduler.record_cost(time.thread_time() - started)
+            scheduler.set_memory_percent(psutil.virtual_memory().percent)
+            time.sleep(scheduler.next_interval())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+def cmd_pressure(args):
+    """Wait for memory pressure and react to it, writing one JSON line per event."""
+    _configure_logging(args)
+    import pressure
+    if args.terminate:
+        import optimizer
+        optimizer.DRY_RUN = False
+
+    def on_pressure(event):
+        record = {"event": event, "result": pressure.respond(args.action, args.limit)}
+        print(json.dumps(record), flush=True)
+
+    watcher = pressure.PressureWatcher(
+        on_pressure, psi_path=args.psi, cgroup_events=args.cgroup or "auto",
+        stall_us=int(args.stall_ms * 1000), window_us=int(args.window_ms * 1000),
+        poll_interval=args.poll_interval, cooldown=args.cooldown,
+        use_triggers=False if args.poll else None)
+    watcher.start()
+    try:
+        if args.duration is not None:
+            time.sleep(args.duration)
+        else:
+            while True:
+                time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.stop()
+
+
+def _agent_token(args):
+    # Read from the environment by default, so the token doesn't show up in ps
+    return args.token or os.environ.get("SYSOPT_AGENT_TOKEN")
+
+
+def cmd_agent(args):
+    """Publish this machine's process groups to consoles until interrupted."""
+    _configure_logging(args)
+    import agent
+    import optimizer
+    if args.terminate:
+        optimizer.DRY_RUN = False
+    source = take_snapshot
+    if args.fake:
+        from fake_procs import FakeProcessSource
+        source = FakeProcessSource(n_processes=args.fake, n_names=max(10, args.fake // 10),
+                                   interval=args.interval).collect
+    server = agent.Agent(args.bind, args.port, args.interval, source, name=args.name,
+                         token=_agent_token(args), allow_commands=not args.read_only)
+    try:
+        host, port = server.start()
+    except ValueError as e:
+        sys.exit(f"Agent {e}; set --token or $SYSOPT_AGENT_TOKEN")
+    print(f"Agent {server.name} listening on {host}:{port}"
+          + ("" if server.token is not None else " (read-only: no token set)"), file=sys.stderr)
+    try:
+        server.run()
+    except KeyboardInterrupt:
+        pass
+
+
+def cmd_watch(args):
+    """Subscribe to agents and print their merged process groups."""
+    import agent
+    aggregator = agent.Aggregator(args.agents, token=_agent_token(args))
+    key, reverse = SORT_KEYS[args.sort]
+    try:
+        while True:
+            aggregator.run(args.interval)
+            hosts = aggregator.hosts()
+            groups = sorted(aggregator.merged(), key=key, reverse=reverse)
+            if args.json:
+                print(json.dumps({"timestamp": time.time(), "hosts": hosts, "groups": groups}), flush=True)
+                continue
+            for h in hosts:
+                state = (f"CPU {h['cpu_usage']:.1f}% | RAM {h['ram_usage']:.1f}% | {h['groups']} groups"
+                         if h["seq"] is not None else "waiting" if h["connected"] else "unreachable")
+                print(f"== {h['host']} ({h['endpoint']}): {state}")
+            print(f"{'Host':<20} {'Count':>5}  {'Process Name':<32} {'Priority':>8} "
+                  f"{'CPU (%)':>8} {'Memory (MB)':>12}")
+            for g in groups[:args.limit]:
+                print(f"{g['host'][:20]:<20} {g['count']:>5}  {g['name'][:32]:<32} {g['priority']:>8.2f} "
+                      f"{g['cpu']:>8.1f} {g['mem']:>12.1f}")
+            print(flush=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        aggregator.close()
+
+
+def cmd_remote(args):
+    """Send close or optimize to one agent and print its result."""
+    import agent
+    if args.action == "close" and not args.name:
+        sys.exit("close needs the name of a process group")
+    aggregator = agent.Aggregator([args.agent], token=_agent_token(args))
+    remote = aggregator.remotes[0]
+    deadline = time.monotonic() + args.timeout
+    try:
+        while not remote.ready and time.monotonic() < deadline:
+            aggregator.poll(0.1)
+        if not remote.ready:
+            sys.exit(f"Could not connect to agent {remote.label}")
+        request_id = aggregator.command(remote.label, args.action, args.name or "")
+        while request_id not in aggregator.results and time.monotonic() < deadline:
+            aggregator.poll(0.1)
+    finally:
+        aggregator.close()
+    result = aggregator.results.get(request_id)
+    if result is None:
+        sys.exit(f"No result from agent {remote.label} within {args.timeout}s")
+    json.dump(result, sys.stdout)
+    sys.stdout.write("\n")
+    if not result.get("ok"):
+        sys.exit(1)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Headless system optimizer (no Qt required).")
+    parser.add_argument("--log-level", default="info",
+                        choices=["debug", "info", "warning", "error"],
+                        help="Logging level (debug also lists every skipped process)")
+    parser.add_argument("--policy", help="Idle policy config for the optimizer (default: idle_policy.json)")
+    parser.add_argument("--instrument", action="store_true",
+                        help="Time the hot paths and print a summary to stderr when done")
+    parser.add_argument("--metrics-out",
+                        help="Export timings here (*.prom: Prometheus text, else JSON lines); "
+                             "implies --instrument")
+    parser.add_argument("--profile", help="Run the command under cProfile and write its stats here")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("list", help="List aggregated process groups")
+    p.add_argument("--sort", choices=list(SORT_KEYS), default="priority")
+    p.add_argument("--reverse", action="store_true", help="Reverse the sort order")
+    p.add_argument("--search", help="Only show names containing this text")
+    p.add_argument("--limit", type=int)
+    p.add_argument("--json", action="store_true")
+    p.set_defaults(func=cmd_list)
+
+    p = sub.add_parser("suggest", help="Show ML suggestions of groups to close")
+    p.add_argument("--limit", type=int, default=10)
+    p.add_argument("--json", action="store_true")
+    p.set_defaults(func=cmd_suggest)
+
+    p = sub.add_parser("clean", help="Run the RAM optimizer (dry run by default)")
+    p.add_argument("--terminate", action="store_true", help="Actually terminate idle processes")
+    p.add_argument("--cpu-window", type=float, default=1.0,
+                   help="Seconds to measure candidates' CPU usage over")
+    p.add_argument("--json", action="store_true", help="Print the result as JSON")
+    p.set_defaults(func=cmd_clean)
+
+    p = sub.add_parser("retrain", help="Retrain the ML model")
+    p.add_argument("--incremental", action="store_true",
+                   help="Continue boosting the current model on new samples (or a changed CSV)")
+    p.set_defaults(func=cmd_retrain)
+
+    p = sub.add_parser("collect", help="Stream training samples to disk")
+    p.add_argument("--interval", type=float, default=5.0, help="Seconds between samples")
+    p.add_argument("--duration", type=float, help="Stop after this many seconds")
+    p.add_argument("--export", action="store_true", help="Write training_data.csv when done")
+    p.set_defaults(func=cmd_collect)
+
+    p = sub.add_parser("daemon", help="Run continuously, writing suggestions as JSON lines")
+    p.add_argument("--interval", type=float, default=10.0,
+                   help="Seconds between scans (shorter under memory pressure)")
+    p.add_argument("--cpu-budget", type=float, default=0.02,
+                   help="Fraction of one core scans may use; stretches the interval when exceeded")
+    p.add_argument("--limit", type=int, default=5, help="Suggestions per record")
+    p.add_argument("--clean-interval", type=float, default=0,
+                   help="Seconds between optimizer runs (0 disables)")
+    p.add_argument("--output", help="Append records to this file instead of stdout")
+    p.set_defaults(func=cmd_daemon)
+
+    p = sub.add_parser("pressure", help="Suggest or optimize when the kernel reports memory pressure")
+    p.add_argument("--action", choices=["suggest", "clean"], default="suggest",
+                   help="Rank suggestions, or run the policy-gated optimizer")
+    p.add_argument("--terminate", action="store_true", help="Let clean actually terminate processes")
+    p.add_argument("--limit", type=int, default=5, help="Suggestions per event")
+    p.add_argument("--stall-ms", type=float, default=150.0,
+                   help="PSI trigger: milliseconds of memory stall within the window")
+    p.add_argument("--window-ms", type=float, default=2000.0,
+                   help="PSI trigger window (a multiple of 2000 when not root)")
+    p.add_argument("--psi", default="/proc/pressure/memory", help="PSI file (a fake one is polled)")
+    p.add_argument("--cgroup", help="cgroup v2 memory.events to watch (default: this process's cgroup)")
+    p.add_argument("--poll", action="store_true", help="Poll the readings instead of using PSI triggers")
+    p.add_argument("--poll-interval", type=float, default=2.0)
+    p.add_argument("--cooldown", type=float, default=30.0, help="Seconds between reactions")
+    p.add_argument("--duration", type=float, help="Stop after this many seconds")
+    p.set_defaults(func=cmd_pressure)
+
+    p = sub.add_parser("agent", help="Publish process groups to remote consoles")
+    p.add_argument("--bind", default="127.0.0.1", help="Address to listen on")
+    p.add_argument("--port", type=int, default=7739)
+    p.add_argument("--interval", type=float, default=2.0, help="Seconds between scans")
+    p.add_argument("--name", help="Host name shown by consoles (default: this machine's)")
+    p.add_argument("--token", help="Shared secret consoles must present (default: $SYSOPT_AGENT_TOKEN); "
+                        "required for commands and for non-loopback addresses")
+    p.add_argument("--read-only", action="store_true", help="Refuse close/optimize commands")
+    p.add_argument("--terminate", action="store_true", help="Let remote optimize actually terminate processes")
+    p.add_argument("--fake", type=int, metavar="N", help="Publish N synthetic processes instead (for testing)")
+    p.set_defaults(func=cmd_agent)
+
+    p = sub.add_parser("watch", help="Show the merged process groups of several agents")
+    p.add_argument("agents", nargs="+", metavar="HOST[:PORT]")
+    p.add_argument("--interval", type=float, default=2.0, help="Seconds between prints")
+    p.add_argument("--sort", choices=list(SORT_KEYS), default="mem")
+    p.add_argument("--limit", type=int, default=20)
+    p.add_argument("--token", help="Shared secret of the agents (default: $SYSOPT_AGENT_TOKEN)")
+    p.add_argument("--json", action="store_true", help="Print one JSON line per refresh")
+    p.set_defaults(func=cmd_watch)
+
+    p = sub.add_parser("remote", help="Close a group or run the optimizer on an agent")
+    p.add_argument("agent", metavar="HOST[:PORT]")
+    p.add_argument("action", choices=["close", "optimize"])
+    p.add_argument("name", nargs="?", help="Process group to close")
+    p.add_argument("--token", help="Shared secret of the agent (default: $SYSOPT_AGENT_TOKEN)")
+    p.add_argument("--timeout", type=float, default=10.0)
+    p.set_defaults(func=cmd_remote)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.policy:
+        from policy import IdlePolicy, set_policy
+        set_policy(IdlePolicy.from_file(args.policy))
+    instrumentation.enable(args.instrument or bool(args.metrics_out))
+    try:
+        if args.profile:
+            with instrumentation.cprofile(args.profile):
+                args.func(args)
+        else:
+            args.func(args)
+    finally:
+        if args.metrics_out:
+            instrumentation.export(args.metrics_out)
+        if args.instrument:
+            print(instrumentation.summary(), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,73 +1,91 @@
-import psutil
+import argparse
 import csv
+import threading
 import time
 import numpy as np
+from labeling import label_runtimes, streaming_thresholds
+from sample_store import SampleStore
+from snapshot import create_collector, take_snapshot
 
 CSV_FILE = "training_data.csv"
 
-def collect_usage(duration=60, interval=5):
+class StreamingCollector:
     """
-    Tracks running processes over a period of 'duration' seconds,
-    sampling every 'interval' seconds. Returns a dictionary mapping
-    process names to their current runtime (in seconds).
+    Samples every process every `interval` seconds and appends each sample
+    (timestamp, pid, name, runtime, cpu, rss, io, threads) to a SampleStore.
+    Memory stays bounded by the store's chunk size however long it runs.
     """
-    usage = {}
-    start_time = time.time()
-    while time.time() - start_time < duration:
-        now = time.time()
-        for proc in psutil.process_iter(['name', 'create_time']):
-            try:
-                name = proc.info['name']
-                # Calculate runtime in seconds
-                runtime = now - proc.info['create_time']
-                usage[name] = runtime
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                continue
-        time.sleep(interval)
-    return usage
 
-def assign_priority_numeric(usage_data):
-    """
-    Assigns a numeric priority (1-10) based on process runtime percentiles.
-    Processes with longer runtimes get higher priority.
-    """
-    runtimes = np.array(list(usage_data.values()))
-    if len(runtimes) == 0:
-        return {}
-    
-    # Calculate decile thresholds: 10%, 20%, ..., 90%
-    thresholds = [np.percentile(runtimes, p) for p in range(10, 100, 10)]
-    
-    priority_dict = {}
-    for proc, runtime in usage_data.items():
-        priority = 1  # default lowest priority
-        for i, thresh in enumerate(thresholds):
-            if runtime >= thresh:
-                priority = i + 2  # i starts at 0 so add 2
-        priority = min(priority, 10)
-        priority_dict[proc] = priority
-    return priority_dict
+    def __init__(self, store=None, interval=5, collector=None):
+        self.store = store if store is not None else SampleStore()
+        self.interval = interval
+        # A dedicated collector, so I/O counters are read without slowing the UI's scans
+        self.collector = collector if collector is not None else create_collector(collect_io=True)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run(self, duration=None):
+        """Collect until stop() is called or `duration` seconds have passed."""
+        start_time = time.monotonic()
+        try:
+            while not self._stop.is_set():
+                self.store.append_snapshot(take_snapshot(self.collector))
+                if duration is not None and time.monotonic() - start_time >= duration:
+                    break
+                self._stop.wait(self.interval)
+        finally:
+            self.store.flush()
+
+    def start_background(self):
+        """Run the collector on a daemon thread (e.g. alongside the app)."""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+        return self._thread
 
-def save_training_data(usage_data, priority_data):
+    def stop(self):
+        """Stop collecting and flush what has been buffered."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+def export_training_csv(store, path=CSV_FILE):
     """
-    Writes the collected usage data to a CSV file.
+    Write every stored sample as a training row, labelled 1-10 by the decile
+    of its runtime across all samples (see labeling.streaming_thresholds).
     The CSV has columns: process_name, runtime_seconds, numeric_priority.
     """
-    with open(CSV_FILE, "w", newline="") as f:
+    thresholds = streaming_thresholds(chunk["runtime"] for chunk in store.iter_chunks(["runtime"]))
+    if thresholds is None:
+        print("No samples collected; training data not written.")
+        return
+
+    rows = 0
+    with open(path, "w", newline="") as f:
         writer = csv.writer(f)
         writer.writerow(["process_name", "runtime_seconds", "numeric_priority"])
-        for proc_name, runtime in usage_data.items():
-            priority = priority_data.get(proc_name, 0)
-            writer.writerow([proc_name, round(runtime, 1), priority])
-    print(f"Training data saved to {CSV_FILE}")
+        for chunk in store.iter_chunks(["name", "runtime"]):
+            priorities = label_runtimes(chunk["runtime"], thresholds)
+            writer.writerows(zip(chunk["name"].tolist(), np.round(chunk["runtime"], 1).tolist(),
+                                 priorities.tolist()))
+            rows += len(priorities)
+    print(f"Training data ({rows} samples) saved to {path}")
 
 def main():
-    # Track processes for 60 seconds, sampling every 5 seconds.
-    duration = 60
-    interval = 5
-    usage_data = collect_usage(duration=duration, interval=interval)
-    priority_data = assign_priority_numeric(usage_data)
-    save_training_data(usage_data, priority_data)
+    parser = argparse.ArgumentParser(description="Collect per-process training samples.")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds to collect for")
+    parser.add_argument("--interval", type=float, default=5, help="Seconds between samples")
+    parser.add_argument("--continuous", action="store_true",
+                        help="Collect until interrupted (e.g. alongside the app)")
+    args = parser.parse_args()
+
+    collector = StreamingCollector(interval=args.interval)
+    try:
+        collector.run(duration=None if args.continuous else args.duration)
+    except KeyboardInterrupt:
+        pass
+    export_training_csv(collector.store)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,179 @@
+# Qt-free process listing and ML ranking, shared by the GUI (app.py) and the
+# headless CLI/daemon (cli.py). joblib/xgboost are only imported to load a pickled
+# model when no compiled model table is available.
+import os
+import threading
+import numpy as np
+import instrumentation
+from model_table import PriorityTable, TABLE_PATH, load_table
+from snapshot import take_snapshot
+
+MODEL_PATH = "ml_model.pkl"
+
+# Predictions cached by runtime quantized on a log scale: groups whose average
+# runtime moved by less than this relative amount reuse the cached priority.
+# Set to 0 to disable the cache and always run inference.
+PREDICTION_CACHE_TOLERANCE = 0.001
+PREDICTION_CACHE_MAX_SIZE = 50000
+# Belongs to the current model: a swap replaces the dict rather than clearing
+# it, so a predict still running on the old model fills a discarded cache.
+_prediction_cache = {}
+
+# Groups predicted at or below this priority are candidates for closing
+SUGGESTION_PRIORITY_THRESHOLD = 4
+
+_model = None
+_model_loaded = False
+_model_lock = threading.Lock()
+
+
+def _load_model():
+    """
+    Prefer the compiled PriorityTable (numpy only) unless the pickled model is
+    newer; fall back to unpickling the XGBoost model with joblib.
+    """
+    has_table = os.path.exists(TABLE_PATH)
+    has_model = os.path.exists(MODEL_PATH)
+    if has_table and (not has_model or os.path.getmtime(TABLE_PATH) >= os.path.getmtime(MODEL_PATH)):
+        return load_table(TABLE_PATH)
+    if has_model:
+        import joblib
+        return joblib.load(MODEL_PATH)
+    return None
+
+
+def get_model():
+    """Return the pre-trained model, loading it on first use (None if missing)."""
+    global _model, _model_loaded
+    if not _model_loaded:
+        with _model_lock:
+            if not _model_loaded:
+                _model = _load_model()
+                _model_loaded = True
+    return _model
+
+
+def set_model(model):
+    """Replace the in-memory model and start a new prediction cache for it."""
+    global _model, _model_loaded, _prediction_cache
+    with _model_lock:
+        _model = model
+        _model_loaded = True
+        _prediction_cache = {}
+
+
+def reload_model():
+    """Reload the model from MODEL_PATH (e.g. after retraining)."""
+    model = _load_model()
+    set_model(model)
+    return model
+
+
+def _model_and_cache():
+    """The current model and the prediction cache belonging to it."""
+    get_model()
+    with _model_lock:
+        return _model, _prediction_cache
+
+
+def _model_predict(model, runtimes):
+    instrumentation.count("predict_calls")
+    instrumentation.count("predict_rows", len(runtimes))
+    return model.predict(runtimes)
+
+
+def predict_priorities(runtimes):
+    """
+    Predict priorities for an array of average runtimes with one batched
+    model call. Runtimes whose quantized value is already cached skip inference.
+    """
+    model, cache = _model_and_cache()
+    runtimes = np.asarray(runtimes, dtype=np.float64)
+    if model is None or len(runtimes) == 0:
+        return np.zeros(len(runtimes))
+    if isinstance(model, PriorityTable):
+        # A table lookup is cheaper than the cache itself
+        return _model_predict(model, runtimes).astype(np.float64)
+    if PREDICTION_CACHE_TOLERANCE <= 0:
+        return np.asarray(_model_predict(model, runtimes.reshape(-1, 1)), dtype=np.float64)
+
+    keys = np.round(np.log1p(np.maximum(runtimes, 0)) / PREDICTION_CACHE_TOLERANCE)
+    keys = keys.astype(np.int64).tolist()
+    preds = np.empty(len(runtimes))
+    misses = []
+    for i, key in enumerate(keys):
+        cached = cache.get(key)
+        if cached is None:
+            misses.append(i)
+        else:
+            preds[i] = cached
+
+    if misses:
+        if len(cache) + len(misses) > PREDICTION_CACHE_MAX_SIZE:
+            cache.clear()
+        missed = _model_predict(model, runtimes[misses].reshape(-1, 1))
+        for i, pred in zip(misses, np.asarray(missed, dtype=np.float64).tolist()):
+            preds[i] = pred
+            cache[keys[i]] = pred
+    return preds
+
+
+def get_process_list(snapshot=None):
+    """
+    Returns an aggregated list of processes grouped by name.
+    For each unique process name, computes:
+      - count: number of processes with that name
+      - avg runtime (sec)
+      - predicted priority (using the average runtime)
+      - list of process IDs (pids)
+      - total cpu (%) and memory (MB) of the group
+    All values come from a single ProcessSnapshot; one is taken if not given.
+    """
+    if snapshot is None:
+        snapshot = take_snapshot()
+    with instrumentation.phase("group"):
+        groups = snapshot.group_by_name()
+    # Score every group with a single batched predict
+    with instrumentation.phase("predict"):
+        priorities = predict_priorities(groups["runtime"])
+
+    aggregated_list = []
+    for i, name in enumerate(groups["names"]):
+        aggregated_list.append({
+            "name": name,
+            "pids": groups["pids"][i],
+            "count": int(groups["count"][i]),
+            "runtime": float(groups["runtime"][i]),
+            "priority": float(priorities[i]),
+            "cpu": float(groups["cpu"][i]),
+            "mem": float(groups["rss"][i]) / (1024 * 1024)
+        })
+    return aggregated_list
+
+
+def get_ml_suggestions(snapshot=None):
+    """
+    Build a list of candidate process groups for ML suggestion.
+    Each candidate is one with predicted priority <= SUGGESTION_PRIORITY_THRESHOLD.
+    Candidates are ranked by the memory closing them would actually free
+    (see reclaim.ReclaimEstimator); the score is that estimate in MB, or None
+    for groups too small to be measured.
+    """
+    if snapshot is None:
+        snapshot = take_snapshot()
+    suggestions = []
+    for group in get_process_list(snapshot):
+        if group["priority"] <= SUGGESTION_PRIORITY_THRESHOLD:
+            suggestions.append({
+                "name": group["name"],
+                "count": group["count"],
+                "pids": group["pids"],
+                "total_cpu": group["cpu"],
+                "total_mem": group["mem"],
+                "priority": group["priority"],
+            })
+    from reclaim import get_estimator  # Not needed to list processes; keep it off startup
+    suggestions = get_estimator().rank(suggestions, snapshot)
+    for suggestion in suggestions:
+        suggestion["score"] = suggestion["reclaim_mb"]
+    return suggestions
@@ -0,0 +1,99 @@
+import threading
+import numpy as np
+from snapshot import ProcessSnapshot
+
+# Fake pids start above Linux's largest pid_max, so psutil never finds a
+# real process behind them (lookups raise NoSuchProcess)
+FIRST_PID = 1 << 23
+
+
+class FakeProcessSource:
+    """
+    Reproducible synthetic process table with the collector interface
+    (`lock` and `collect()`), for benchmarking without the live machine.
+
+      - n_processes: processes alive at any time
+      - n_names: distinct process names (name cardinality)
+      - churn: fraction of processes replaced by new ones per collect()
+      - access_denied_rate: fraction of processes whose attributes can't be
+        read; like the real collectors, they are left out of snapshots
+      - interval: simulated seconds between collect() calls
+
+    The same seed always yields the same sequence of snapshots.
+    read_memory() can stand in for reclaim's USS/PSS readings.
+    """
+
+    def __init__(self, n_processes=1000, n_names=200, churn=0.05, access_denied_rate=0.0,
+                 interval=1.0, seed=0, start_time=1_700_000_000.0):
+        self.n_names = n_names
+        self.churn = churn
+        self.access_denied_rate = access_denied_rate
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.now = start_time
+        self._rng = np.random.default_rng(seed)
+        self._next_pid = FIRST_PID
+        self._name_pool = [f"proc-{i}" for i in range(n_names)]
+        # Popularity of names is skewed: a few names have many processes
+        weights = 1.0 / np.arange(1, n_names + 1)
+        self._name_weights = weights / weights.sum()
+
+        self.pids = np.empty(0, dtype=np.int64)
+        self.name_codes = np.empty(0, dtype=np.int64)
+        self.create_times = np.empty(0)
+        self.uids = np.empty(0, dtype=np.int64)
+        self.rss = np.empty(0, dtype=np.int64)
+        self.threads = np.empty(0, dtype=np.int32)
+        self.denied = np.empty(0, dtype=bool)
+        self._spawn(n_processes, ages=self._rng.exponential(3600, n_processes))
+
+    def __len__(self):
+        return len(self.pids)
+
+    def _spawn(self, n, ages=None):
+        rng = self._rng
+        pids = np.arange(self._next_pid, self._next_pid + n, dtype=np.int64)
+        self._next_pid += n
+        self.pids = np.concatenate([self.pids, pids])
+        self.name_codes = np.concatenate(
+            [self.name_codes, rng.choice(self.n_names, n, p=self._name_weights)])
+        self.create_times = np.concatenate(
+            [self.create_times, self.now - (ages if ages is not None else np.zeros(n))])
+        self.uids = np.concatenate([self.uids, np.where(rng.random(n) < 0.3, 0, 1000)])
+        self.rss = np.concatenate([self.rss, rng.lognormal(16, 1.5, n).astype(np.int64)])
+        self.threads = np.concatenate([self.threads, rng.integers(1, 64, n).astype(np.int32)])
+        self.denied = np.concatenate([self.denied, rng.random(n) < self.access_denied_rate])
+
+    def _churn(self):
+        n_exit = int(round(len(self.pids) * self.churn))
+        if not n_exit:
+            return
+        keep = np.ones(len(self.pids), dtype=bool)
+        keep[self._rng.choice(len(self.pids), n_exit, replace=False)] = False
+        for column in ("pids", "name_codes", "create_times", "uids", "rss", "threads", "denied"):
+            setattr(self, column, getattr(self, column)[keep])
+        self._spawn(n_exit)
+
+    def collect(self):
+        """Advance the simulated clock by one interval and return a ProcessSnapshot."""
+        self.now += self.interval
+        self._churn()
+        rng = self._rng
+        # Memory drifts a little between samples
+        self.rss = np.maximum(self.rss + rng.normal(0, 0.01, len(self.rss)) * self.rss, 4096).astype(np.int64)
+        visible = ~self.denied
+        codes = self.name_codes[visible]
+        return ProcessSnapshot(
+            self.now, self.pids[visible], [self._name_pool[c] for c in codes.tolist()],
+            self.create_times[visible], self.uids[visible],
+            rng.exponential(0.5, int(visible.sum())), self.rss[visible],
+            threads=self.threads[visible],
+        )
+
+    def read_memory(self, pid):
+        """(uss, pss) of a fake process in bytes, or None if it is gone or denied."""
+        row = np.searchsorted(self.pids, pid)
+        if row == len(self.pids) or self.pids[row] != pid or self.denied[row]:
+            return None
+        rss = int(self.rss[row])
+        return rss * 6 // 10, rss * 8 // 10
@@ -0,0 +1,219 @@
+import logging
+import shutil
+import subprocess
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+# NVML bindings are optional; without them the nvidia-smi stream is used
+try:
+    import pynvml
+except ImportError:
+    pynvml = None
+
+
+class GpuUnavailable(Exception):
+    """Raised when no GPU metrics source can be opened."""
+
+
+class GpuProvider:
+    """
+    Source of GPU utilization samples.
+
+    sample() returns the current utilization in percent, or None when the
+    source stopped working (e.g. the driver went away).
+    """
+
+    def sample(self):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class NullGpuProvider(GpuProvider):
+    """Provider for machines without a GPU; always reports 0%."""
+
+    def sample(self):
+        return 0.0
+
+
+class FakeGpuProvider(GpuProvider):
+    """
+    Provider replaying a fixed sequence of samples, for testing without a GPU.
+    A None in `values` simulates a failing source; the last value repeats.
+    """
+
+    def __init__(self, values):
+        self.values = list(values)
+        self.calls = 0
+        self.closed = False
+
+    def sample(self):
+        index = min(self.calls, len(self.values) - 1)
+        self.calls += 1
+        return self.values[index]
+
+    def close(self):
+        self.closed = True
+
+
+class NvmlGpuProvider(GpuProvider):
+    """Reads utilization in-process through NVML (pynvml); never forks."""
+
+    def __init__(self):
+        if pynvml is None:
+            raise GpuUnavailable("pynvml is not installed")
+        try:
+            pynvml.nvmlInit()
+            count = pynvml.nvmlDeviceGetCount()
+            self._handles = [pynvml.nvmlDeviceGetHandleByIndex(i) for i in range(count)]
+        except pynvml.NVMLError as e:
+            raise GpuUnavailable(str(e))
+        if not self._handles:
+            raise GpuUnavailable("no NVIDIA GPU found")
+
+    def sample(self):
+        try:
+            rates = [pynvml.nvmlDeviceGetUtilizationRates(h).gpu for h in self._handles]
+        except pynvml.NVMLError:
+            return None
+        return sum(rates) / len(rates)
+
+    def close(self):
+        try:
+            pynvml.nvmlShutdown()
+        except pynvml.NVMLError:
+            pass
+
+
+class NvidiaSmiStreamProvider(GpuProvider):
+    """
+    Keeps one long-lived `nvidia-smi` child in loop mode and parses its output
+    incrementally on a reader thread, so sampling never spawns a process.
+    """
+
+    def __init__(self, interval_ms=1000, command=None):
+        if command is None:
+            executable = shutil.which("nvidia-smi")
+            if executable is None:
+                raise GpuUnavailable("nvidia-smi not found")
+            command = [
+                executable, "--query-gpu=index,utilization.gpu",
+                "--format=csv,noheader,nounits", f"--loop-ms={interval_ms}"
+            ]
+        try:
+            self._proc = subprocess.Popen(
+                command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                encoding="utf-8", bufsize=1
+            )
+        except OSError as e:
+            raise GpuUnavailable(str(e))
+        self._usage = {}  # GPU index -> latest utilization
+        self._lock = threading.Lock()
+        self._reader = threading.Thread(target=self._read_output, daemon=True)
+        self._reader.start()
+
+    def _read_output(self):
+        for line in self._proc.stdout:
+            try:
+                index, usage = (field.strip() for field in line.split(","))
+                usage = float(usage)
+            except ValueError:
+                continue
+            with self._lock:
+                self._usage[index] = usage
+
+    def sample(self):
+        if self._proc.poll() is not None:
+            return None
+        with self._lock:
+            values = list(self._usage.values())
+        return sum(values) / len(values) if values else 0.0
+
+    def close(self):
+        if self._proc.poll() is None:
+            self._proc.terminate()
+            try:
+                self._proc.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                self._proc.kill()
+
+
+class BackoffGpuProvider(GpuProvider):
+    """
+    Wraps a provider factory with negative-result caching.
+
+    When the source cannot be opened or stops working, 0% is reported and the
+    source is only retried after a backoff that doubles up to `max_backoff`
+    seconds, so GPU-less machines don't retry on every sample. Only changes
+    between available and unavailable are logged; failed retries are not.
+    """
+
+    def __init__(self, factory, initial_backoff=5.0, max_backoff=300.0, clock=time.monotonic):
+        self._factory = factory
+        self._initial_backoff = initial_backoff
+        self._max_backoff = max_backoff
+        self._clock = clock
+        self._provider = None
+        self._backoff = initial_backoff
+        self._retry_at = 0.0
+        self._failing = False
+
+    @property
+    def available(self):
+        """Whether a working source is currently open."""
+        return self._provider is not None
+
+    def sample(self):
+        now = self._clock()
+        if self._provider is None:
+            if now < self._retry_at:
+                return 0.0
+            try:
+                self._provider = self._factory()
+            except GpuUnavailable as e:
+                self._fail(now, e)
+                return 0.0
+
+        value = self._provider.sample()
+        if value is None:
+            self._provider.close()
+            self._provider = None
+            self._fail(now, "GPU source stopped")
+            return 0.0
+        if self._failing:
+            log.info("GPU usage available again")
+            self._failing = False
+        self._backoff = self._initial_backoff
+        return value
+
+    def _fail(self, now, reason):
+        if not self._failing:
+            log.warning("GPU usage unavailable (%s); reporting 0%% and retrying with backoff", reason)
+            self._failing = True
+        else:
+            log.debug("GPU retry failed (%s); next retry in %.0fs", reason, self._backoff)
+        self._retry_at = now + self._backoff
+        self._backoff = min(self._backoff * 2, self._max_backoff)
+
+    def close(self):
+        if self._provider is not None:
+            self._provider.close()
+            self._provider = None
+
+
+def _open_default_provider():
+    """Open NVML if available, else the nvidia-smi stream."""
+    if pynvml is not None:
+        try:
+            return NvmlGpuProvider()
+        except GpuUnavailable:
+            pass
+    return NvidiaSmiStreamProvider()
+
+
+def create_gpu_provider():
+    """Return the default GPU provider, with backoff when no GPU is present."""
+    return BackoffGpuProvider(_open_default_provider)
@@ -0,0 +1,191 @@
+# Lightweight, opt-in timing of the refresh hot paths. While disabled,
+# phase() returns a shared no-op context manager and count() returns at
+# once, so the instrumentation points cost a function call each.
+import collections
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+
+_enabled = False
+_lock = threading.Lock()
+_phases = {}  # name -> [calls, total seconds, max seconds, last seconds]
+_counters = {}  # name -> total
+_NOOP = contextlib.nullcontext()
+
+
+def enable(enabled=True):
+    """Turn recording on or off (the recorded values are kept)."""
+    global _enabled
+    _enabled = enabled
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    with _lock:
+        _phases.clear()
+        _counters.clear()
+
+
+class _Phase:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        with _lock:
+            stats = _phases.get(self.name)
+            if stats is None:
+                _phases[self.name] = [1, elapsed, elapsed, elapsed]
+            else:
+                stats[0] += 1
+                stats[1] += elapsed
+                stats[2] = max(stats[2], elapsed)
+                stats[3] = elapsed
+        return False
+
+
+def phase(name):
+    """Context manager timing one run of a named phase."""
+    return _Phase(name) if _enabled else _NOOP
+
+
+def count(name, n=1):
+    """Add n to a named counter."""
+    if _enabled:
+        with _lock:
+            _counters[name] = _counters.get(name, 0) + n
+
+
+def stats():
+    """Current values: {"timestamp", "phases": {name: {calls, total, max, last}}, "counters"}."""
+    with _lock:
+        return {
+            "timestamp": time.time(),
+            "phases": {
+                name: {"calls": s[0], "total": s[1], "max": s[2], "last": s[3]}
+                for name, s in _phases.items()
+            },
+            "counters": dict(_counters),
+        }
+
+
+def summary():
+    """One line with the last duration of every phase and the counters, for an overlay."""
+    current = stats()
+    parts = [f"{name} {s['last'] * 1000:.1f}ms" for name, s in sorted(current["phases"].items())]
+    parts += [f"{name} {value}" for name, value in sorted(current["counters"].items())]
+    return " | ".join(parts) or "no samples yet"
+
+
+def append_jsonl(path):
+    """Append the current values as one JSON line."""
+    with open(path, "a") as f:
+        f.write(json.dumps(stats()) + "\n")
+
+
+def write_prometheus(path, prefix="sysopt"):
+    """Atomically write the current values in the Prometheus text format (for node_exporter's textfile collector)."""
+    current = stats()
+    lines = [
+        f"# TYPE {prefix}_phase_seconds_total counter",
+        *(f'{prefix}_phase_seconds_total{{phase="{name}"}} {s["total"]:.6f}'
+          for name, s in sorted(current["phases"].items())),
+        f"# TYPE {prefix}_phase_calls_total counter",
+        *(f'{prefix}_phase_calls_total{{phase="{name}"}} {s["calls"]}'
+          for name, s in sorted(current["phases"].items())),
+        f"# TYPE {prefix}_phase_last_seconds gauge",
+        *(f'{prefix}_phase_last_seconds{{phase="{name}"}} {s["last"]:.6f}'
+          for name, s in sorted(current["phases"].items())),
+        f"# TYPE {prefix}_events_total counter",
+        *(f'{prefix}_events_total{{counter="{name}"}} {value}'
+          for name, value in sorted(current["counters"].items())),
+    ]
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp_path, path)
+
+
+def export(path):
+    """Export to `path`: Prometheus text for *.prom files, otherwise a JSON line."""
+    if path.endswith(".prom"):
+        write_prometheus(path)
+    else:
+        append_jsonl(path)
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler over every thread (the scan and monitor threads
+    included, which cProfile would miss): samples all stacks every
+    `interval` seconds from a daemon thread and writes them as collapsed
+    stacks ("frame;frame;frame count" lines, the flame graph input format).
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self._samples = collections.Counter()
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self):
+        self._samples.clear()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        own = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                if ident not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                stack.append(names.get(ident, str(ident)))
+                self._samples[";".join(reversed(stack))] += 1
+
+    def stop(self, path):
+        """Stop sampling, write the collapsed stacks to `path` and return the sample count."""
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        with open(path, "w") as f:
+            for stack, n in self._samples.most_common():
+                f.write(f"{stack} {n}\n")
+        return sum(self._samples.values())
+
+
+@contextlib.contextmanager
+def cprofile(path):
+    """Run the enclosed block under cProfile and dump its stats to `path` (for pstats/snakeviz)."""
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
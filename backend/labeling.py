@@ -0,0 +1,106 @@
+import math
+import numpy as np
+
+# Percentiles splitting runtimes into priorities 1-10
+DECILES = np.arange(10, 100, 10)
+# Streams up to this many rows are labelled with exact percentiles
+EXACT_LIMIT = 2_000_000
+# Relative accuracy of the streaming quantile sketch
+SKETCH_ACCURACY = 0.005
+
+
+def decile_thresholds(runtimes):
+    """The nine runtime decile thresholds (10th, 20th, ..., 90th percentile)."""
+    return np.percentile(np.asarray(runtimes, dtype=np.float64), DECILES)
+
+
+def label_runtimes(runtimes, thresholds):
+    """
+    Numeric priorities 1-10: one plus the number of thresholds each runtime
+    has reached, so longer runtimes get higher priority.
+    """
+    return 1 + np.searchsorted(thresholds, runtimes, side="right")
+
+
+class QuantileSketch:
+    """
+    Mergeable streaming quantile sketch with relative error guarantees
+    (the DDSketch scheme).
+
+    Positive values are counted in logarithmic buckets of ratio
+    gamma = (1 + a) / (1 - a), so every quantile estimate is within a
+    relative error `a` of a value at that rank. Memory grows with the
+    log of the value range, not with the number of values.
+    """
+
+    def __init__(self, relative_accuracy=SKETCH_ACCURACY, min_value=1e-9):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.min_value = min_value
+        self.buckets = {}  # bucket key -> count
+        self.zero_count = 0  # values <= min_value
+        self.count = 0
+
+    def add(self, values):
+        """Add an array of (non-negative) values."""
+        values = np.asarray(values, dtype=np.float64).reshape(-1)
+        positive = values[values > self.min_value]
+        self.zero_count += len(values) - len(positive)
+        self.count += len(values)
+        if len(positive):
+            keys, counts = np.unique(np.ceil(np.log(positive) / self._log_gamma).astype(np.int64),
+                                     return_counts=True)
+            for key, count in zip(keys.tolist(), counts.tolist()):
+                self.buckets[key] = self.buckets.get(key, 0) + count
+
+    def merge(self, other):
+        """Add the values counted by another sketch of the same accuracy."""
+        if other.gamma != self.gamma:
+            raise ValueError("can only merge sketches of the same accuracy")
+        for key, count in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+    def percentiles(self, q):
+        """Estimate percentiles q (0-100) of the values added so far."""
+        if not self.count:
+            raise ValueError("cannot estimate percentiles of an empty sketch")
+        keys = np.array(sorted(self.buckets), dtype=np.int64)
+        counts = np.array([self.buckets[k] for k in keys.tolist()], dtype=np.int64)
+        cumulative = self.zero_count + np.cumsum(counts)
+        ranks = np.asarray(q, dtype=np.float64) / 100 * (self.count - 1)
+        index = np.searchsorted(cumulative, ranks, side="right")
+        # Midpoint (in relative terms) of each bucket's value range
+        estimates = 2 * self.gamma ** keys.astype(np.float64) / (self.gamma + 1)
+        result = estimates[np.minimum(index, len(keys) - 1)] if len(keys) else np.zeros(len(ranks))
+        return np.where(ranks < self.zero_count, 0.0, result)
+
+
+def streaming_thresholds(chunks, exact_limit=EXACT_LIMIT):
+    """
+    Decile thresholds over an iterable of runtime arrays.
+
+    Up to `exact_limit` rows are buffered and labelled exactly like
+    decile_thresholds() on the concatenated data; past that the buffer is
+    folded into a QuantileSketch and the thresholds are estimates.
+    Returns None if there are no rows.
+    """
+    buffered, rows, sketch = [], 0, None
+    for runtimes in chunks:
+        if sketch is not None:
+            sketch.add(runtimes)
+            continue
+        buffered.append(np.asarray(runtimes, dtype=np.float64))
+        rows += len(runtimes)
+        if rows > exact_limit:
+            sketch = QuantileSketch()
+            for part in buffered:
+                sketch.add(part)
+            buffered = None
+    if sketch is not None:
+        return sketch.percentiles(DECILES)
+    if not rows:
+        return None
+    return decile_thresholds(np.concatenate(buffered))
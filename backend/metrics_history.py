@@ -0,0 +1,185 @@
+import math
+import threading
+import time
+import numpy as np
+
+# (resolution in seconds, number of buckets): 1s for 10 minutes, 1min for 24h
+DEFAULT_TIERS = ((1.0, 600), (60.0, 1440))
+SYSTEM_METRICS = ("cpu_usage", "ram_usage", "disk_usage", "gpu_usage")
+GROUP_METRICS = ("cpu", "mem")
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+
+class RingBuffer:
+    """Fixed-size NumPy ring buffer of (timestamp, value) samples."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._times = np.zeros(capacity, dtype=np.float64)
+        self._values = np.zeros(capacity, dtype=np.float32)
+        self._next = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def append(self, timestamp, value):
+        self._times[self._next] = timestamp
+        self._values[self._next] = value
+        self._next = (self._next + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def arrays(self):
+        """Return (times, values) copies in chronological order."""
+        if self._size < self.capacity:
+            return self._times[:self._size].copy(), self._values[:self._size].copy()
+        order = np.r_[self._next:self.capacity, 0:self._next]
+        return self._times[order], self._values[order]
+
+
+class MetricSeries:
+    """
+    One metric stored at several resolutions.
+
+    Every sample is averaged into the current bucket of each tier; when a
+    bucket closes its mean is appended to that tier's ring buffer, so memory
+    is fixed by the tiers regardless of how long the app runs.
+    """
+
+    def __init__(self, tiers=DEFAULT_TIERS):
+        self.tiers = tiers
+        self._buffers = [RingBuffer(capacity) for _, capacity in tiers]
+        self._pending = [[None, 0.0, 0] for _ in tiers]  # bucket start, sum, count
+
+    def add(self, timestamp, value):
+        for (resolution, _), buffer, pending in zip(self.tiers, self._buffers, self._pending):
+            bucket = math.floor(timestamp / resolution) * resolution
+            if pending[0] != bucket:
+                if pending[2]:
+                    buffer.append(pending[0], pending[1] / pending[2])
+                pending[:] = [bucket, 0.0, 0]
+            pending[1] += value
+            pending[2] += 1
+
+    def query(self, window, now=None):
+        """
+        Return (times, values) for the last `window` seconds from the finest
+        tier that covers it, including the still-open bucket.
+        """
+        now = time.time() if now is None else now
+        tier = len(self.tiers) - 1
+        for i, (resolution, capacity) in enumerate(self.tiers):
+            if resolution * capacity >= window:
+                tier = i
+                break
+        times, values = self._buffers[tier].arrays()
+        bucket, total, count = self._pending[tier]
+        if count:
+            times = np.append(times, bucket)
+            values = np.append(values, np.float32(total / count))
+        keep = times >= now - window
+        return times[keep], values[keep]
+
+
+class MetricsHistory:
+    """
+    Bounded history of system-wide metrics and per-process-group CPU/RAM.
+
+    Group series are only kept for the busiest groups, ranked by their share
+    of total CPU plus their share of total memory: a group starts being
+    tracked in the top max_groups / 2 and is dropped once it falls out of
+    the top max_groups, so at most max_groups series exist and groups near
+    the cut-off aren't re-created on every refresh. All methods are
+    thread-safe.
+    """
+
+    def __init__(self, tiers=DEFAULT_TIERS, max_groups=200):
+        self.tiers = tiers
+        self.max_groups = max_groups
+        self._lock = threading.Lock()
+        self._system = {metric: MetricSeries(tiers) for metric in SYSTEM_METRICS}
+        self._groups = {}  # group name -> {metric: MetricSeries}
+
+    def record(self, metrics, timestamp=None):
+        """Record a dict of system metrics (as emitted by MonitoringThread)."""
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            for metric, series in self._system.items():
+                if metric in metrics:
+                    series.add(timestamp, metrics[metric])
+
+    def record_groups(self, processes, timestamp=None):
+        """Record CPU (%) and memory (MB) of the busiest aggregated process groups."""
+        timestamp = time.time() if timestamp is None else timestamp
+        n = len(processes)
+        cpu = np.fromiter((group["cpu"] for group in processes), dtype=np.float64, count=n)
+        mem = np.fromiter((group["mem"] for group in processes), dtype=np.float64, count=n)
+        usage = cpu / max(cpu.sum(), 1e-9) + mem / max(mem.sum(), 1e-9)
+        # Rows by descending usage, down to the retention rank
+        if n > self.max_groups:
+            retained = np.argpartition(-usage, self.max_groups - 1)[:self.max_groups]
+        else:
+            retained = np.arange(n)
+        retained = retained[np.argsort(-usage[retained], kind="stable")]
+        enter_rank = max(self.max_groups // 2, 1)
+        with self._lock:
+            tracked = {}
+            for rank, row in enumerate(retained.tolist()):
+                group = processes[row]
+                series = self._groups.get(group["name"])
+                if series is None:
+                    if rank >= enter_rank:
+                        continue
+                    series = {metric: MetricSeries(self.tiers) for metric in GROUP_METRICS}
+                tracked[group["name"]] = series
+                for metric in GROUP_METRICS:
+                    series[metric].add(timestamp, group[metric])
+            self._groups = tracked
+
+    def tracked_groups(self):
+        """Names of the groups whose history is being kept."""
+        with self._lock:
+            return list(self._groups)
+
+    def query(self, metric, window=600, group=None, now=None):
+        """Return (times, values) of a metric over the last `window` seconds."""
+        with self._lock:
+            if group is None:
+                series = self._system[metric]
+            else:
+                series = self._groups.get(group, {}).get(metric)
+                if series is None:
+                    return np.empty(0), np.empty(0, dtype=np.float32)
+            return series.query(window, now)
+
+    def trend(self, metric, window=600, group=None, now=None):
+        """Least-squares slope of a metric over the window, in units per minute."""
+        times, values = self.query(metric, window, group, now)
+        if len(times) < 2 or times[-1] == times[0]:
+            return 0.0
+        slope = np.polyfit(times - times[0], values.astype(np.float64), 1)[0]
+        return float(slope * 60)
+
+    def sparkline(self, metric, width=20, window=600, group=None, now=None):
+        """Render the metric over the window as a unicode sparkline of `width` chars."""
+        _, values = self.query(metric, window, group, now)
+        if len(values) == 0:
+            return ""
+        if len(values) > width:
+            # Average consecutive samples down to `width` points
+            edges = np.linspace(0, len(values), width + 1).astype(int)
+            values = np.add.reduceat(values, edges[:-1]) / np.diff(edges)
+        low, high = float(values.min()), float(values.max())
+        span = high - low or 1.0
+        levels = ((values - low) / span * (len(SPARK_CHARS) - 1)).round().astype(int)
+        return "".join(SPARK_CHARS[level] for level in levels)
+
+    def features(self, group, window=600, now=None):
+        """Summary statistics of a process group's history, usable as model features."""
+        features = {}
+        for metric in GROUP_METRICS:
+            _, values = self.query(metric, window, group, now)
+            features[f"{metric}_mean"] = float(values.mean()) if len(values) else 0.0
+            features[f"{metric}_max"] = float(values.max()) if len(values) else 0.0
+            features[f"{metric}_trend"] = self.trend(metric, window, group, now)
+        return features
@@ -0,0 +1,135 @@
+import json
+import os
+import numpy as np
+
+TABLE_PATH = "ml_model_table.npz"
+# Largest allowed difference between table and model predictions
+PARITY_TOLERANCE = 1e-4
+
+
+class PriorityTable:
+    """
+    A single-feature tree ensemble compiled into a step function.
+
+    The model only sees `runtime_seconds`, so its prediction is constant
+    between consecutive split thresholds: values[i] is the prediction for
+    thresholds[i - 1] <= runtime < thresholds[i]. Scoring is one
+    np.searchsorted, without xgboost or joblib.
+    """
+
+    def __init__(self, thresholds, values):
+        self.thresholds = np.asarray(thresholds, dtype=np.float32)
+        self.values = np.asarray(values, dtype=np.float32)
+        if len(self.values) != len(self.thresholds) + 1:
+            raise ValueError("a table needs exactly one more value than thresholds")
+
+    @property
+    def nbytes(self):
+        return self.thresholds.nbytes + self.values.nbytes
+
+    def predict(self, runtimes):
+        """Predict priorities for runtimes (1-D, or an (n, 1) matrix like model.predict)."""
+        runtimes = np.asarray(runtimes, dtype=np.float32).reshape(-1)
+        return self.values[np.searchsorted(self.thresholds, runtimes, side="right")]
+
+
+def _parse_base_score(value):
+    # Stored as "5.5E0" or, in newer xgboost versions, "[5.5E0]"
+    return np.float32(float(value.strip("[]")))
+
+
+def _tree_predict(tree, x):
+    """Leaf values of one tree (from the JSON model dump) for float32 inputs x."""
+    left = tree["left_children"]
+    right = tree["right_children"]
+    conditions = np.asarray(tree["split_conditions"], dtype=np.float32)
+    default_left = tree["default_left"]
+    out = np.empty(len(x), dtype=np.float32)
+    stack = [(0, np.arange(len(x)))]
+    while stack:
+        node, rows = stack.pop()
+        if left[node] == -1:
+            out[rows] = conditions[node]  # Leaf nodes store their value here
+            continue
+        values = x[rows]
+        goes_left = values < conditions[node]
+        if default_left[node]:
+            goes_left |= np.isnan(values)
+        stack.append((left[node], rows[goes_left]))
+        stack.append((right[node], rows[~goes_left]))
+    return out
+
+
+def compile_model(model):
+    """
+    Compile a trained single-feature XGBoost regressor (or Booster) into a
+    PriorityTable. Raises ValueError for models that aren't a plain sum of
+    trees over one feature.
+    """
+    booster = model.get_booster() if hasattr(model, "get_booster") else model
+    learner = json.loads(booster.save_raw("json"))["learner"]
+    params = learner["learner_model_param"]
+    if int(params["num_feature"]) != 1:
+        raise ValueError("only single-feature models can be compiled")
+    if learner["objective"]["name"] != "reg:squarederror":
+        raise ValueError(f"unsupported objective {learner['objective']['name']}")
+    if learner["gradient_booster"]["name"] != "gbtree":
+        raise ValueError("only gbtree models can be compiled")
+    trees = learner["gradient_booster"]["model"]["trees"]
+
+    thresholds = set()
+    for tree in trees:
+        for node, child in enumerate(tree["left_children"]):
+            if child != -1:
+                thresholds.add(np.float32(tree["split_conditions"][node]))
+    thresholds = np.array(sorted(thresholds), dtype=np.float32)
+
+    # One representative runtime per interval: just below the first threshold,
+    # then each threshold itself (intervals are closed on the left)
+    if len(thresholds):
+        below = np.nextafter(thresholds[0], np.float32(-np.inf), dtype=np.float32)
+        points = np.concatenate([[below], thresholds]).astype(np.float32)
+    else:
+        points = np.zeros(1, dtype=np.float32)
+
+    values = np.full(len(points), _parse_base_score(params["base_score"]), dtype=np.float32)
+    for tree in trees:
+        values += _tree_predict(tree, points)
+    return PriorityTable(thresholds, values)
+
+
+def verify_table(model, table, runtimes):
+    """Return the largest |table - model| prediction difference over runtimes."""
+    runtimes = np.asarray(runtimes, dtype=np.float64).reshape(-1, 1)
+    expected = np.asarray(model.predict(runtimes), dtype=np.float64)
+    return float(np.max(np.abs(table.predict(runtimes) - expected), initial=0.0))
+
+
+def parity_runtimes(table, low, high, n=10000):
+    """Runtimes covering [low, high] plus every threshold and its neighbours."""
+    grid = np.linspace(low, high, n)
+    t = table.thresholds.astype(np.float64)
+    return np.concatenate([grid, t, np.nextafter(t, -np.inf), np.nextafter(t, np.inf)])
+
+
+def export_table(model, low, high, path=TABLE_PATH):
+    """
+    Compile `model`, check parity against model.predict across the runtime
+    range [low, high] and atomically write the table to `path`.
+    Raises ValueError if the model can't be compiled or predictions differ.
+    """
+    table = compile_model(model)
+    diff = verify_table(model, table, parity_runtimes(table, low, high))
+    if diff > PARITY_TOLERANCE:
+        raise ValueError(f"compiled table differs from the model by {diff:g}")
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, thresholds=table.thresholds, values=table.values)
+    os.replace(tmp_path, path)
+    return table
+
+
+def load_table(path=TABLE_PATH):
+    """Load a PriorityTable written by export_table()."""
+    with np.load(path) as data:
+        return PriorityTable(data["thresholds"], data["values"])
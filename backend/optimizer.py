@@ -1,90 +1,158 @@
+import logging
 import psutil
-import os
 import time
-import platform
+from policy import get_policy
+from reclaim import get_estimator
+from snapshot import take_snapshot
 
-# Auto-adjust UID threshold based on OS
-if platform.system() == "Darwin":  # macOS
-    USER_UID_THRESHOLD = 500
-else:  # Linux or other (including Windows)
-    USER_UID_THRESHOLD = 1000
+log = logging.getLogger(__name__)
 
-IDLE_CPU_THRESHOLD = 1.0  # % CPU to be considered idle
-IDLE_TIME_THRESHOLD = 60  # seconds of runtime
-MEMORY_USAGE_THRESHOLD_MB = 20  # skip terminating if using more than 20MB
+# Seconds CPU usage of the remaining candidates is measured over
+CPU_SAMPLE_WINDOW = 1.0
+# Seconds terminated processes get to exit before they are killed
+TERMINATE_TIMEOUT = 3.0
+KILL_TIMEOUT = 1.0
 # For safety, DRY_RUN remains True by default; change to False to actually terminate processes.
 DRY_RUN = True
 
-# Whitelist substrings for process names (case-insensitive)
-WHITELIST = [
-    'python', 'code', 'terminal', 'qt', 'obsidian', 'spotify', 'discord', 'safari',
-    'webkit', 'mdworker', 'helper', 'plugin-container', 'finder', 'dock', 'systemuiserver',
-    'notificationcenter', 'windowmanager', 'loginwindow', 'cloud', 'raycast', 'noteful',
-    'bitwarden', 'core', 'service', 'extension', 'widget', 'agent', 'render', 'appstore'
-]
-
-def is_idle(proc, now):
-    """Determine if a process is idle based on CPU, memory, runtime and whitelist criteria."""
-    try:
-        cpu = proc.cpu_percent(interval=None)
-        create_time = proc.create_time()
-        # Use proc.uids() if available, else default to 1000 (suitable for Windows)
-        if hasattr(proc, "uids"):
-            uid = proc.uids().real
-        else:
-            uid = 1000
-        name = proc.name().lower()
-        mem = proc.memory_info().rss / (1024 * 1024)  # in MB
-
-        if uid < USER_UID_THRESHOLD:
-            print(f"SKIP {name} (PID {proc.pid}): system UID {uid}")
-            return False
-        if any(w in name for w in WHITELIST):
-            print(f"SKIP {name} (PID {proc.pid}): whitelisted")
-            return False
-        if cpu > IDLE_CPU_THRESHOLD:
-            print(f"SKIP {name} (PID {proc.pid}): CPU {cpu:.2f}%")
-            return False
-        if mem > MEMORY_USAGE_THRESHOLD_MB:
-            print(f"SKIP {name} (PID {proc.pid}): using {mem:.1f}MB RAM")
-            return False
-        if now - create_time < IDLE_TIME_THRESHOLD:
-            print(f"SKIP {name} (PID {proc.pid}): too recent ({now - create_time:.1f}s)")
-            return False
-        return True
-    except (psutil.NoSuchProcess, psutil.AccessDenied):
-        return False
-
-def clean_memory():
+def _sample_cpu(candidates, window):
     """
-    Scan and log (or terminate) idle user processes to free up RAM.
-    
-    In DRY_RUN mode, this will only log the processes that would be terminated.
+    Two-phase CPU measurement: prime cpu_percent() for every candidate, wait
+    one window, then read it. Returns [(proc, row, cpu)] for processes still
+    running as the same process as in the snapshot.
     """
-    now = time.time()
-    affected = []
-    for proc in psutil.process_iter(['pid', 'name']):
+    if not candidates:
+        return []
+    primed = []
+    for proc, row in candidates:
+        try:
+            proc.cpu_percent(None)  # First call only starts the measurement
+            primed.append((proc, row))
+        except psutil.Error:
+            continue
+    time.sleep(window)
+    measured = []
+    for proc, row in primed:
         try:
-            print(f"Checking: {proc.pid} {proc.name()}")
-        except Exception:
+            measured.append((proc, row, proc.cpu_percent(None)))
+        except psutil.Error:
             continue
+    return measured
 
-        if is_idle(proc, now):
+def _terminate(procs):
+    """Terminate processes, wait for them and kill those still alive. Returns (gone, killed, alive)."""
+    for proc in procs:
+        try:
+            proc.terminate()
+        except psutil.NoSuchProcess:
+            pass
+        except psutil.Error as e:
+            log.warning("Could not terminate PID %d: %s", proc.pid, e)
+    gone, alive = psutil.wait_procs(procs, timeout=TERMINATE_TIMEOUT)
+    killed = []
+    if alive:
+        for proc in alive:
             try:
-                name = proc.name()
-                pid = proc.pid
-                if DRY_RUN:
-                    affected.append((pid, name))
-                else:
-                    proc.terminate()
-                    affected.append((pid, name))
-            except Exception:
+                proc.kill()
+            except psutil.NoSuchProcess:
+                pass
+            except psutil.Error as e:
+                log.warning("Could not kill PID %d: %s", proc.pid, e)
+        killed, alive = psutil.wait_procs(alive, timeout=KILL_TIMEOUT)
+    return gone, killed, alive
+
+def clean_memory(snapshot=None, cpu_window=CPU_SAMPLE_WINDOW, policy=None):
+    """
+    Find (and unless DRY_RUN, terminate) idle user processes to free up RAM.
+
+    The idle policy (policy.get_policy() unless given) screens the given
+    ProcessSnapshot (a fresh one is taken if omitted). CPU usage of the remaining candidates is then measured over
+    `cpu_window` seconds; pass 0 to trust the snapshot's CPU column, which is
+    only meaningful for snapshots from a long-lived collector. Rows the
+    collector saw for the first time have no CPU reading yet, so those are
+    still measured over CPU_SAMPLE_WINDOW.
+    Candidates are terminated as one batch, killed if still running after
+    TERMINATE_TIMEOUT seconds.
+
+    Returns a dict with:
+      - dry_run, checked (rows scanned), skipped ({reason: count})
+      - idle: [{"pid", "name", "uss"}] of processes found idle
+      - terminated / killed / survived: pids by outcome (empty in dry-run)
+      - reclaimed_bytes: USS of the processes that exited
+      - elapsed: seconds spent, including the CPU window
+    """
+    started = time.perf_counter()
+    if snapshot is None:
+        snapshot = take_snapshot()
+    policy = policy if policy is not None else get_policy()
+    rows, skipped = policy.screen(snapshot)
+    log.debug("Policy screened out %s; %d candidates left", skipped, len(rows))
+    candidates = []
+    for row in rows:
+        try:
+            proc = psutil.Process(int(snapshot.pids[row]))
+            # Skip pids reused by another process since the snapshot
+            if proc.create_time() == snapshot.create_times[row]:
+                candidates.append((proc, row))
                 continue
+            reason = "gone"
+        except psutil.NoSuchProcess:
+            reason = "gone"
+        except psutil.Error:
+            reason = "denied"
+        skipped[reason] = skipped.get(reason, 0) + 1
+        log.debug("SKIP %s (PID %d): %s", snapshot.names[row], snapshot.pids[row], reason)
 
-    if DRY_RUN:
-        print("[Dry-Run] These processes would be terminated:")
+    if cpu_window:
+        to_sample, measured = candidates, []
     else:
-        print("[Optimizer] Terminated processes:")
+        to_sample = [(proc, row) for proc, row in candidates if not snapshot.cpu_measured[row]]
+        measured = [(proc, row, float(snapshot.cpu[row])) for proc, row in candidates
+                    if snapshot.cpu_measured[row]]
+        cpu_window = CPU_SAMPLE_WINDOW
+    sampled = _sample_cpu(to_sample, cpu_window)
+    if len(sampled) < len(to_sample):
+        skipped["gone"] = skipped.get("gone", 0) + len(to_sample) - len(sampled)
+    measured = sorted(measured + sampled, key=lambda m: m[1])
+
+    estimator = get_estimator()
+    idle = []
+    for proc, row, cpu in measured:
+        name = snapshot.names[row]
+        if not policy.is_idle_cpu(cpu):
+            skipped["cpu"] = skipped.get("cpu", 0) + 1
+            log.debug("SKIP %s (PID %d): CPU %.2f%%", name, proc.pid, cpu)
+            continue
+        memory = estimator.process_memory(proc.pid, snapshot.create_times[row])
+        idle.append((proc, {"pid": proc.pid, "name": name,
+                            "uss": memory[0] if memory is not None else 0}))
+
+    result = {
+        "dry_run": DRY_RUN,
+        "checked": len(snapshot),
+        "skipped": skipped,
+        "idle": [info for _, info in idle],
+        "terminated": [],
+        "killed": [],
+        "survived": [],
+        "reclaimed_bytes": 0,
+    }
+    if DRY_RUN:
+        for info in result["idle"]:
+            log.info("[Dry-Run] Would terminate %s (PID %d)", info["name"], info["pid"])
+    elif idle:
+        gone, killed, alive = _terminate([proc for proc, _ in idle])
+        uss = {info["pid"]: info["uss"] for info in result["idle"]}
+        result["terminated"] = [proc.pid for proc in gone]
+        result["killed"] = [proc.pid for proc in killed]
+        result["survived"] = [proc.pid for proc in alive]
+        result["reclaimed_bytes"] = sum(uss[proc.pid] for proc in gone + killed)
+        for proc in alive:
+            log.warning("PID %d survived SIGKILL", proc.pid)
 
-    for pid, name in affected:
-        print(f" - {name} (PID {pid})")
+    result["elapsed"] = time.perf_counter() - started
+    log.info("Optimizer checked %d processes in %.2fs: %d idle, %d terminated, %d killed, "
+             "%.1f MB reclaimed%s", result["checked"], result["elapsed"], len(idle),
+             len(result["terminated"]), len(result["killed"]),
+             result["reclaimed_bytes"] / (1024 * 1024), " (dry run)" if DRY_RUN else "")
+    return result
@@ -0,0 +1,187 @@
+import json
+import os
+import platform
+import re
+import numpy as np
+
+POLICY_PATH = "idle_policy.json"
+# Name decisions remembered across scans before the memo is reset
+NAME_CACHE_MAX_SIZE = 100000
+
+# Whitelist patterns for process names (case-insensitive)
+DEFAULT_WHITELIST = [
+    'python', 'code', 'terminal', 'qt', 'obsidian', 'spotify', 'discord', 'safari',
+    'webkit', 'mdworker', 'helper', 'plugin-container', 'finder', 'dock', 'systemuiserver',
+    'notificationcenter', 'windowmanager', 'loginwindow', 'cloud', 'raycast', 'noteful',
+    'bitwarden', 'core', 'service', 'extension', 'widget', 'agent', 'render', 'appstore'
+]
+
+
+def _default_uid_threshold():
+    # Auto-adjust UID threshold based on OS
+    return 500 if platform.system() == "Darwin" else 1000
+
+
+# Prefix marking a pattern as a regular expression rather than a literal substring
+REGEX_PREFIX = "re:"
+
+
+def _trie_regex(words):
+    """
+    Regex source matching any of the literal words, with common prefixes
+    factored out (a trie), so the regex engine follows one branch per
+    character instead of trying every word at every position.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}  # End of word
+
+    def build(node):
+        if "" in node and len(node) == 1:
+            return ""
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        optional = "" in node
+        if len(branches) == 1 and not optional:
+            return branches[0]
+        return f"(?:{'|'.join(branches)}){'?' if optional else ''}"
+
+    return build(trie)
+
+
+def compile_patterns(patterns):
+    """
+    Compile name patterns (matched anywhere in the name, case-insensitively)
+    into one regex, or None if there are none. Patterns are literal
+    substrings, so "c++" matches only "c++", unless prefixed with "re:"
+    ("re:^daemon\\d+$"). Literals are merged into a trie so large lists stay
+    fast.
+    """
+    if not patterns:
+        return None
+    words = sorted({p.lower() for p in patterns if not p.startswith(REGEX_PREFIX)})
+    regexes = [f"(?:{p[len(REGEX_PREFIX):]})" for p in patterns if p.startswith(REGEX_PREFIX)]
+    if words:
+        regexes.insert(0, _trie_regex(words))
+    return re.compile("|".join(regexes), re.IGNORECASE)
+
+
+class IdlePolicy:
+    """
+    Decides which processes the optimizer may terminate.
+
+    Rules run cheapest first: uid and age as vectorized checks over the
+    snapshot, then the name patterns, memoized per name across scans, then
+    memory. Only the survivors need per-process syscalls (CPU sampling in
+    optimizer.clean_memory). A name matching the blacklist is never
+    protected by the whitelist.
+    """
+
+    FIELDS = ("user_uid_threshold", "idle_cpu_threshold", "idle_time_threshold",
+              "memory_threshold_mb", "whitelist", "blacklist")
+
+    def __init__(self, user_uid_threshold=None, idle_cpu_threshold=1.0, idle_time_threshold=60,
+                 memory_threshold_mb=20, whitelist=None, blacklist=None):
+        self.user_uid_threshold = (user_uid_threshold if user_uid_threshold is not None
+                                   else _default_uid_threshold())
+        self.idle_cpu_threshold = idle_cpu_threshold  # % CPU to be considered idle
+        self.idle_time_threshold = idle_time_threshold  # seconds of runtime
+        self.memory_threshold_mb = memory_threshold_mb  # skip processes using more
+        self.whitelist = list(DEFAULT_WHITELIST if whitelist is None else whitelist)
+        self.blacklist = list(blacklist or [])
+        self._whitelist_re = compile_patterns(self.whitelist)
+        self._blacklist_re = compile_patterns(self.blacklist)
+        self._name_cache = {}
+
+    @classmethod
+    def from_dict(cls, config):
+        unknown = set(config) - set(cls.FIELDS)
+        if unknown:
+            raise ValueError(f"unknown policy setting(s): {', '.join(sorted(unknown))}")
+        return cls(**config)
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def name_decision(self, name):
+        """"whitelisted" if the name is protected, otherwise None (memoized)."""
+        try:
+            return self._name_cache[name]
+        except KeyError:
+            pass
+        decision = None
+        if (self._whitelist_re is not None and self._whitelist_re.search(name)
+                and not (self._blacklist_re is not None and self._blacklist_re.search(name))):
+            decision = "whitelisted"
+        if len(self._name_cache) >= NAME_CACHE_MAX_SIZE:
+            self._name_cache.clear()
+        self._name_cache[name] = decision
+        return decision
+
+    def screen(self, snapshot):
+        """
+        Apply every rule except CPU to a snapshot. Returns (rows, skipped):
+        the candidate row indices and a {reason: count} dict, with reasons
+        "system", "recent", "whitelisted" and "memory".
+        """
+        skipped = {}
+        rows = np.arange(len(snapshot))
+
+        def keep(mask, reason):
+            nonlocal rows
+            if not mask.all():
+                skipped[reason] = int(len(mask) - np.count_nonzero(mask))
+                rows = rows[mask]
+
+        keep(snapshot.uids[rows] >= self.user_uid_threshold, "system")
+        keep(snapshot.timestamp - snapshot.create_times[rows] >= self.idle_time_threshold, "recent")
+        names = snapshot.names
+        keep(np.array([self.name_decision(names[row]) is None for row in rows.tolist()],
+                      dtype=bool), "whitelisted")
+        keep(snapshot.rss[rows] <= self.memory_threshold_mb * 1024 * 1024, "memory")
+        return rows.tolist(), skipped
+
+    def skip_reason(self, snapshot, row):
+        """Why one snapshot row is not a candidate (CPU aside), or None."""
+        if snapshot.uids[row] < self.user_uid_threshold:
+            return "system"
+        if snapshot.timestamp - snapshot.create_times[row] < self.idle_time_threshold:
+            return "recent"
+        if self.name_decision(snapshot.names[row]) is not None:
+            return "whitelisted"
+        if snapshot.rss[row] > self.memory_threshold_mb * 1024 * 1024:
+            return "memory"
+        return None
+
+    def is_idle_cpu(self, cpu):
+        return cpu <= self.idle_cpu_threshold
+
+
+def load_policy(path=POLICY_PATH):
+    """Load the policy from a JSON config, or the built-in defaults if it doesn't exist."""
+    if os.path.exists(path):
+        return IdlePolicy.from_file(path)
+    return IdlePolicy()
+
+
+_policy = None
+
+
+def get_policy():
+    """Policy shared across scans, so its name memo persists."""
+    global _policy
+    if _policy is None:
+        _policy = load_policy()
+    return _policy
+
+
+def set_policy(policy):
+    global _policy
+    _policy = policy
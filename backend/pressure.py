@@ -0,0 +1,264 @@
+# Memory pressure events from Linux PSI triggers and cgroup v2 memory.events.
+#
+# A PSI trigger ("some <stall us> <window us>" written to
+# /proc/pressure/memory) makes the kernel signal POLLPRI on that file when
+# tasks stalled on memory for longer than the threshold within the window,
+# so the watcher sleeps in poll() until then instead of sampling. cgroup v2
+# memory.events signals POLLPRI when its counters change. Where neither is
+# available (old kernels, PSI disabled, fake files) the readings are polled.
+import logging
+import os
+import select
+import threading
+import time
+import psutil
+
+log = logging.getLogger(__name__)
+
+PSI_PATH = "/proc/pressure/memory"
+CGROUP_ROOT = "/sys/fs/cgroup"
+# Trip when some tasks stall on memory for PSI_STALL_US within PSI_WINDOW_US.
+# Unprivileged processes need a window that is a multiple of 2 seconds.
+PSI_STALL_US = 150_000
+PSI_WINDOW_US = 2_000_000
+# memory.events counters that signal pressure when they increase
+CGROUP_EVENTS = ("high", "max", "oom", "oom_kill")
+# Seconds between readings when polling
+POLL_INTERVAL = 2.0
+# Polled thresholds: PSI "some" avg10 (%), or RAM usage (%) without PSI
+POLL_STALL_PERCENT = 10.0
+POLL_RAM_PERCENT = 90.0
+# Seconds after a reported event during which further events are coalesced
+COOLDOWN = 30.0
+
+
+def read_psi(path=PSI_PATH):
+    """
+    {"some": {"avg10", "avg60", "avg300", "total"}, "full": {...}} from a PSI
+    file, or None if it is missing or unreadable.
+    """
+    try:
+        with open(path) as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+    readings = {}
+    for line in lines:
+        kind, *fields = line.split()
+        values = dict(field.split("=", 1) for field in fields)
+        readings[kind] = {key: (int(value) if key == "total" else float(value))
+                          for key, value in values.items()}
+    return readings
+
+
+def read_memory_events(path):
+    """{counter: value} from a cgroup v2 memory.events file, or None."""
+    try:
+        with open(path) as f:
+            return {key: int(value) for key, value in (line.split() for line in f if line.strip())}
+    except OSError:
+        return None
+
+
+def cgroup_memory_events(root=CGROUP_ROOT, proc_cgroup="/proc/self/cgroup"):
+    """Path of this process's cgroup v2 memory.events, or None outside cgroup v2."""
+    try:
+        with open(proc_cgroup) as f:
+            for line in f:
+                if line.startswith("0::"):
+                    path = os.path.join(root, line[3:].strip().lstrip("/"), "memory.events")
+                    return path if os.path.exists(path) else None
+    except OSError:
+        pass
+    return None
+
+
+def write_fake_psi(path, some_avg10=0.0, full_avg10=0.0, some_total=0, full_total=0):
+    """Write a PSI file in the kernel's format, for testing without real pressure."""
+    with open(path, "w") as f:
+        f.write(f"some avg10={some_avg10:.2f} avg60=0.00 avg300=0.00 total={some_total}\n"
+                f"full avg10={full_avg10:.2f} avg60=0.00 avg300=0.00 total={full_total}\n")
+
+
+def write_fake_memory_events(path, **counts):
+    """Write a cgroup v2 memory.events file; missing counters are 0."""
+    counters = {key: 0 for key in ("low", "high", "max", "oom", "oom_kill", "oom_group_kill")}
+    counters.update(counts)
+    with open(path, "w") as f:
+        f.writelines(f"{key} {value}\n" for key, value in counters.items())
+
+
+class PressureWatcher:
+    """
+    Calls on_pressure(event) from a background thread when memory pressure
+    trips. The event is a dict of:
+      - source: "psi" or "cgroup" (kernel notifications) or "poll"
+      - timestamp
+      - psi: the current PSI readings, or None
+      - events: increases of the memory.events counters, or None
+      - coalesced: events swallowed by the cooldown since the last one
+
+    Kernel notifications are used when the files are the kernel's (under
+    /proc and /sys); for other paths, or if the trigger can't be armed, the
+    readings are polled every poll_interval seconds. `cgroup_events` is a
+    memory.events path, "auto" for this process's cgroup, or None.
+    """
+
+    def __init__(self, on_pressure, psi_path=PSI_PATH, cgroup_events="auto", stall_us=PSI_STALL_US,
+                 window_us=PSI_WINDOW_US, poll_interval=POLL_INTERVAL, poll_stall_percent=POLL_STALL_PERCENT,
+                 poll_ram_percent=POLL_RAM_PERCENT, cooldown=COOLDOWN, use_triggers=None,
+                 clock=time.monotonic):
+        self.on_pressure = on_pressure
+        self.psi_path = psi_path
+        self.cgroup_events = cgroup_memory_events() if cgroup_events == "auto" else cgroup_events
+        self.stall_us = stall_us
+        self.window_us = window_us
+        self.poll_interval = poll_interval
+        self.poll_stall_percent = poll_stall_percent
+        self.poll_ram_percent = poll_ram_percent
+        self.cooldown = cooldown
+        if use_triggers is None:
+            use_triggers = os.path.realpath(psi_path).startswith("/proc/")
+        self.use_triggers = use_triggers
+        self.clock = clock
+        self.mode = None  # "trigger" or "poll" once running
+        self.events = 0
+        self._coalesced = 0
+        self._quiet_until = float("-inf")
+        self._counters = None
+        self._thread = None
+        self._stopping = False
+        self._wake_r = self._wake_w = None
+
+    def start(self):
+        # The pipe wakes the thread on stop(); it lives from start() to stop()
+        self._stopping = False
+        self._wake_r, self._wake_w = os.pipe()
+        self._thread = threading.Thread(target=self.run, name="pressure-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping = True
+        if self._thread is not None:
+            os.write(self._wake_w, b"x")
+            self._thread.join()
+            self._thread = None
+        if self._wake_r is not None:
+            os.close(self._wake_r)
+            os.close(self._wake_w)
+            self._wake_r = self._wake_w = None
+
+    def _arm_psi(self):
+        """Open the PSI file with a trigger written to it; None if that isn't possible."""
+        try:
+            fd = os.open(self.psi_path, os.O_RDWR | os.O_NONBLOCK)
+        except OSError as e:
+            log.info("PSI triggers unavailable (%s); polling memory pressure", e)
+            return None
+        try:
+            os.write(fd, f"some {self.stall_us} {self.window_us}\0".encode())
+        except OSError as e:
+            os.close(fd)
+            log.info("Could not arm PSI trigger (%s); polling memory pressure", e)
+            return None
+        return fd
+
+    def run(self):
+        """Watch until stop() is called (start() runs this in a thread)."""
+        poller = select.poll()
+        poller.register(self._wake_r, select.POLLIN)
+        psi_fd = cgroup_fd = None
+        self._counters = read_memory_events(self.cgroup_events) if self.cgroup_events else None
+        if self.use_triggers:
+            psi_fd = self._arm_psi()
+        timeout = self.poll_interval * 1000
+        if psi_fd is not None:
+            poller.register(psi_fd, select.POLLPRI)
+            timeout = None
+            if self._counters is not None:
+                if os.path.realpath(self.cgroup_events).startswith("/sys/"):
+                    cgroup_fd = os.open(self.cgroup_events, os.O_RDONLY)
+                    os.pread(cgroup_fd, 4096, 0)  # Reading arms the change notification
+                    poller.register(cgroup_fd, select.POLLPRI)
+                else:
+                    timeout = self.poll_interval * 1000  # Not the kernel's file; poll it
+        self.mode = "trigger" if psi_fd is not None else "poll"
+        try:
+            while not self._stopping:
+                ready = poller.poll(timeout)
+                if not ready:
+                    self.check()
+                    continue
+                for fd, mask in ready:
+                    if fd == psi_fd:
+                        if mask & select.POLLERR:
+                            # The trigger was torn down; keep watching by polling
+                            poller.unregister(psi_fd)
+                            os.close(psi_fd)
+                            psi_fd = None
+                            self.mode = "poll"
+                            timeout = self.poll_interval * 1000
+                        else:
+                            self._trip("psi", psi=read_psi(self.psi_path))
+                    elif fd == cgroup_fd:
+                        os.pread(cgroup_fd, 4096, 0)
+                        increases = self._cgroup_increases()
+                        if increases:
+                            self._trip("cgroup", events=increases)
+        finally:
+            for fd in (psi_fd, cgroup_fd):
+                if fd is not None:
+                    os.close(fd)
+
+    def check(self):
+        """Take one polled reading and report an event if it is over a threshold."""
+        increases = self._cgroup_increases()
+        psi = read_psi(self.psi_path)
+        if psi is not None and "some" in psi:
+            tripped = psi["some"]["avg10"] >= self.poll_stall_percent
+        else:
+            tripped = psutil.virtual_memory().percent >= self.poll_ram_percent
+        if tripped or increases:
+            self._trip("poll", psi=psi, events=increases or None)
+
+    def _cgroup_increases(self):
+        if self.cgroup_events is None:
+            return {}
+        counters = read_memory_events(self.cgroup_events)
+        if counters is None or self._counters is None:
+            self._counters = counters  # The first reading is the baseline
+            return {}
+        increases = {key: counters.get(key, 0) - self._counters.get(key, 0) for key in CGROUP_EVENTS}
+        self._counters = counters
+        return {key: n for key, n in increases.items() if n > 0}
+
+    def _trip(self, source, psi=None, events=None):
+        now = self.clock()
+        if now < self._quiet_until:
+            self._coalesced += 1
+            return
+        self._quiet_until = now + self.cooldown
+        self.events += 1
+        event = {"source": source, "timestamp": time.time(), "psi": psi, "events": events,
+                 "coalesced": self._coalesced}
+        self._coalesced = 0
+        try:
+            self.on_pressure(event)
+        except Exception:
+            log.exception("Memory pressure handler failed")
+
+
+def respond(action="suggest", limit=5):
+    """
+    React to a pressure event: "suggest" ranks the groups worth closing,
+    "clean" runs the optimizer (gated by the idle policy and DRY_RUN).
+    """
+    if action == "suggest":
+        import core
+        suggestions = core.get_ml_suggestions()[:limit]
+        return {"action": action, "suggestions": [
+            {k: s[k] for k in ("name", "count", "total_mem", "reclaim_mb", "priority")} for s in suggestions]}
+    if action == "clean":
+        import optimizer
+        return {"action": action, **optimizer.clean_memory()}
+    raise ValueError(f"unknown pressure action {action!r}")
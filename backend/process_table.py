@@ -0,0 +1,245 @@
+from PyQt5.QtWidgets import QApplication, QStyle, QStyleOptionButton, QStyledItemDelegate
+from PyQt5.QtCore import (
+    QAbstractTableModel, QEvent, QModelIndex, QSortFilterProxyModel, Qt, pyqtSignal
+)
+import instrumentation
+
+COLUMNS = [
+    "Count", "Process Name", "Avg Runtime (sec)", "Priority",
+    "CPU (%)", "Memory (MB)", "Action"
+]
+NAME_COLUMN = 1
+PRIORITY_COLUMN = 3
+ACTION_COLUMN = 6
+
+# Role returning raw values for sorting (numbers, lowercase names)
+SORT_ROLE = Qt.UserRole
+
+
+def _display_cells(group):
+    """Formatted text for every data column of a process group."""
+    return (
+        str(group["count"]),
+        str(group["name"]),
+        f"{group['runtime']:.1f}",
+        f"{group['priority']:.2f}",
+        f"{group['cpu']:.1f}",
+        f"{group['mem']:.1f}",
+    )
+
+
+def _sort_values(group):
+    return (
+        group["count"],
+        group["name"].lower(),
+        group["runtime"],
+        group["priority"],
+        group["cpu"],
+        group["mem"],
+    )
+
+
+class ProcessTableModel(QAbstractTableModel):
+    """
+    Table model of aggregated process groups, keyed by process name.
+
+    apply() diffs a new process list against the current rows and only emits
+    row insertions, removals and changes (in contiguous row ranges) for the
+    rows whose text changed, so the view never rebuilds rows that stayed the
+    same. The model keeps its rows sorted itself: sort keys are computed once
+    per row in apply() and ordered with one C-level sort, instead of a
+    proxy comparing rows through data() calls.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._groups = []  # Process group dicts, one per row
+        self._cells = []  # Display text per row
+        self._keys = []  # Sort values per row
+        self._lower_names = []  # Lowercase process name per row, for searching
+        self._row_of = {}  # Process name -> row
+        self._sort_column = None
+        self._sort_order = Qt.AscendingOrder
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._groups)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return COLUMNS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.column() == ACTION_COLUMN:
+            return None
+        if role == Qt.DisplayRole:
+            return self._cells[index.row()][index.column()]
+        if role == SORT_ROLE:
+            return self._keys[index.row()][index.column()]
+        return None
+
+    def group(self, row):
+        """Return the process group dict shown in the given row."""
+        return self._groups[row]
+
+    def lower_name(self, row):
+        """Return the prebuilt lowercase process name of the given row."""
+        return self._lower_names[row]
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        """Keep the rows ordered by `column` (-1 for no order) from now on."""
+        self._sort_column = column if 0 <= column < ACTION_COLUMN else None
+        self._sort_order = order
+        self._resort()
+
+    def _resort(self):
+        """Reorder the rows by the sort column, moving persistent indexes along."""
+        if self._sort_column is None or len(self._groups) < 2:
+            return
+        column_keys = [keys[self._sort_column] for keys in self._keys]
+        order = sorted(range(len(column_keys)), key=column_keys.__getitem__,
+                       reverse=self._sort_order == Qt.DescendingOrder)
+        if all(old == new for new, old in enumerate(order)):
+            return
+        self.layoutAboutToBeChanged.emit()
+        new_row = [0] * len(order)
+        for new, old in enumerate(order):
+            new_row[old] = new
+        persistent = self.persistentIndexList()
+        self.changePersistentIndexList(
+            persistent, [self.index(new_row[index.row()], index.column()) for index in persistent])
+        self._groups = [self._groups[row] for row in order]
+        self._cells = [self._cells[row] for row in order]
+        self._keys = [self._keys[row] for row in order]
+        self._lower_names = [self._lower_names[row] for row in order]
+        self._row_of = {group["name"]: row for row, group in enumerate(self._groups)}
+        self.layoutChanged.emit()
+
+    def _emit_changed(self, rows):
+        """Emit dataChanged once per contiguous run of (sorted) rows."""
+        last_column = ACTION_COLUMN - 1
+        start = prev = None
+        for row in rows:
+            if start is None:
+                start = prev = row
+            elif row == prev + 1:
+                prev = row
+            else:
+                self.dataChanged.emit(self.index(start, 0), self.index(prev, last_column))
+                start = prev = row
+        if start is not None:
+            self.dataChanged.emit(self.index(start, 0), self.index(prev, last_column))
+
+    def apply(self, processes):
+        """Update the rows to match `processes` with minimal model changes."""
+        incoming = {group["name"]: group for group in processes}
+
+        # Remove groups that disappeared, bottom-up in contiguous runs
+        removed = [row for row, group in enumerate(self._groups) if group["name"] not in incoming]
+        while removed:
+            last = removed.pop()
+            first = last
+            while removed and removed[-1] == first - 1:
+                first = removed.pop()
+            instrumentation.count("rows_removed", last - first + 1)
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self._groups[first:last + 1]
+            del self._cells[first:last + 1]
+            del self._keys[first:last + 1]
+            del self._lower_names[first:last + 1]
+            self.endRemoveRows()
+        self._row_of = {group["name"]: row for row, group in enumerate(self._groups)}
+
+        # Update changed cells of existing groups
+        added = []
+        changed = []
+        for name, group in incoming.items():
+            row = self._row_of.get(name)
+            if row is None:
+                added.append(group)
+                continue
+            cells = _display_cells(group)
+            self._groups[row] = group
+            if cells != self._cells[row]:
+                self._cells[row] = cells
+                self._keys[row] = _sort_values(group)
+                changed.append(row)
+        if changed:
+            instrumentation.count("rows_updated", len(changed))
+            changed.sort()
+            self._emit_changed(changed)
+
+        # Append new groups in one insertion
+        if added:
+            first = len(self._groups)
+            instrumentation.count("rows_inserted", len(added))
+            self.beginInsertRows(QModelIndex(), first, first + len(added) - 1)
+            for group in added:
+                self._row_of[group["name"]] = len(self._groups)
+                self._groups.append(group)
+                self._cells.append(_display_cells(group))
+                self._keys.append(_sort_values(group))
+                self._lower_names.append(group["name"].lower())
+            self.endInsertRows()
+
+        if changed or added:
+            self._resort()
+
+
+class CloseButtonDelegate(QStyledItemDelegate):
+    """Paints a "Close" button in the action column without creating a widget per row."""
+    clicked = pyqtSignal(QModelIndex)
+
+    def paint(self, painter, option, index):
+        button = QStyleOptionButton()
+        button.rect = option.rect.adjusted(4, 2, -4, -2)
+        button.text = "Close"
+        button.state = QStyle.State_Enabled
+        style = option.widget.style() if option.widget else QApplication.style()
+        style.drawControl(QStyle.CE_PushButton, button, painter, option.widget)
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() == QEvent.MouseButtonRelease and option.rect.contains(event.pos()):
+            self.clicked.emit(index)
+            return True
+        return False
+
+
+class ProcessFilterProxyModel(QSortFilterProxyModel):
+    """
+    Filter proxy over a ProcessTableModel, which sorts its own rows.
+
+    Filtering matches a lowercase query against the model's prebuilt lowercase
+    name index, so searching never goes back to the source data or the OS.
+    Rows never change names, so the filter isn't re-run on data changes.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._query = ""
+        self.setSortRole(SORT_ROLE)
+        self.setDynamicSortFilter(False)
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        # The source keeps the order, so the proxy maps rows one to one
+        self.sourceModel().sort(column, order)
+
+    def set_search(self, text):
+        """Show only groups whose name contains `text` (case-insensitive)."""
+        query = text.lower()
+        if query != self._query:
+            self._query = query
+            self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        return not self._query or self._query in self.sourceModel().lower_name(source_row)
+
+
+def create_proxy_model(source, parent=None):
+    """Sort/filter proxy over a ProcessTableModel."""
+    proxy = ProcessFilterProxyModel(parent)
+    proxy.setSourceModel(source)
+    return proxy
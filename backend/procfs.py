@@ -0,0 +1,156 @@
+import os
+import threading
+import time
+import instrumentation
+from snapshot import ProcessSnapshot
+
+PROC_ROOT = "/proc"
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+# Linux truncates /proc/<pid>/stat names to 15 characters
+COMM_LENGTH = 15
+
+# Field offsets in /proc/<pid>/stat counted after the ")" closing the name
+_STAT_UTIME = 11
+_STAT_STIME = 12
+_STAT_THREADS = 17
+_STAT_STARTTIME = 19
+
+
+def is_supported(root=PROC_ROOT):
+    """Whether a Linux-style /proc tree is available at `root`."""
+    return os.path.isfile(os.path.join(root, "stat"))
+
+
+class ProcfsCollector:
+    """
+    Linux fast path for process snapshots.
+
+    Reads /proc/<pid>/stat, statm and status directly with one open/read/close
+    each into a reused buffer, instead of going through psutil objects. CPU
+    percent is computed from the tick deltas since the previous collect(),
+    keyed by (pid, start time) so reused pids start fresh. /proc/<pid>/io is
+    only read when `collect_io` is set.
+    """
+
+    def __init__(self, root=PROC_ROOT, collect_io=False):
+        self.root = root
+        self.collect_io = collect_io
+        self.lock = threading.Lock()
+        self._buffer = bytearray(8192)
+        self._boot_time = self._read_boot_time()
+        self._cpu_times = {}  # (pid, starttime) -> (cpu ticks, sampled_at)
+
+    def _read(self, path):
+        """
+        Read a /proc file into the shared buffer and return its bytes. Files
+        that fill the buffer (e.g. /proc/stat on many-core hosts) are read on
+        until EOF, and the buffer grows so the next read fits in one call.
+        """
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            size = os.readv(fd, [self._buffer])
+            if size < len(self._buffer):
+                return bytes(self._buffer[:size])
+            chunks = [bytes(self._buffer)]
+            while True:
+                chunk = os.read(fd, len(self._buffer))
+                if not chunk:
+                    break
+                chunks.append(chunk)
+        finally:
+            os.close(fd)
+        data = b"".join(chunks)
+        self._buffer = bytearray(max(len(self._buffer) * 2, len(data) + 1))
+        return data
+
+    def _read_boot_time(self):
+        for line in self._read(os.path.join(self.root, "stat")).splitlines():
+            if line.startswith(b"btime"):
+                return float(line.split()[1])
+        raise RuntimeError(f"btime not found in {self.root}/stat")
+
+    def _full_name(self, proc_dir, comm):
+        """Expand a truncated name from cmdline, as psutil does."""
+        try:
+            cmdline = self._read(os.path.join(proc_dir, "cmdline"))
+        except OSError:
+            return comm
+        exe = os.path.basename(cmdline.split(b"\0", 1)[0].decode("utf-8", "replace"))
+        return exe if exe.startswith(comm) else comm
+
+    def _read_process(self, pid):
+        proc_dir = os.path.join(self.root, str(pid))
+        stat = self._read(os.path.join(proc_dir, "stat"))
+        statm = self._read(os.path.join(proc_dir, "statm"))
+        status = self._read(os.path.join(proc_dir, "status"))
+
+        open_paren = stat.index(b"(")
+        close_paren = stat.rindex(b")")
+        name = stat[open_paren + 1:close_paren].decode("utf-8", "replace")
+        fields = stat[close_paren + 2:].split()
+        cpu_ticks = int(fields[_STAT_UTIME]) + int(fields[_STAT_STIME])
+        starttime = int(fields[_STAT_STARTTIME])
+        threads = int(fields[_STAT_THREADS])
+
+        rss = int(statm.split()[1]) * PAGE_SIZE
+        uid_start = status.index(b"\nUid:") + 5
+        uid = int(status[uid_start:status.index(b"\n", uid_start)].split()[0])
+
+        if len(name) >= COMM_LENGTH:
+            name = self._full_name(proc_dir, name)
+        io = self._read_io(proc_dir) if self.collect_io else -1
+        return name, starttime, uid, cpu_ticks, rss, threads, io
+
+    def _read_io(self, proc_dir):
+        """Bytes read plus written from /proc/<pid>/io, or -1 if not readable."""
+        try:
+            lines = self._read(os.path.join(proc_dir, "io")).splitlines()
+        except OSError:
+            return -1
+        total = 0
+        for line in lines:
+            if line.startswith(b"read_bytes:") or line.startswith(b"write_bytes:"):
+                total += int(line.split()[1])
+        return total
+
+    def collect(self):
+        """Read every live process once and return a ProcessSnapshot."""
+        now = time.time()
+        pids, names, create_times, uids, cpu, rss, threads, io = [], [], [], [], [], [], [], []
+        measured = []
+        cpu_times = {}
+        for entry in os.listdir(self.root):
+            if not entry.isdigit():
+                continue
+            pid = int(entry)
+            try:
+                p_name, starttime, p_uid, ticks, p_rss, p_threads, p_io = self._read_process(pid)
+            except PermissionError:
+                instrumentation.count("access_denied")
+                continue
+            except (OSError, ValueError, IndexError):
+                # Process exited, access denied or truncated file
+                continue
+
+            key = (pid, starttime)
+            previous = self._cpu_times.get(key)
+            p_measured = previous is not None and now > previous[1]
+            if p_measured:
+                p_cpu = (ticks - previous[0]) / CLOCK_TICKS / (now - previous[1]) * 100
+            else:
+                p_cpu = 0.0  # First contact, no interval to measure yet
+            cpu_times[key] = (ticks, now)
+
+            pids.append(pid)
+            names.append(p_name)
+            create_times.append(self._boot_time + starttime / CLOCK_TICKS)
+            uids.append(p_uid)
+            cpu.append(p_cpu)
+            rss.append(p_rss)
+            threads.append(p_threads)
+            io.append(p_io)
+            measured.append(p_measured)
+        # Only keep CPU counters of live processes
+        self._cpu_times = cpu_times
+        return ProcessSnapshot(now, pids, names, create_times, uids, cpu, rss, threads, io, measured)
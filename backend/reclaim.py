@@ -0,0 +1,158 @@
+import heapq
+import os
+import time
+import psutil
+import instrumentation
+
+# Seconds a per-process USS/PSS reading is reused
+RECLAIM_TTL = 30.0
+# Groups whose reclaimable memory is measured per ranking
+RECLAIM_TOP_K = 10
+
+
+def read_smaps_rollup(pid, root="/proc"):
+    """
+    (uss, pss) in bytes from /proc/<pid>/smaps_rollup, or None if the file
+    is missing (kernels before 4.14) or unreadable.
+    """
+    uss = pss = 0
+    try:
+        with open(os.path.join(root, str(pid), "smaps_rollup"), "rb") as f:
+            for line in f:
+                if line.startswith((b"Private_Clean:", b"Private_Dirty:", b"Private_Hugetlb:")):
+                    uss += int(line.split()[1]) * 1024
+                elif line.startswith(b"Pss:"):
+                    pss = int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return uss, pss
+
+
+def read_memory_full_info(pid):
+    """(uss, pss) in bytes via psutil (pss equals uss where unsupported), or None."""
+    try:
+        info = psutil.Process(pid).memory_full_info()
+    except (psutil.Error, OSError):
+        return None
+    return info.uss, getattr(info, "pss", info.uss)
+
+
+class ReclaimEstimator:
+    """
+    Estimates how much RAM closing a process group would free.
+
+    RSS counts shared libraries and pages in every process mapping them, so
+    the estimate is the group's USS (pages private to its processes), with
+    PSS reported alongside. Both are expensive to read, so they are only
+    measured for the groups that can make the top K, and each process's
+    reading is cached for `ttl` seconds keyed by (pid, create_time).
+    `reader(pid)` replaces the /proc and psutil readings when given.
+    """
+
+    def __init__(self, ttl=RECLAIM_TTL, top_k=RECLAIM_TOP_K, root=None, clock=time.monotonic,
+                 reader=None):
+        self.ttl = ttl
+        self.top_k = top_k
+        self.root = root if root is not None else psutil.PROCFS_PATH
+        self.clock = clock
+        self.reader = reader
+        self._use_rollup = psutil.LINUX and os.path.exists(os.path.join(self.root, "self", "smaps_rollup"))
+        self._cache = {}  # (pid, create_time) -> (expires_at, uss, pss)
+        self.reads = 0  # Uncached readings, for benchmarks
+
+    def process_memory(self, pid, create_time):
+        """(uss, pss) of one process in bytes, or None if it can't be read."""
+        key = (pid, create_time)
+        now = self.clock()
+        entry = self._cache.get(key)
+        if entry is not None and entry[0] > now:
+            return entry[1:]
+        self.reads += 1
+        instrumentation.count("reclaim_reads")
+        if self.reader is not None:
+            result = self.reader(pid)
+        else:
+            result = read_smaps_rollup(pid, self.root) if self._use_rollup else None
+            if result is None:
+                result = read_memory_full_info(pid)
+        if result is None:
+            self._cache.pop(key, None)
+            return None
+        self._cache[key] = (now + self.ttl, *result)
+        return result
+
+    def group_memory(self, pids, create_times, rss):
+        """
+        (uss, pss, exact) of a group in bytes. Processes that can't be read
+        (e.g. access denied) count with their RSS, and exact is False.
+        """
+        uss = pss = 0
+        exact = True
+        for pid in pids:
+            result = self.process_memory(pid, create_times.get(pid))
+            if result is None:
+                fallback = rss.get(pid, 0)
+                uss += fallback
+                pss += fallback
+                exact = False
+            else:
+                uss += result[0]
+                pss += result[1]
+        return uss, pss, exact
+
+    def rank(self, groups, snapshot):
+        """
+        Annotate groups (dicts with "pids" and "total_mem" in MB) with
+        "reclaim_mb", "pss_mb" and "reclaim_exact", and return them ordered
+        by estimated freed memory.
+
+        USS never exceeds RSS, so groups are measured in descending RSS
+        order until the K-th best estimate beats the next group's RSS; no
+        unmeasured group could then enter the top K. Unmeasured groups
+        follow, ordered by RSS, with reclaim_mb None.
+        """
+        self._expire()
+        create_times = dict(zip(snapshot.pids.tolist(), snapshot.create_times.tolist()))
+        rss = dict(zip(snapshot.pids.tolist(), snapshot.rss.tolist()))
+        by_rss = sorted(groups, key=lambda g: g["total_mem"], reverse=True)
+
+        best = []  # min-heap of the top K reclaim estimates (MB)
+        measured = 0
+        for group in by_rss:
+            if len(best) >= self.top_k and best[0] >= group["total_mem"]:
+                break
+            uss, pss, exact = self.group_memory(group["pids"], create_times, rss)
+            group["reclaim_mb"] = uss / (1024 * 1024)
+            group["pss_mb"] = pss / (1024 * 1024)
+            group["reclaim_exact"] = exact
+            heapq.heappush(best, group["reclaim_mb"])
+            if len(best) > self.top_k:
+                heapq.heappop(best)
+            measured += 1
+
+        for group in by_rss[measured:]:
+            group["reclaim_mb"] = None
+            group["pss_mb"] = None
+            group["reclaim_exact"] = False
+        ranked = sorted(by_rss[:measured], key=lambda g: g["reclaim_mb"], reverse=True)
+        return ranked + by_rss[measured:]
+
+    def _expire(self):
+        now = self.clock()
+        expired = [key for key, entry in self._cache.items() if entry[0] <= now]
+        for key in expired:
+            del self._cache[key]
+
+    def clear(self):
+        self._cache.clear()
+
+
+_estimator = None
+
+
+def get_estimator():
+    """Shared estimator, so its cache survives across scans."""
+    global _estimator
+    if _estimator is None:
+        _estimator = ReclaimEstimator()
+    return _estimator
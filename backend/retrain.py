@@ -0,0 +1,167 @@
+import multiprocessing
+import os
+import queue
+import re
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import core
+from model_table import TABLE_PATH, load_table
+
+MODELS_DIR = "models"
+# Runtimes a new model is checked on before it is swapped in
+VALIDATION_RUNTIMES = np.array([0.0, 1.0, 60.0, 3600.0, 86400.0, 7 * 86400.0])
+
+# Set in the worker process by _init_worker
+_progress_queue = None
+_cancel_event = None
+
+
+def _init_worker(progress_queue, cancel_event):
+    global _progress_queue, _cancel_event
+    _progress_queue = progress_queue
+    _cancel_event = cancel_event
+
+
+def _report_progress(done, total):
+    try:
+        _progress_queue.put_nowait((done, total))
+    except queue.Full:
+        pass
+
+
+def _train_version(model_file, table_file):
+    """Worker entry point: train into versioned artifact paths."""
+    # The training stack is only ever imported in the worker process
+    import train_model
+    try:
+        return train_model.train_model(
+            model_file=model_file, table_file=table_file,
+            progress=_report_progress, should_cancel=_cancel_event.is_set
+        )
+    except train_model.TrainingCancelled:
+        return None
+
+
+def _publish(src, dst):
+    """Atomically copy an artifact over the path loaded at startup."""
+    tmp_path = f"{dst}.tmp"
+    shutil.copyfile(src, tmp_path)
+    os.replace(tmp_path, dst)
+
+
+def validate_model(model):
+    """Raise ValueError unless the model produces finite predictions for probe runtimes."""
+    preds = np.asarray(model.predict(VALIDATION_RUNTIMES.reshape(-1, 1)), dtype=np.float64)
+    if preds.shape != (len(VALIDATION_RUNTIMES),) or not np.all(np.isfinite(preds)):
+        raise ValueError("new model produced invalid predictions")
+
+
+class RetrainManager:
+    """
+    Retrains the model in a separate process and hot-swaps it when done.
+
+    Each run writes versioned artifacts (models/ml_model-v<N>.pkl and its
+    table) atomically. The model in core keeps serving until the new version
+    has been loaded and validated, then it is replaced in one assignment and
+    published to the paths loaded at startup.
+    """
+
+    def __init__(self, models_dir=MODELS_DIR):
+        self.models_dir = models_dir
+        self._context = multiprocessing.get_context("spawn")
+        self._executor = None
+        self._progress_queue = None
+        self._cancel_event = None
+        self._future = None
+        self._paths = None
+        self.progress = (0, 0)  # (boosting rounds done, total)
+
+    @property
+    def running(self):
+        return self._future is not None and not self._future.done()
+
+    def _next_version(self):
+        versions = [
+            int(m.group(1)) for m in
+            (re.match(r"ml_model-v(\d+)\.pkl$", name) for name in os.listdir(self.models_dir))
+            if m
+        ]
+        return max(versions, default=0) + 1
+
+    def start(self):
+        """Start a retrain in the worker process; returns False if one is already running."""
+        if self.running:
+            return False
+        if self._executor is None:
+            self._progress_queue = self._context.Queue(maxsize=1000)
+            self._cancel_event = self._context.Event()
+            self._executor = ProcessPoolExecutor(
+                max_workers=1, mp_context=self._context,
+                initializer=_init_worker, initargs=(self._progress_queue, self._cancel_event)
+            )
+        os.makedirs(self.models_dir, exist_ok=True)
+        version = self._next_version()
+        self._paths = (
+            os.path.join(self.models_dir, f"ml_model-v{version}.pkl"),
+            os.path.join(self.models_dir, f"ml_model_table-v{version}.npz"),
+        )
+        self._cancel_event.clear()
+        self.progress = (0, 0)
+        self._future = self._executor.submit(_train_version, *self._paths)
+        return True
+
+    def cancel(self):
+        """Ask the running retrain to stop; the current model keeps serving."""
+        if self._future is not None:
+            self._future.cancel()
+            self._cancel_event.set()
+
+    def poll(self):
+        """
+        Update progress and, once the job finishes, validate and swap in the
+        new model. Returns None while running (or idle), otherwise a tuple
+        (status, message) with status "done", "cancelled" or "failed".
+        """
+        if self._future is None:
+            return None
+        while True:
+            try:
+                self.progress = self._progress_queue.get_nowait()
+            except queue.Empty:
+                break
+        if not self._future.done():
+            return None
+
+        future, self._future = self._future, None
+        if future.cancelled() or self._cancel_event.is_set():
+            return ("cancelled", "Model retrain cancelled.")
+        try:
+            result = future.result()
+            if result is None:
+                return ("failed", "Model retrain produced no model (no training data?).")
+            return ("done", self._swap_in(result))
+        except Exception as e:
+            return ("failed", f"Model retrain failed: {e}")
+
+    def _swap_in(self, result):
+        if result["table_file"] is not None:
+            model = load_table(result["table_file"])
+        else:
+            import joblib
+            model = joblib.load(result["model_file"])
+        validate_model(model)
+        core.set_model(model)
+
+        # Publish for the next startup: pickle first, so the table stays newer
+        _publish(result["model_file"], core.MODEL_PATH)
+        if result["table_file"] is not None:
+            _publish(result["table_file"], TABLE_PATH)
+        return f"Model retrained and swapped in ({os.path.basename(result['model_file'])})."
+
+    def shutdown(self):
+        """Cancel any running job and stop the worker process."""
+        self.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,160 @@
+import glob
+import io
+import os
+import struct
+import time
+import numpy as np
+
+STORE_DIR = "training_samples"
+
+# Column name -> dtype of every stored sample
+COLUMNS = {
+    "timestamp": np.float64,
+    "pid": np.int64,
+    "name": np.str_,
+    "runtime": np.float64,
+    "cpu": np.float32,
+    "rss": np.int64,
+    "io": np.int64,
+    "threads": np.int32,
+}
+
+
+class SampleStore:
+    """
+    Append-only store of per-process samples in rotated columnar chunks.
+
+    Samples are buffered in memory and written as one compressed .npz chunk
+    per `chunk_rows` rows (or every `flush_interval` seconds), each through a
+    temp file and rename. Every append is also written and fsynced to a
+    write-ahead file named after the chunk it will go into
+    (pending-<seq>.wal). The file is replayed on the next start unless that
+    chunk was written, so a crash loses no sample that append_snapshot()
+    returned for. Only the newest `max_chunks` chunks are kept.
+    """
+
+    def __init__(self, directory=STORE_DIR, chunk_rows=50000, flush_interval=60.0, max_chunks=500):
+        self.directory = directory
+        self.chunk_rows = chunk_rows
+        self.flush_interval = flush_interval
+        self.max_chunks = max_chunks
+        os.makedirs(directory, exist_ok=True)
+        self._buffer = {column: [] for column in COLUMNS}
+        self._buffered_rows = 0
+        self._last_flush = time.monotonic()
+        existing = self.chunks()
+        self._next_seq = self.chunk_seq(existing[-1]) + 1 if existing else 0
+        self._wal = None
+        self._recover()
+
+    @staticmethod
+    def chunk_seq(path):
+        """Sequence number of a chunk (increases with every flush)."""
+        return int(os.path.basename(path)[len("chunk-"):-len(".npz")])
+
+    def chunks(self, first_seq=0):
+        """Paths of stored chunks with sequence >= first_seq, oldest first."""
+        paths = glob.glob(os.path.join(self.directory, "chunk-*.npz"))
+        return sorted((p for p in paths if self.chunk_seq(p) >= first_seq), key=self.chunk_seq)
+
+    def _wal_path(self, seq):
+        return os.path.join(self.directory, f"pending-{seq:08d}.wal")
+
+    def _recover(self):
+        """Buffer the samples of write-ahead files whose chunk was never written."""
+        stale = sorted(glob.glob(os.path.join(self.directory, "pending-*.wal")))
+        for path in stale:
+            seq = int(os.path.basename(path)[len("pending-"):-len(".wal")])
+            if not os.path.exists(os.path.join(self.directory, f"chunk-{seq:08d}.npz")):
+                for arrays in _read_wal(path):
+                    self._buffer_arrays(arrays)
+        if self._buffered_rows:
+            self.flush()
+        # Only now that the samples are in a chunk
+        for path in stale:
+            os.remove(path)
+
+    def _buffer_arrays(self, arrays):
+        for column in COLUMNS:
+            self._buffer[column].append(arrays[column])
+        self._buffered_rows += len(arrays["pid"])
+
+    def append_snapshot(self, snapshot):
+        """Buffer one sample per process of a ProcessSnapshot (and log it to the write-ahead file)."""
+        n = len(snapshot)
+        if n == 0:
+            return
+        arrays = {
+            "timestamp": np.full(n, snapshot.timestamp),
+            "pid": snapshot.pids,
+            "name": np.array(snapshot.names, dtype=np.str_),
+            "runtime": snapshot.runtimes,
+            "cpu": snapshot.cpu,
+            "rss": snapshot.rss,
+            "io": snapshot.io,
+            "threads": snapshot.threads,
+        }
+        if self._wal is None:
+            self._wal = open(self._wal_path(self._next_seq), "ab")
+        record = io.BytesIO()
+        np.savez(record, **arrays)
+        self._wal.write(_WAL_LENGTH.pack(record.tell()) + record.getvalue())
+        self._wal.flush()
+        os.fsync(self._wal.fileno())
+        self._buffer_arrays(arrays)
+        if (self._buffered_rows >= self.chunk_rows
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """Write buffered samples as a new chunk and rotate old chunks."""
+        self._last_flush = time.monotonic()
+        if not self._buffered_rows:
+            return
+        arrays = {
+            column: np.concatenate(parts).astype(dtype)
+            for (column, dtype), parts in zip(COLUMNS.items(), self._buffer.values())
+        }
+        path = os.path.join(self.directory, f"chunk-{self._next_seq:08d}.npz")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(tmp_path, path)
+        # The chunk is durable; its write-ahead file is no longer needed
+        if self._wal is not None:
+            self._wal.close()
+            self._wal = None
+            os.remove(self._wal_path(self._next_seq))
+        self._next_seq += 1
+        self._buffer = {column: [] for column in COLUMNS}
+        self._buffered_rows = 0
+
+        for old in self.chunks()[:-self.max_chunks]:
+            os.remove(old)
+
+    def iter_chunks(self, columns=None, first_seq=0):
+        """Yield each stored chunk (with sequence >= first_seq) as a dict of column arrays."""
+        for path in self.chunks(first_seq):
+            try:
+                with np.load(path) as data:
+                    yield {column: data[column] for column in (columns or COLUMNS)}
+            except FileNotFoundError:
+                continue  # Rotated away while reading
+
+
+_WAL_LENGTH = struct.Struct("!Q")  # byte length of the .npz record that follows
+
+
+def _read_wal(path):
+    """Yield the column arrays of each complete record in a write-ahead file."""
+    with open(path, "rb") as f:
+        data = f.read()
+    offset = 0
+    while offset + _WAL_LENGTH.size <= len(data):
+        (length,) = _WAL_LENGTH.unpack_from(data, offset)
+        start = offset + _WAL_LENGTH.size
+        if start + length > len(data):
+            break  # Torn by the crash while being written
+        with np.load(io.BytesIO(data[start:start + length])) as record:
+            yield {column: record[column] for column in COLUMNS}
+        offset = start + length
@@ -0,0 +1,70 @@
+# Refresh interval (seconds) when nothing else applies
+BASE_INTERVAL = 10.0
+MIN_INTERVAL = 2.0
+MAX_INTERVAL = 120.0
+# Fraction of one core refreshes may use on average (0.02 = 2%)
+CPU_BUDGET = 0.02
+# Memory usage (%) from which refreshes speed up, reaching MIN_INTERVAL at 100%
+PRESSURE_THRESHOLD = 80.0
+# Weight of the newest scan cost in its moving average
+COST_SMOOTHING = 0.3
+
+
+class RefreshScheduler:
+    """
+    Chooses the delay before the next refresh.
+
+    The delay is the base interval, shortened under memory pressure, but
+    never less than what keeps refreshes within the CPU budget: a refresh
+    costing c CPU-seconds is scheduled at least c / cpu_budget seconds after
+    the previous one (using a moving average of c). While hidden, refreshes
+    pause, or run every `hidden_interval` seconds if one is set.
+    """
+
+    def __init__(self, base_interval=BASE_INTERVAL, min_interval=MIN_INTERVAL,
+                 max_interval=MAX_INTERVAL, cpu_budget=CPU_BUDGET,
+                 pressure_threshold=PRESSURE_THRESHOLD, hidden_interval=None):
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.cpu_budget = cpu_budget
+        self.pressure_threshold = pressure_threshold
+        self.hidden_interval = hidden_interval
+        self.visible = True
+        self.memory_percent = 0.0
+        self.scan_cost = None  # Moving average of CPU seconds per refresh
+
+    def record_cost(self, cpu_seconds):
+        """Record the CPU time one refresh took."""
+        if self.scan_cost is None:
+            self.scan_cost = cpu_seconds
+        else:
+            self.scan_cost += COST_SMOOTHING * (cpu_seconds - self.scan_cost)
+
+    def set_visible(self, visible):
+        self.visible = visible
+
+    def set_memory_percent(self, percent):
+        self.memory_percent = percent
+
+    def budget_interval(self):
+        """Shortest interval that keeps refreshes within the CPU budget."""
+        if not self.scan_cost or self.cpu_budget <= 0:
+            return 0.0
+        return self.scan_cost / self.cpu_budget
+
+    def next_interval(self):
+        """Seconds until the next refresh, or None to pause refreshes."""
+        if not self.visible:
+            if self.hidden_interval is None:
+                return None
+            return max(self.hidden_interval, self.budget_interval())
+        interval = self.base_interval
+        if self.memory_percent > self.pressure_threshold:
+            # Interpolate towards min_interval as memory fills up
+            pressure = min(1.0, (self.memory_percent - self.pressure_threshold)
+                           / (100.0 - self.pressure_threshold))
+            interval -= pressure * (self.base_interval - self.min_interval)
+        interval = min(max(interval, self.min_interval), self.max_interval)
+        # The budget wins over every other bound
+        return max(interval, self.budget_interval())
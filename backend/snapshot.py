@@ -0,0 +1,205 @@
+# Process snapshots shared by every consumer. psutil is only imported by the
+# psutil collector, so the /proc fast path (and a cold `cli.py list`) skips it.
+import time
+import threading
+import numpy as np
+import instrumentation
+
+# Default UID for platforms without proc.uids() (e.g. Windows)
+DEFAULT_UID = 1000
+
+
+class ProcessSnapshot:
+    """
+    Columnar view of every process, collected in a single pass.
+
+    Each attribute is an array indexed by row, so consumers (process table,
+    ML suggestions, optimizer) can share one scan instead of querying psutil
+    again for every pid:
+      - pids, names, create_times, uids, cpu (percent), rss (bytes)
+      - threads, io (bytes read + written; -1 when not collected or denied)
+      - cpu_measured: False for rows the collector saw for the first time,
+        whose cpu is 0.0 because there was no interval to measure it over
+    """
+
+    def __init__(self, timestamp, pids, names, create_times, uids, cpu, rss,
+                 threads=None, io=None, cpu_measured=None):
+        self.timestamp = timestamp
+        self.pids = np.asarray(pids, dtype=np.int64)
+        self.names = list(names)
+        self.create_times = np.asarray(create_times, dtype=np.float64)
+        self.uids = np.asarray(uids, dtype=np.int64)
+        self.cpu = np.asarray(cpu, dtype=np.float64)
+        self.rss = np.asarray(rss, dtype=np.int64)
+        if threads is None:
+            threads = np.zeros(len(self.pids))
+        self.threads = np.asarray(threads, dtype=np.int32)
+        if io is None:
+            io = np.full(len(self.pids), -1)
+        self.io = np.asarray(io, dtype=np.int64)
+        if cpu_measured is None:
+            cpu_measured = np.ones(len(self.pids), dtype=bool)
+        self.cpu_measured = np.asarray(cpu_measured, dtype=bool)
+        self._groups = None
+
+    def __len__(self):
+        return len(self.pids)
+
+    @property
+    def runtimes(self):
+        """Runtime (in seconds) of every process at snapshot time."""
+        return self.timestamp - self.create_times
+
+    def group_by_name(self):
+        """
+        Aggregate rows by process name. Returns a dict of columns:
+          - names: unique process names
+          - pids: list of pid lists, one per name
+          - count, runtime (mean), cpu (sum), rss (sum) as arrays
+        The result is computed once per snapshot and cached.
+        """
+        if self._groups is not None:
+            return self._groups
+
+        codes_by_name = {}
+        codes = np.fromiter(
+            (codes_by_name.setdefault(name, len(codes_by_name)) for name in self.names),
+            dtype=np.int64, count=len(self.names)
+        )
+        n_groups = len(codes_by_name)
+        count = np.bincount(codes, minlength=n_groups)
+        runtime_sum = np.bincount(codes, weights=self.runtimes, minlength=n_groups)
+        cpu_sum = np.bincount(codes, weights=self.cpu, minlength=n_groups)
+        rss_sum = np.bincount(codes, weights=self.rss, minlength=n_groups)
+
+        members = [[] for _ in range(n_groups)]
+        for code, pid in zip(codes.tolist(), self.pids.tolist()):
+            members[code].append(pid)
+
+        self._groups = {
+            "names": list(codes_by_name),
+            "pids": members,
+            "count": count,
+            "runtime": runtime_sum / np.maximum(count, 1),
+            "cpu": cpu_sum,
+            "rss": rss_sum,
+        }
+        return self._groups
+
+
+class ProcessHandleCache:
+    """
+    Long-lived psutil.Process handles, one per process identity (pid and
+    create time).
+
+    Handles survive between snapshots, so CPU percent is computed from the
+    CPU time consumed since the previous snapshot rather than from a fresh
+    handle (whose first cpu_percent() call always returns 0.0). A cached
+    handle is reused only while is_running() confirms its pid still belongs
+    to the same process; a reused pid gets a new handle. Entries not seen in
+    a scan are evicted. I/O counters are only read when `collect_io` is set.
+    """
+
+    def __init__(self, collect_io=False):
+        self.collect_io = collect_io
+        self.lock = threading.Lock()
+        self._entries = {}  # pid -> [handle, cpu_time, sampled_at]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def collect(self):
+        """Read every live process once and return a ProcessSnapshot."""
+        import psutil
+        now = time.time()
+        entries = {}
+        pids, rows = [], []
+        for pid in sorted(psutil.pids()):
+            try:
+                entry = self._entries.get(pid)
+                if entry is None or not entry[0].is_running():
+                    entry = [psutil.Process(pid), 0.0, None]
+                rows.append(self._read(entry, entry[0].create_time(), now))
+            except psutil.AccessDenied:
+                instrumentation.count("access_denied")
+                continue
+            except psutil.NoSuchProcess:
+                continue
+            entries[pid] = entry
+            pids.append(pid)
+        self._entries = entries
+        columns = list(zip(*rows)) if rows else [()] * 8
+        return ProcessSnapshot(now, pids, *columns)
+
+    def _read(self, entry, create_time, now):
+        name, uid, cpu_time, rss, threads, io = _read_process(entry[0], self.collect_io)
+        measured = entry[2] is not None and now > entry[2]
+        if measured:
+            cpu = (cpu_time - entry[1]) / (now - entry[2]) * 100
+        else:
+            cpu = 0.0  # First contact, no interval to measure yet
+        entry[1] = cpu_time
+        entry[2] = now
+        return name, create_time, uid, cpu, rss, threads, io, measured
+
+
+def _read_process(proc, collect_io=False):
+    """Read every attribute a snapshot needs from one process inside oneshot()."""
+    import psutil
+    with proc.oneshot():
+        name = proc.name()
+        if hasattr(proc, "uids"):
+            uid = proc.uids().real
+        else:
+            uid = DEFAULT_UID
+        times = proc.cpu_times()
+        rss = proc.memory_info().rss
+        threads = proc.num_threads()
+        io = -1
+        if collect_io and hasattr(proc, "io_counters"):
+            try:
+                counters = proc.io_counters()
+                io = counters.read_bytes + counters.write_bytes
+            except psutil.AccessDenied:
+                pass
+    return name, uid, times.user + times.system, rss, threads, io
+
+
+# Use the Linux /proc fast path when available (psutil is the fallback)
+USE_PROCFS = True
+
+_collector = None
+_collector_lock = threading.Lock()
+
+
+def create_collector(collect_io=False):
+    """
+    Create a collector: a procfs.ProcfsCollector on Linux, or a
+    ProcessHandleCache on other platforms or if /proc can't be parsed.
+    """
+    import procfs
+    if USE_PROCFS and procfs.is_supported():
+        try:
+            return procfs.ProcfsCollector(collect_io=collect_io)
+        except (OSError, RuntimeError, ValueError) as e:
+            print(f"procfs collector unavailable ({e}); using psutil")
+    return ProcessHandleCache(collect_io=collect_io)
+
+
+def get_collector():
+    """Return the collector shared by take_snapshot()."""
+    global _collector
+    with _collector_lock:
+        if _collector is None:
+            _collector = create_collector()
+        return _collector
+
+
+def take_snapshot(collector=None):
+    """Walk the process table once and return a ProcessSnapshot."""
+    if collector is None:
+        collector = get_collector()
+    with collector.lock, instrumentation.phase("scan"):
+        snapshot = collector.collect()
+    instrumentation.count("processes_scanned", len(snapshot))
+    return snapshot
@@ -0,0 +1,143 @@
+import heapq
+import itertools
+import psutil
+import core
+from reclaim import get_estimator
+from snapshot import take_snapshot
+
+# The session ends once RAM usage drops below this percentage
+RAM_TARGET_PERCENT = 65
+# Seconds to wait for a closed group's processes to exit
+SETTLE_TIMEOUT = 5.0
+# Relative RSS change after which a group's reclaim estimate is re-measured
+RESCORE_TOLERANCE = 0.1
+
+
+class SuggestionSession:
+    """
+    An interactive run of ML suggestions: close the group that frees the
+    most memory, one at a time, until RAM usage is below the target.
+
+    Candidates are ranked once into a max-heap. Groups the estimator hasn't
+    measured enter with their RSS as key, an upper bound of what closing them
+    frees, and are measured only when they reach the top. After a close only
+    the groups whose processes or RSS changed are re-queued (heap entries
+    carry a version, so stale ones are skipped when popped).
+    """
+
+    def __init__(self, snapshot=None, ram_target=RAM_TARGET_PERCENT, settle_timeout=SETTLE_TIMEOUT):
+        self.ram_target = ram_target
+        self.settle_timeout = settle_timeout
+        self.estimator = get_estimator()
+        self.snapshot = snapshot if snapshot is not None else take_snapshot()
+        self._heap = []
+        self._counter = itertools.count()  # Tie-breaker, keeps equal keys in rank order
+        self._groups = {}  # name -> current suggestion dict
+        self._versions = {}  # name -> version of its live heap entry
+        self.rejected = set()
+        self.rescored = 0  # Groups re-queued after closes, for diagnostics
+        for suggestion in core.get_ml_suggestions(self.snapshot):
+            self._push(suggestion)
+
+    def _push(self, suggestion):
+        name = suggestion["name"]
+        version = self._versions.get(name, -1) + 1
+        self._versions[name] = version
+        self._groups[name] = suggestion
+        key = suggestion["reclaim_mb"] if suggestion["reclaim_mb"] is not None else suggestion["total_mem"]
+        heapq.heappush(self._heap, (-key, next(self._counter), name, version))
+
+    def _measure(self, suggestion):
+        create_times = dict(zip(self.snapshot.pids.tolist(), self.snapshot.create_times.tolist()))
+        rss = dict(zip(self.snapshot.pids.tolist(), self.snapshot.rss.tolist()))
+        uss, pss, exact = self.estimator.group_memory(suggestion["pids"], create_times, rss)
+        suggestion["reclaim_mb"] = uss / (1024 * 1024)
+        suggestion["pss_mb"] = pss / (1024 * 1024)
+        suggestion["reclaim_exact"] = exact
+        suggestion["score"] = suggestion["reclaim_mb"]
+
+    def ram_ok(self):
+        return psutil.virtual_memory().percent < self.ram_target
+
+    def next(self):
+        """The best remaining suggestion, or None when there are no more."""
+        while self._heap:
+            neg_key, _, name, version = self._heap[0]
+            if self._versions.get(name) != version or name in self.rejected:
+                heapq.heappop(self._heap)
+                continue
+            suggestion = self._groups[name]
+            if suggestion["reclaim_mb"] is None:
+                # Its key was only an upper bound: measure it and let it compete again
+                heapq.heappop(self._heap)
+                self._measure(suggestion)
+                self._push(suggestion)
+                continue
+            return suggestion
+        return None
+
+    def reject(self, suggestion):
+        """Don't suggest this group again in this session."""
+        self.rejected.add(suggestion["name"])
+
+    def accept(self, suggestion):
+        """
+        Terminate the group and wait (up to settle_timeout) for its processes
+        to exit; this blocks, so a UI calls it off its event thread. Returns
+        a list of "pid: error" strings for processes that couldn't be
+        terminated. Call refresh() with a snapshot taken after this returns
+        before asking for the next suggestion.
+        """
+        create_times = dict(zip(self.snapshot.pids.tolist(), self.snapshot.create_times.tolist()))
+        procs, errors = [], []
+        for pid in suggestion["pids"]:
+            try:
+                proc = psutil.Process(pid)
+                # Skip pids reused by another process since the snapshot
+                if proc.create_time() != create_times.get(pid):
+                    continue
+                proc.terminate()
+                procs.append(proc)
+            except psutil.NoSuchProcess:
+                continue
+            except Exception as e:
+                errors.append(f"{pid}: {e}")
+
+        if procs:
+            _, procs = psutil.wait_procs(procs, timeout=self.settle_timeout)
+        errors.extend(f"{proc.pid}: still running" for proc in procs)
+
+        self._versions.pop(suggestion["name"], None)
+        return errors
+
+    def refresh(self, snapshot):
+        """Re-queue candidate groups whose processes or memory changed in `snapshot`."""
+        self.snapshot = snapshot
+        current = {}
+        for group in core.get_process_list(self.snapshot):
+            if group["priority"] <= core.SUGGESTION_PRIORITY_THRESHOLD:
+                current[group["name"]] = group
+
+        for name in list(self._versions):
+            if name not in current:
+                del self._versions[name]  # Exited or no longer a candidate
+        for name, group in current.items():
+            if name in self.rejected:
+                continue
+            old = self._groups.get(name) if name in self._versions else None
+            if (old is not None and old["pids"] == group["pids"]
+                    and abs(group["mem"] - old["total_mem"]) <= RESCORE_TOLERANCE * old["total_mem"]):
+                continue
+            self.rescored += 1
+            self._push({
+                "name": name,
+                "count": group["count"],
+                "pids": group["pids"],
+                "total_cpu": group["cpu"],
+                "total_mem": group["mem"],
+                "priority": group["priority"],
+                "reclaim_mb": None,
+                "pss_mb": None,
+                "reclaim_exact": False,
+                "score": None,
+            })
@@ -0,0 +1,81 @@
+import threading
+import time
+import pytest
+import agent
+from fake_procs import FakeProcessSource
+
+
+def serve(server):
+    server.start()
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    return thread
+
+
+def command(server, op, token=None, timeout=5.0):
+    """Connect a console, send one command and return (result, sent at, received at)."""
+    host, port = server.address
+    console = agent.Aggregator([(host, port)], token=token)
+    try:
+        deadline = time.monotonic() + timeout
+        while not console.remotes[0].ready and time.monotonic() < deadline:
+            console.poll(0.05)
+        started = time.monotonic()
+        request_id = console.command(f"{host}:{port}", op, "")
+        while request_id not in console.results and time.monotonic() < deadline:
+            console.poll(0.05)
+        return console.results.get(request_id), started, time.monotonic()
+    finally:
+        console.close()
+
+
+def make_agent(**kwargs):
+    source = FakeProcessSource(n_processes=50, n_names=10)
+    return agent.Agent(port=0, interval=0.1, source=source.collect, **kwargs)
+
+
+def test_commands_need_a_token():
+    server = make_agent()
+    thread = serve(server)
+    try:
+        result, _, _ = command(server, "optimize")
+    finally:
+        server.stop()
+        thread.join()
+    assert result == {"ok": False, "error": "commands need a token on this agent"}
+
+
+def test_non_loopback_bind_needs_a_token():
+    server = agent.Agent(host="0.0.0.0", port=0)
+    with pytest.raises(ValueError):
+        server.start()
+    server.close()
+    assert agent.is_loopback("127.0.0.1")
+    assert agent.is_loopback("::1")
+    assert not agent.is_loopback("0.0.0.0")
+
+
+def test_optimize_does_not_block_the_agent(monkeypatch):
+    execute = agent.Agent.execute
+
+    def slow_execute(self, op, name):
+        if op == agent.OPTIMIZE:
+            time.sleep(1.0)
+            return {"ok": True}
+        return execute(self, op, name)
+
+    monkeypatch.setattr(agent.Agent, "execute", slow_execute)
+    server = make_agent(token="secret")
+    thread = serve(server)
+    try:
+        ticks = []
+        original_tick = server.tick
+        server.tick = lambda: (ticks.append(time.monotonic()), original_tick())
+        result, sent, received = command(server, "optimize", token="secret")
+    finally:
+        server.stop()
+        thread.join()
+    assert result == {"ok": True}
+    assert received - sent >= 1.0
+    # The select loop kept scanning while the optimize ran
+    assert len([t for t in ticks if sent < t < sent + 1.0]) >= 5
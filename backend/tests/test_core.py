@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+import core
+
+
+@pytest.fixture(autouse=True)
+def restore_model():
+    model, loaded = core._model, core._model_loaded
+    yield
+    core.set_model(model)
+    core._model_loaded = loaded
+
+
+class ConstantModel:
+    """Predicts `value` for every runtime; `during_predict` runs inside predict()."""
+
+    def __init__(self, value, during_predict=None):
+        self.value = value
+        self.during_predict = during_predict
+
+    def predict(self, runtimes):
+        if self.during_predict is not None:
+            self.during_predict()
+        return np.full(len(runtimes), self.value)
+
+
+def test_predictions_are_cached_per_model():
+    core.set_model(ConstantModel(3.0))
+    runtimes = np.array([10.0, 100.0, 1000.0])
+    assert core.predict_priorities(runtimes).tolist() == [3.0, 3.0, 3.0]
+    core.set_model(ConstantModel(7.0))
+    assert core.predict_priorities(runtimes).tolist() == [7.0, 7.0, 7.0]
+
+
+def test_swap_during_a_predict_takes_effect():
+    new = ConstantModel(7.0)
+    # The swap lands while the old model is still predicting, as when the GUI
+    # thread swaps in a retrained model during a scan
+    old = ConstantModel(3.0, during_predict=lambda: core.set_model(new))
+    core.set_model(old)
+    runtimes = np.array([10.0, 100.0, 1000.0])
+    assert core.predict_priorities(runtimes).tolist() == [3.0, 3.0, 3.0]
+    assert core.predict_priorities(runtimes).tolist() == [7.0, 7.0, 7.0]
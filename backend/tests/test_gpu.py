@@ -0,0 +1,84 @@
+import logging
+import gpu
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FlakyFactory:
+    """Fails to open a source until `providers` has entries, then hands them out."""
+
+    def __init__(self):
+        self.providers = []
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if not self.providers:
+            raise gpu.GpuUnavailable("no GPU")
+        return self.providers.pop(0)
+
+
+def test_fake_provider_replays_and_repeats_the_last_value():
+    provider = gpu.FakeGpuProvider([10.0, None, 30.0])
+    assert [provider.sample() for _ in range(5)] == [10.0, None, 30.0, 30.0, 30.0]
+    provider.close()
+    assert provider.closed
+
+
+def test_unavailable_source_is_retried_with_doubling_backoff():
+    clock = FakeClock()
+    factory = FlakyFactory()
+    provider = gpu.BackoffGpuProvider(factory, initial_backoff=5.0, max_backoff=20.0, clock=clock)
+    attempts = []
+    for second in range(0, 60):
+        clock.now = float(second)
+        calls = factory.calls
+        assert provider.sample() == 0.0
+        if factory.calls > calls:
+            attempts.append(second)
+    assert attempts == [0, 5, 15, 35, 55]  # 5, 10, 20, then capped at 20
+    assert not provider.available
+
+
+def test_failing_source_is_closed_and_reopened():
+    clock = FakeClock()
+    factory = FlakyFactory()
+    first = gpu.FakeGpuProvider([40.0, None])
+    second = gpu.FakeGpuProvider([60.0])
+    factory.providers = [first, second]
+    provider = gpu.BackoffGpuProvider(factory, initial_backoff=5.0, clock=clock)
+    assert provider.sample() == 40.0
+    assert provider.available
+    assert provider.sample() == 0.0  # The source stopped
+    assert first.closed and not provider.available
+    clock.now = 4.0
+    assert provider.sample() == 0.0  # Still backing off
+    clock.now = 5.0
+    assert provider.sample() == 60.0
+    provider.close()
+    assert second.closed
+
+
+def test_only_availability_changes_are_logged(caplog):
+    clock = FakeClock()
+    factory = FlakyFactory()
+    provider = gpu.BackoffGpuProvider(factory, initial_backoff=1.0, max_backoff=1.0, clock=clock)
+    with caplog.at_level(logging.INFO, logger="gpu"):
+        for second in range(5):
+            clock.now = float(second)
+            provider.sample()
+        factory.providers = [gpu.FakeGpuProvider([25.0])]
+        clock.now = 5.0
+        assert provider.sample() == 25.0
+        clock.now = 6.0
+        provider.sample()
+    messages = [record.getMessage() for record in caplog.records]
+    assert len(messages) == 2
+    assert messages[0].startswith("GPU usage unavailable")
+    assert messages[1] == "GPU usage available again"
@@ -0,0 +1,60 @@
+import os
+import numpy as np
+import pytest
+import model_table
+
+xgboost = pytest.importorskip("xgboost")
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+# priority_model.json: XGBRegressor(n_estimators=20, max_depth=3) fitted on
+# exponential runtimes (mean 3600s) labelled by decile, as bench_table does.
+# priority_table.npz: compile_model() of that model when the fixture was made.
+MODEL_PATH = os.path.join(FIXTURES, "priority_model.json")
+TABLE_PATH = os.path.join(FIXTURES, "priority_table.npz")
+
+
+@pytest.fixture(scope="module")
+def model():
+    model = xgboost.XGBRegressor()
+    model.load_model(MODEL_PATH)
+    return model
+
+
+def test_compiled_table_matches_pinned_table(model):
+    table = model_table.compile_model(model)
+    pinned = model_table.load_table(TABLE_PATH)
+    np.testing.assert_array_equal(table.thresholds, pinned.thresholds)
+    np.testing.assert_allclose(table.values, pinned.values, atol=model_table.PARITY_TOLERANCE)
+
+
+def test_table_matches_model_predictions(model):
+    table = model_table.load_table(TABLE_PATH)
+    runtimes = model_table.parity_runtimes(table, 0, 40000)
+    assert model_table.verify_table(model, table, runtimes) <= model_table.PARITY_TOLERANCE
+
+
+def test_table_matches_model_at_thresholds(model):
+    # Split conditions are float32 and the left interval is open: a runtime
+    # equal to a threshold must go right, just below it must go left
+    table = model_table.load_table(TABLE_PATH)
+    t = table.thresholds.astype(np.float64)
+    for runtimes in (t, np.nextafter(t, -np.inf), np.nextafter(t, np.inf)):
+        expected = model.predict(runtimes.reshape(-1, 1))
+        np.testing.assert_allclose(table.predict(runtimes), expected, atol=model_table.PARITY_TOLERANCE)
+
+
+def test_export_round_trip(model, tmp_path):
+    path = str(tmp_path / "table.npz")
+    exported = model_table.export_table(model, 0, 40000, path=path)
+    loaded = model_table.load_table(path)
+    np.testing.assert_array_equal(loaded.thresholds, exported.thresholds)
+    np.testing.assert_array_equal(loaded.values, exported.values)
+    assert not os.path.exists(f"{path}.tmp")
+
+
+def test_multi_feature_model_is_rejected():
+    rng = np.random.default_rng(0)
+    model = xgboost.XGBRegressor(n_estimators=2, max_depth=2)
+    model.fit(rng.random((50, 2)), rng.random(50))
+    with pytest.raises(ValueError):
+        model_table.compile_model(model)
@@ -0,0 +1,50 @@
+import subprocess
+import sys
+import time
+import psutil
+import pytest
+import optimizer
+from snapshot import ProcessSnapshot
+
+
+class AllowAll:
+    """Idle policy that screens nothing out; idle means under 5% CPU."""
+
+    def screen(self, snapshot):
+        return list(range(len(snapshot))), {}
+
+    def is_idle_cpu(self, cpu):
+        return cpu < 5.0
+
+
+@pytest.fixture
+def busy_process():
+    proc = subprocess.Popen([sys.executable, "-c", "while True: pass"])
+    yield psutil.Process(proc.pid)
+    proc.kill()
+    proc.wait()
+
+
+def snapshot_of(proc, cpu, cpu_measured):
+    return ProcessSnapshot(time.time(), [proc.pid], [proc.name()], [proc.create_time()], [1000],
+                           [cpu], [proc.memory_info().rss], cpu_measured=[cpu_measured])
+
+
+def test_first_contact_rows_are_measured(busy_process):
+    # A collector's first scan reports 0% for every process; that is no reading
+    snapshot = snapshot_of(busy_process, 0.0, cpu_measured=False)
+    result = optimizer.clean_memory(snapshot, cpu_window=0, policy=AllowAll())
+    assert result["idle"] == []
+    assert result["skipped"] == {"cpu": 1}
+
+
+def test_measured_rows_trust_the_snapshot(busy_process, monkeypatch):
+    def sample_cpu(candidates, window):
+        assert not candidates, "the snapshot's reading should have been used"
+        return []
+
+    monkeypatch.setattr(optimizer, "_sample_cpu", sample_cpu)
+    snapshot = snapshot_of(busy_process, 0.0, cpu_measured=True)
+    result = optimizer.clean_memory(snapshot, cpu_window=0, policy=AllowAll())
+    assert [info["pid"] for info in result["idle"]] == [busy_process.pid]
+    assert result["dry_run"] and result["terminated"] == []
@@ -0,0 +1,21 @@
+from policy import IdlePolicy, compile_patterns
+
+
+def test_patterns_are_literal_substrings():
+    pattern = compile_patterns(["c++", "a.b", "Helper"])
+    assert pattern.search("clang-c++-server")
+    assert pattern.search("A.B-daemon")
+    assert not pattern.search("axb")
+    assert pattern.search("gpu-helper")
+
+
+def test_regex_patterns_need_the_prefix():
+    pattern = compile_patterns([r"re:^daemon\d+$"])
+    assert pattern.search("daemon42")
+    assert not pattern.search("mydaemon42")
+
+
+def test_blacklist_overrides_whitelist():
+    policy = IdlePolicy(whitelist=["helper"], blacklist=["re:^bad-"])
+    assert policy.name_decision("good-helper") == "whitelisted"
+    assert policy.name_decision("bad-helper") is None
@@ -0,0 +1,120 @@
+import logging
+import os
+import time
+import pressure
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_watcher(tmp_path, events, **kwargs):
+    psi_path = str(tmp_path / "memory")
+    events_path = str(tmp_path / "memory.events")
+    pressure.write_fake_psi(psi_path)
+    pressure.write_fake_memory_events(events_path)
+    kwargs.setdefault("use_triggers", False)
+    watcher = pressure.PressureWatcher(events.append, psi_path=psi_path, cgroup_events=events_path, **kwargs)
+    return watcher, psi_path, events_path
+
+
+def open_fds():
+    return len(os.listdir("/proc/self/fd"))
+
+
+def test_read_fake_files(tmp_path):
+    psi_path = str(tmp_path / "memory")
+    events_path = str(tmp_path / "memory.events")
+    pressure.write_fake_psi(psi_path, some_avg10=12.5, some_total=300)
+    pressure.write_fake_memory_events(events_path, high=4, oom_kill=1)
+    psi = pressure.read_psi(psi_path)
+    assert psi["some"]["avg10"] == 12.5
+    assert psi["some"]["total"] == 300
+    assert psi["full"]["avg10"] == 0.0
+    counters = pressure.read_memory_events(events_path)
+    assert counters["high"] == 4
+    assert counters["oom_kill"] == 1
+    assert counters["max"] == 0
+    assert pressure.read_psi(str(tmp_path / "missing")) is None
+    assert pressure.read_memory_events(str(tmp_path / "missing")) is None
+
+
+def test_psi_stall_over_threshold_trips(tmp_path):
+    events = []
+    watcher, psi_path, _ = make_watcher(tmp_path, events, poll_stall_percent=10.0)
+    watcher.check()
+    assert events == []
+    pressure.write_fake_psi(psi_path, some_avg10=25.0)
+    watcher.check()
+    assert len(events) == 1
+    assert events[0]["source"] == "poll"
+    assert events[0]["psi"]["some"]["avg10"] == 25.0
+    assert events[0]["events"] is None
+
+
+def test_cgroup_counter_increase_trips(tmp_path):
+    events = []
+    watcher, _, events_path = make_watcher(tmp_path, events)
+    pressure.write_fake_memory_events(events_path, low=7)
+    watcher.check()
+    assert events == []  # "low" is not a pressure counter
+    pressure.write_fake_memory_events(events_path, low=7, high=2, oom_kill=1)
+    watcher.check()
+    assert len(events) == 1
+    assert events[0]["events"] == {"high": 2, "oom_kill": 1}
+
+
+def test_cooldown_coalesces_events(tmp_path):
+    events = []
+    clock = FakeClock()
+    watcher, psi_path, _ = make_watcher(tmp_path, events, cooldown=30.0, clock=clock)
+    pressure.write_fake_psi(psi_path, some_avg10=50.0)
+    watcher.check()
+    clock.now = 10.0
+    watcher.check()
+    watcher.check()
+    assert len(events) == 1
+    clock.now = 31.0
+    watcher.check()
+    assert len(events) == 2
+    assert events[1]["coalesced"] == 2
+    assert watcher.events == 2
+
+
+def test_handler_failure_is_logged_not_printed(tmp_path, capsys, caplog):
+    watcher, psi_path, _ = make_watcher(tmp_path, [])
+    watcher.on_pressure = lambda event: 1 / 0
+    pressure.write_fake_psi(psi_path, some_avg10=50.0)
+    with caplog.at_level(logging.ERROR, logger="pressure"):
+        watcher.check()
+    assert capsys.readouterr().out == ""
+    assert "Memory pressure handler failed" in caplog.text
+
+
+def test_polling_thread_reports_and_stops(tmp_path):
+    events = []
+    watcher, psi_path, events_path = make_watcher(tmp_path, events, poll_interval=0.02)
+    before = open_fds()
+    watcher.start()
+    deadline = time.monotonic() + 5.0
+    while watcher.mode is None and time.monotonic() < deadline:
+        time.sleep(0.01)  # Running, with the counters' baseline read
+    pressure.write_fake_memory_events(events_path, oom=1)
+    while not events and time.monotonic() < deadline:
+        time.sleep(0.01)
+    watcher.stop()
+    assert watcher.mode == "poll"
+    assert events and events[0]["events"] == {"oom": 1}
+    assert open_fds() == before
+
+
+def test_unstarted_watcher_holds_no_descriptors(tmp_path):
+    before = open_fds()
+    watcher, _, _ = make_watcher(tmp_path, [])
+    assert open_fds() == before
+    watcher.stop()
+    assert open_fds() == before
@@ -0,0 +1,61 @@
+import os
+import procfs
+import snapshot
+
+
+def write_proc(root, stat, pid=1234, name="worker"):
+    with open(os.path.join(root, "stat"), "w") as f:
+        f.write(stat)
+    proc_dir = os.path.join(root, str(pid))
+    os.mkdir(proc_dir)
+    with open(os.path.join(proc_dir, "stat"), "w") as f:
+        f.write(f"{pid} ({name}) S 1 {pid} {pid} 0 -1 4194560 100 0 0 0 "
+                f"50 25 0 0 20 0 3 0 1000 100000000 2000 " + " ".join(["0"] * 30) + "\n")
+    with open(os.path.join(proc_dir, "statm"), "w") as f:
+        f.write("25000 300 1000 100 0 5000 0\n")
+    with open(os.path.join(proc_dir, "status"), "w") as f:
+        f.write(f"Name:\t{name}\nUid:\t1000\t1000\t1000\t1000\n")
+
+
+def many_core_stat(cpus=96):
+    lines = ["cpu  1000 0 1000 100000 0 0 0 0 0 0"]
+    lines += [f"cpu{i} 10 0 10 1000 0 0 0 0 0 0" for i in range(cpus)]
+    lines.append("intr 123456 " + " ".join(["0"] * 6000))
+    lines.append("btime 1700000000")
+    return "\n".join(lines) + "\n"
+
+
+def test_boot_time_past_the_initial_buffer(tmp_path):
+    stat = many_core_stat()
+    assert len(stat) > 14 * 1024
+    write_proc(str(tmp_path), stat)
+    collector = procfs.ProcfsCollector(root=str(tmp_path))
+    assert collector._boot_time == 1700000000.0
+    result = collector.collect()
+    assert result.pids.tolist() == [1234]
+    assert result.names == ["worker"]
+    assert result.create_times[0] == 1700000000.0 + 1000 / procfs.CLOCK_TICKS
+
+
+def test_first_contact_rows_are_marked_unmeasured(tmp_path):
+    write_proc(str(tmp_path), many_core_stat())
+    collector = procfs.ProcfsCollector(root=str(tmp_path))
+    first = collector.collect()
+    assert first.cpu.tolist() == [0.0]
+    assert first.cpu_measured.tolist() == [False]
+    assert collector.collect().cpu_measured.tolist() == [True]
+
+
+def test_small_files_after_a_large_one(tmp_path):
+    write_proc(str(tmp_path), many_core_stat())
+    collector = procfs.ProcfsCollector(root=str(tmp_path))
+    path = os.path.join(str(tmp_path), "1234", "statm")
+    assert collector._read(path) == b"25000 300 1000 100 0 5000 0\n"
+
+
+def test_create_collector_falls_back_to_psutil(monkeypatch):
+    def broken(**kwargs):
+        raise RuntimeError("btime not found")
+    monkeypatch.setattr(procfs, "is_supported", lambda root=procfs.PROC_ROOT: True)
+    monkeypatch.setattr(procfs, "ProcfsCollector", broken)
+    assert isinstance(snapshot.create_collector(), snapshot.ProcessHandleCache)
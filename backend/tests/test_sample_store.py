@@ -0,0 +1,51 @@
+import os
+import numpy as np
+from sample_store import SampleStore
+from snapshot import ProcessSnapshot
+
+
+def make_snapshot(timestamp, n=3):
+    pids = np.arange(100, 100 + n)
+    return ProcessSnapshot(timestamp, pids, [f"proc{i}" for i in range(n)], np.full(n, timestamp - 60.0),
+                           np.full(n, 1000), np.full(n, 1.5), np.full(n, 4096), np.ones(n), np.full(n, -1))
+
+
+def stored_rows(store):
+    return sum(len(chunk["pid"]) for chunk in store.iter_chunks(["pid"]))
+
+
+def test_unflushed_samples_survive_a_crash(tmp_path):
+    store = SampleStore(str(tmp_path), chunk_rows=1000, flush_interval=3600)
+    store.append_snapshot(make_snapshot(1000.0))
+    store.append_snapshot(make_snapshot(1005.0))
+    assert stored_rows(store) == 0
+    # No flush: the process dies with the samples only buffered
+    recovered = SampleStore(str(tmp_path))
+    assert stored_rows(recovered) == 6
+    chunk = next(recovered.iter_chunks())
+    assert chunk["timestamp"].tolist() == [1000.0] * 3 + [1005.0] * 3
+    assert chunk["name"].tolist() == ["proc0", "proc1", "proc2"] * 2
+    assert not [p for p in os.listdir(tmp_path) if p.endswith(".wal")]
+
+
+def test_flushed_samples_are_not_replayed(tmp_path):
+    store = SampleStore(str(tmp_path), chunk_rows=1000, flush_interval=3600)
+    store.append_snapshot(make_snapshot(1000.0))
+    wal = store._wal_path(store._next_seq)
+    with open(wal, "rb") as f:
+        logged = f.read()
+    store.flush()
+    # A crash between writing the chunk and removing its write-ahead file
+    with open(wal, "wb") as f:
+        f.write(logged)
+    assert stored_rows(SampleStore(str(tmp_path))) == 3
+
+
+def test_torn_record_is_ignored(tmp_path):
+    store = SampleStore(str(tmp_path), chunk_rows=1000, flush_interval=3600)
+    store.append_snapshot(make_snapshot(1000.0))
+    store.append_snapshot(make_snapshot(1005.0))
+    wal = store._wal_path(store._next_seq)
+    with open(wal, "r+b") as f:
+        f.truncate(os.path.getsize(wal) - 10)
+    assert stored_rows(SampleStore(str(tmp_path))) == 3
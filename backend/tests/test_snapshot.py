@@ -0,0 +1,32 @@
+import os
+import psutil
+import snapshot
+
+
+def test_handles_are_reused_between_scans():
+    cache = snapshot.ProcessHandleCache()
+    cache.collect()
+    handle = cache._entries[os.getpid()][0]
+    cache.collect()
+    assert cache._entries[os.getpid()][0] is handle
+
+
+def test_reused_pid_gets_a_new_handle(monkeypatch):
+    cache = snapshot.ProcessHandleCache()
+    cache.collect()
+    handle = cache._entries[os.getpid()][0]
+    # As if the pid now belonged to another process
+    monkeypatch.setattr(handle, "is_running", lambda: False)
+    snap = cache.collect()
+    assert cache._entries[os.getpid()][0] is not handle
+    row = snap.pids.tolist().index(os.getpid())
+    assert snap.cpu[row] == 0.0 and not snap.cpu_measured[row]  # Nothing carried over
+    assert snap.create_times[row] == psutil.Process().create_time()
+
+
+def test_first_contact_rows_are_marked_unmeasured():
+    cache = snapshot.ProcessHandleCache()
+    first = cache.collect()
+    assert not first.cpu_measured.any()
+    second = cache.collect()
+    assert second.cpu_measured[second.pids.tolist().index(os.getpid())]
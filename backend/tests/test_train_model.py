@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+train_model = pytest.importorskip("train_model")
+
+
+def write_csv(path, n, seed):
+    rng = np.random.default_rng(seed)
+    runtimes = rng.exponential(3600, n)
+    priorities = 1 + np.searchsorted(np.percentile(runtimes, range(10, 100, 10)), runtimes, side="right")
+    with open(path, "w") as f:
+        f.write("process_name,runtime_seconds,numeric_priority\n")
+        f.writelines(f"p{i},{r:.1f},{p}\n" for i, (r, p) in enumerate(zip(runtimes, priorities)))
+
+
+def test_incremental_training_continues_on_a_changed_csv(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    write_csv(train_model.CSV_FILE, 500, seed=0)
+    first = train_model.train_model()
+    assert first["rounds"] == train_model.N_ESTIMATORS
+
+    assert train_model.train_model(incremental=True) is None
+    assert "unchanged since the last model" in capsys.readouterr().out
+
+    write_csv(train_model.CSV_FILE, 800, seed=1)
+    second = train_model.train_model(incremental=True)
+    assert second["rounds"] == train_model.N_ESTIMATORS + train_model.INCREMENTAL_ROUNDS
+    assert second["rows"] > first["rows"]
@@ -1,46 +1,253 @@
-import pandas as pd
+import os
+import tempfile
+import time
 import joblib
-from sklearn.model_selection import train_test_split
+import numpy as np
+import pandas as pd
+import xgboost as xgb
 from xgboost import XGBRegressor
-import os
+from xgboost.callback import TrainingCallback
+from labeling import label_runtimes, streaming_thresholds
+from model_table import TABLE_PATH, export_table
+from sample_store import STORE_DIR, SampleStore
 
 CSV_FILE = "training_data.csv"
 MODEL_FILE = "ml_model.pkl"
+N_ESTIMATORS = 100
+# Boosting rounds added per incremental update
+INCREMENTAL_ROUNDS = 20
+# Fraction of every chunk held out for evaluation, chosen by a seeded RNG
+TEST_SIZE = 0.2
+SPLIT_SEED = 42
+# Rows per batch when streaming the CSV
+CSV_CHUNK_ROWS = 100000
+# Booster attribute recording the sample store chunks already trained on
+CHUNKS_SEEN_ATTR = "chunks_seen"
+# Booster attribute recording the version of the CSV file trained on
+CSV_SEEN_ATTR = "csv_seen"
+
+class TrainingCancelled(Exception):
+    """Raised when training is cancelled before the model is saved."""
+
+class ProgressCallback(TrainingCallback):
+    """Reports boosting progress and stops training once cancellation is requested."""
+
+    def __init__(self, total, progress=None, should_cancel=None):
+        super().__init__()
+        self.total = total
+        self.progress = progress
+        self.should_cancel = should_cancel
+        self.cancelled = False
+
+    def after_iteration(self, model, epoch, evals_log):
+        if self.progress is not None:
+            self.progress(epoch + 1, self.total)
+        self.cancelled = self.should_cancel is not None and self.should_cancel()
+        return self.cancelled  # Returning True stops boosting
+
+class ChunkIter(xgb.DataIter):
+    """
+    Feeds (runtime, priority) chunks to xgboost one at a time.
+
+    `load_chunks` is called at the start of every pass and yields
+    (runtimes, priorities) arrays. Rows are split into train/eval with a
+    per-chunk seeded RNG, so each pass sees the same split without keeping
+    any data in memory.
+    """
+
+    def __init__(self, load_chunks, holdout, cache_prefix=None):
+        super().__init__(cache_prefix=cache_prefix)
+        self.load_chunks = load_chunks
+        self.holdout = holdout
+        self._chunks = None
+        self._index = 0
+        self._pass_rows = 0
+        self.rows = 0  # Rows fed in the last complete pass
+        self.low = np.inf
+        self.high = -np.inf
+
+    def reset(self):
+        self._chunks = None
+        self._index = 0
+        self._pass_rows = 0
+
+    def next(self, input_data):
+        if self._chunks is None:
+            self._chunks = iter(self.load_chunks())
+        for runtimes, priorities in self._chunks:
+            rng = np.random.default_rng((SPLIT_SEED, self._index))
+            self._index += 1
+            mask = (rng.random(len(runtimes)) < TEST_SIZE) == self.holdout
+            if not mask.any():
+                continue
+            x = runtimes[mask]
+            self._pass_rows += len(x)
+            self.low = min(self.low, float(x.min()))
+            self.high = max(self.high, float(x.max()))
+            input_data(data=x.reshape(-1, 1), label=priorities[mask])
+            return True
+        self.rows = self._pass_rows
+        return False
 
-def train_model():
+def dump_atomic(model, path):
+    """Pickle the model to a temp file and rename it over `path`."""
+    tmp_path = f"{path}.tmp"
+    joblib.dump(model, tmp_path)
+    os.replace(tmp_path, path)
+
+def _store_source(store, first_seq):
+    """Chunk loader over the sample store, labelled like export_training_csv()."""
+    if store is None:
+        return None, first_seq
+    thresholds = streaming_thresholds(chunk["runtime"] for chunk in store.iter_chunks(["runtime"]))
+    paths = store.chunks(first_seq)
+    if thresholds is None or not paths:
+        return None, first_seq
+    last_seq = store.chunk_seq(paths[-1])
+
+    def load_chunks():
+        for chunk in store.iter_chunks(["runtime"], first_seq):
+            runtimes = chunk["runtime"]
+            yield (runtimes.astype(np.float32),
+                   label_runtimes(runtimes, thresholds).astype(np.float32))
+    return load_chunks, last_seq + 1
+
+def _file_version(path):
+    """Size and modification time of a file, to tell whether it changed."""
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+def _csv_source(path):
+    """Chunk loader streaming the training CSV in CSV_CHUNK_ROWS batches."""
+    columns = pd.read_csv(path, nrows=0).columns
+    if "runtime_seconds" not in columns or "numeric_priority" not in columns:
+        print("Error: CSV file does not have the expected columns 'runtime_seconds' and 'numeric_priority'.")
+        return None
+
+    def load_chunks():
+        for df in pd.read_csv(path, usecols=["runtime_seconds", "numeric_priority"],
+                              chunksize=CSV_CHUNK_ROWS):
+            yield (df["runtime_seconds"].to_numpy(np.float32),
+                   df["numeric_priority"].to_numpy(np.float32))
+    return load_chunks
+
+def _train_matrix(data_iter, nthread):
+    # External memory keeps only the quantised pages of the current batch in
+    # RAM; older xgboost versions fall back to an in-memory quantile matrix.
+    if hasattr(xgb, "ExtMemQuantileDMatrix"):
+        return xgb.ExtMemQuantileDMatrix(data_iter, nthread=nthread)
+    return xgb.QuantileDMatrix(data_iter, nthread=nthread)
+
+def _load_booster(path):
+    """Booster of a previously saved model, or None."""
+    if not os.path.exists(path):
+        return None
+    try:
+        return joblib.load(path).get_booster()
+    except Exception as e:
+        print(f"Previous model not usable for incremental training: {e}")
+        return None
+
+def train_model(model_file=MODEL_FILE, table_file=TABLE_PATH, progress=None, should_cancel=None,
+                incremental=False, base_model_file=MODEL_FILE):
     """Train an XGBoost model to predict a numeric priority based on process runtime.
-    
-    Expects a CSV file with columns:
+
+    Trains out of core from the sample store (see collect_training_data.py),
+    or from a CSV file with columns:
         - runtime_seconds: How long the process has been running (in seconds)
         - numeric_priority: A numeric value (1-10) representing process priority.
-    Saves the trained model to MODEL_FILE.
+    Data is streamed chunk by chunk into an external-memory quantile matrix and
+    boosted on all cores; 20% of every chunk is held out to report RMSE.
+    With `incremental`, boosting continues from base_model_file using only
+    sample store chunks it hasn't seen yet. Without a sample store it continues
+    on the CSV file if that changed since the base model (the whole file: its
+    rows carry no sequence to tell new ones apart).
+
+    Saves the trained model to model_file (and its compiled table to table_file),
+    both written atomically. progress(done, total) is called after every boosting
+    round; when should_cancel() returns True, training stops and TrainingCancelled
+    is raised without writing anything.
+    Returns a dict with the written paths and training stats, or None if there
+    is no usable data.
     """
-    if not os.path.exists(CSV_FILE):
-        print(f"Error: {CSV_FILE} not found. Please run collect_training_data.py first.")
-        return
-
-    df = pd.read_csv(CSV_FILE)
-    
-    # Ensure the required columns exist
-    if "runtime_seconds" not in df.columns or "numeric_priority" not in df.columns:
-        print("Error: CSV file does not have the expected columns 'runtime_seconds' and 'numeric_priority'.")
-        return
+    store = SampleStore() if os.path.isdir(STORE_DIR) else None
+    base = _load_booster(base_model_file) if incremental else None
+    if incremental and base is None:
+        print("No previous model; training from scratch.")
+    first_seq = int(base.attr(CHUNKS_SEEN_ATTR) or 0) if base is not None else 0
 
-    X = df[["runtime_seconds"]]
-    y = df["numeric_priority"]
+    load_chunks, chunks_seen = _store_source(store, first_seq)
+    csv_seen = None
+    if load_chunks is None and base is not None and store is not None and store.chunks():
+        print("No new sample store chunks since the last model; nothing to do.")
+        return None
+    if load_chunks is None:
+        if not os.path.exists(CSV_FILE):
+            print(f"Error: {CSV_FILE} not found. Please run collect_training_data.py first.")
+            return None
+        csv_seen = _file_version(CSV_FILE)
+        if base is not None:
+            if base.attr(CSV_SEEN_ATTR) == csv_seen:
+                print(f"{CSV_FILE} is unchanged since the last model; nothing to do.")
+                return None
+            print(f"No sample store; continuing boosting on {CSV_FILE}, which changed since the last model.")
+        load_chunks = _csv_source(CSV_FILE)
+        if load_chunks is None:
+            return None
 
-    # Optionally split the data (here we train on 80% of the data)
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    rounds = INCREMENTAL_ROUNDS if base is not None else N_ESTIMATORS
+    nthread = os.cpu_count() or 1
+    params = {"objective": "reg:squarederror", "eval_metric": "rmse", "tree_method": "hist",
+              "nthread": nthread}
+    callback = ProgressCallback(rounds, progress, should_cancel)
+    evals_result = {}
+    started = time.perf_counter()
+    with tempfile.TemporaryDirectory(prefix="xgb-cache-") as cache_dir:
+        train_iter = ChunkIter(load_chunks, holdout=False,
+                               cache_prefix=os.path.join(cache_dir, "train"))
+        eval_iter = ChunkIter(load_chunks, holdout=True)
+        dtrain = _train_matrix(train_iter, nthread)
+        if train_iter.rows == 0:
+            print("Error: no training rows.")
+            return None
+        deval = xgb.QuantileDMatrix(eval_iter, ref=dtrain, nthread=nthread)
+        evals = [(deval, "eval")] if eval_iter.rows else []
+        booster = xgb.train(params, dtrain, num_boost_round=rounds, evals=evals,
+                            evals_result=evals_result, callbacks=[callback],
+                            verbose_eval=False, xgb_model=base)
+        train_seconds = time.perf_counter() - started
+        if callback.cancelled:
+            raise TrainingCancelled()
+        booster.set_attr(**{CHUNKS_SEEN_ATTR: str(chunks_seen), CSV_SEEN_ATTR: csv_seen})
+        # Re-load the booster as the regressor the rest of the app expects,
+        # detached from the matrices (and their cache files) it was trained on
+        model = XGBRegressor()
+        model.load_model(bytearray(booster.save_raw("ubj")))
+        del booster, dtrain, deval
 
-    # Train the XGBoost Regressor with RMSE as evaluation metric
-    model = XGBRegressor(eval_metric="rmse")
-    model.fit(X_train, y_train)
+    rmse = evals_result["eval"]["rmse"][-1] if evals_result else None
+    dump_atomic(model, model_file)
+    rmse_text = f"{rmse:.4f}" if rmse is not None else "n/a"
+    print(f"XGBoost Regressor trained on {train_iter.rows} rows in {train_seconds:.1f}s "
+          f"(held-out RMSE {rmse_text}) and saved as {model_file}")
 
-    # Save the trained model
-    joblib.dump(model, MODEL_FILE)
-    print(f"XGBoost Regressor trained and saved as {MODEL_FILE}")
+    # Compile it into a lookup table for fast scoring, checked against the
+    # model across the training range
+    low = min(train_iter.low, eval_iter.low)
+    high = max(train_iter.high, eval_iter.high)
+    try:
+        table = export_table(model, low, high, table_file)
+        print(f"Compiled {len(table.thresholds)} thresholds into {table_file}")
+    except ValueError as e:
+        print(f"Model table not exported: {e}")
+        table_file = None
+    return {"model_file": model_file, "table_file": table_file, "rmse": rmse,
+            "train_seconds": train_seconds, "rows": train_iter.rows,
+            "rounds": model.get_booster().num_boosted_rounds()}
 
 if __name__ == "__main__":
-    train_model()
-
-
+    import argparse
+    parser = argparse.ArgumentParser(description="Train the process priority model.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Continue boosting the current model on new samples (or a changed CSV)")
+    train_model(incremental=parser.parse_args().incremental)